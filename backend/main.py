@@ -8,9 +8,11 @@ try:
 except ImportError:
     import load_dotenv
 import os
+import state
 from state import database
 from modules.habits import build_habits, break_habits
-from modules import tasks, user, login, child, game, friends, action_plans, goals
+from modules import tasks, user, login, child, game, friends, action_plans, goals, sync, events
+from util import hashing
 
 load_dotenv.load_dotenv("../.env")
 db_filename = os.getenv("DATABASE_FILE", "database.db")
@@ -18,8 +20,61 @@ origins = os.getenv("VITE_URL", "http://localhost:5173").split(",")
 api_base = os.getenv("API_BASE", "/")
 bind_address = os.getenv("BIND_ADDRESS", "0.0.0.0")
 port = int(os.getenv("API_PORT", "8081"))
+db_pool_size = int(os.getenv("DATABASE_POOL_SIZE", "8"))
+db_wal = os.getenv("DATABASE_WAL", "1").lower() not in ("0", "false", "no")
+db_group_commit = os.getenv("DATABASE_GROUP_COMMIT", "0").lower() in ("1", "true", "yes")
+db_group_commit_window_ms = float(os.getenv("DATABASE_GROUP_COMMIT_WINDOW_MS", "2"))
+db_id_block_size = int(os.getenv("DATABASE_ID_BLOCK_SIZE", "32"))
+session_store = os.getenv("SESSION_STORE", "sqlite").lower()
+session_idle_ttl = float(os.getenv("SESSION_IDLE_TTL", str(7 * 24 * 3600)))
+session_absolute_ttl = float(os.getenv("SESSION_ABSOLUTE_TTL", str(30 * 24 * 3600)))
+session_cache_size = int(os.getenv("SESSION_CACHE_SIZE", "10000"))
+session_cache_seconds = float(os.getenv("SESSION_CACHE_SECONDS", "5"))
+session_secret = os.getenv("SESSION_SECRET", "")
+account_cache_seconds = float(os.getenv("ACCOUNT_CACHE_SECONDS", "5"))
+password_hash_workers = os.getenv("PASSWORD_HASH_WORKERS", "")
+password_hash_queue = int(os.getenv("PASSWORD_HASH_QUEUE", "0"))
+password_scrypt_n = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+password_scrypt_r = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+password_scrypt_p = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+events_heartbeat_seconds = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+events_history = int(os.getenv("EVENTS_HISTORY", "100"))
+events_queue_size = int(os.getenv("EVENTS_QUEUE_SIZE", "256"))
+events_history_seconds = float(os.getenv("EVENTS_HISTORY_SECONDS", "60"))
+sync_tombstone_versions = int(os.getenv("SYNC_TOMBSTONE_VERSIONS", "100000"))
 
-database.Database.init(db_filename)
+database.Database.init(
+    db_filename,
+    pool_size=db_pool_size,
+    wal=db_wal,
+    group_commit=db_group_commit,
+    group_commit_window_ms=db_group_commit_window_ms,
+    id_block_size=db_id_block_size,
+)
+
+hashing.hasher = hashing.PasswordHasher(
+    int(password_hash_workers) if password_hash_workers else None,
+    password_hash_queue or None,
+    n=password_scrypt_n,
+    r=password_scrypt_r,
+    p=password_scrypt_p,
+)
+state.accounts.cache = state.accounts.AccountCache(session_cache_size, ttl=account_cache_seconds)
+state.events.bus = state.events.EventBus(events_history, events_queue_size, events_heartbeat_seconds, events_history_seconds)
+sync.TOMBSTONE_VERSIONS = max(1, sync_tombstone_versions)
+if session_store == "token":
+    from state import tokens
+    state.sessions = state.TokenSessionStore(
+        tokens.configured_secret(session_secret),
+        ttl=session_absolute_ttl,
+        refresh_seconds=session_cache_seconds,
+    )
+elif session_store == "memory":
+    state.sessions = state.MemorySessionStore(session_cache_size, session_idle_ttl, session_absolute_ttl)
+else:
+    state.sessions = state.SqliteSessionStore(
+        session_cache_size, session_idle_ttl, session_absolute_ttl, cache_seconds=session_cache_seconds
+    )
 
 app = fastapi.FastAPI()
 app.include_router(build_habits.router, prefix=api_base)
@@ -32,6 +87,8 @@ app.include_router(game.router, prefix=api_base)
 app.include_router(friends.router, prefix=api_base)
 app.include_router(action_plans.router, prefix=api_base)
 app.include_router(goals.router, prefix=api_base)
+app.include_router(sync.router, prefix=api_base)
+app.include_router(events.router, prefix=api_base)
 
 app.add_middleware(
     CORSMiddleware,
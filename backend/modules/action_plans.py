@@ -1,5 +1,6 @@
 import copy
 import json
+import time
 from datetime import date, datetime
 
 import fastapi
@@ -10,12 +11,17 @@ from pydantic import BaseModel
 import state
 from modules.datatypes import ActionPlanInfo, GameProfile, UserInfo
 from modules.game import row_to_profile
-from state import SQLHelper
-from state.database import Database
+from state import SQLHelper, events
+from state.database import AsyncDatabase, Database
+from util import daybitmap
+from util.daybitmap import DayBitmap
+from util.listing import ListParams
+from util.streaks import StreakRuns
 
 router = fastapi.APIRouter()
 
 COINS_PER_COMPLETION = 20
+MAX_BATCH_MUTATIONS = 500
 
 BADGE_DEFINITIONS = [
     {
@@ -66,6 +72,16 @@ class ActionPlanDateMutationRequest(BaseModel):
     dateISO: str
 
 
+class ActionPlanBatchMutation(BaseModel):
+    actionPlanId: int
+    dateISO: str
+    completed: bool = True
+
+
+class ActionPlanBatchRequest(BaseModel):
+    mutations: list[ActionPlanBatchMutation]
+
+
 def _safe_json_object(value, default=None):
     if default is None:
         default = {}
@@ -168,13 +184,12 @@ def _validate_completion_date(date_iso: str) -> date:
     return parsed
 
 
-def _normalize_completed_dates(value):
-    raw = _safe_json_object(value, {})
-    normalized = {}
-    for key, val in raw.items():
-        if isinstance(key, str) and key:
-            normalized[key] = bool(val)
-    return normalized
+def replace_plan_completions(db, plan_id: int, completed_dates) -> bool:
+    """Rewrite a plan's plan_completions rows from a client-sent completedDates."""
+    days = DayBitmap.from_iso(completed_dates).iso_list()
+    return db.try_execute(*SQLHelper.plan_completions_clear(plan_id)) and db.try_execute(
+        *SQLHelper.plan_completions_add_many(plan_id, days, time.time())
+    )
 
 
 def _is_child_of_parent(db, child_id, parent_id) -> bool:
@@ -240,7 +255,6 @@ def _read_reward_state_from_plan_meta(meta):
     meta = _safe_json_object(meta, {})
     return {
         "awardedMilestones": [int(x) for x in _safe_json_array(meta.get("awardedMilestones"), [])],
-        "rewardedCompletionDates": _safe_json_object(meta.get("rewardedCompletionDates"), {}),
         "earnedBadges": [str(x) for x in _safe_json_array(meta.get("earnedBadges"), []) if str(x).strip()],
         "badgeEarnedDates": _safe_json_object(meta.get("badgeEarnedDates"), {}),
         "completionCoinsTotal": int(meta.get("completionCoinsTotal") or 0),
@@ -249,60 +263,34 @@ def _read_reward_state_from_plan_meta(meta):
     }
 
 
-def _compute_basic_streak_stats(completed_dates: dict):
-    completed_keys = sorted([k for k, v in completed_dates.items() if v is True])
-    total = len(completed_keys)
-
-    if total == 0:
-        return {
-            "currentStreak": 0,
-            "bestStreak": 0,
-            "totalCompletions": 0,
-        }
-
-    parsed_dates = []
-    for key in completed_keys:
-        try:
-            parsed_dates.append(datetime.strptime(key, "%Y-%m-%d").date())
-        except Exception:
-            continue
-
-    if not parsed_dates:
-        return {
-            "currentStreak": 0,
-            "bestStreak": 0,
-            "totalCompletions": 0,
-        }
-
-    parsed_dates = sorted(set(parsed_dates))
+def _streak_runs(plan_meta, completed: DayBitmap) -> StreakRuns:
+    """The plan's stored streak runs, or a rebuild from the bitmap when they are missing or don't match it.
 
-    best = 1
-    run = 1
-    for i in range(1, len(parsed_dates)):
-        delta = (parsed_dates[i] - parsed_dates[i - 1]).days
-        if delta == 1:
-            run += 1
-            best = max(best, run)
-        else:
-            run = 1
+    Only the day count and the first and last day are checked, so a tap stays
+    O(log runs). Rewriting the days through /action-plan/update drops the
+    stored runs (see SQLHelper.action_plan_update_partial), which is what
+    lets this trust them otherwise.
+    """
+    runs = StreakRuns.from_state(_safe_json_object(plan_meta, {}).get("streakRuns"))
+    if runs is not None and runs.total == completed.count() and (
+        not runs.total or (runs.starts[0] == completed.first() and runs.ends[-1] == completed.last())
+    ):
+        return runs
+    return StreakRuns(completed.runs())
 
-    today = date.today()
-    current = 0
-    date_set = set(parsed_dates)
-    cursor = today
-    while cursor in date_set:
-        current += 1
-        cursor = cursor.fromordinal(cursor.toordinal() - 1)
 
+def _compute_basic_streak_stats(completed: DayBitmap, runs: StreakRuns | None = None):
+    if runs is None:
+        runs = _streak_runs(None, completed)
     return {
-        "currentStreak": current,
-        "bestStreak": best,
-        "totalCompletions": total,
+        "currentStreak": runs.current(),
+        "bestStreak": runs.best,
+        "totalCompletions": runs.total,
     }
 
 
-def _build_plan_reward_state(plan_row, goal_row, completed_dates, old_meta, event_date_iso):
-    stats = _compute_basic_streak_stats(completed_dates)
+def _build_plan_reward_state(plan_row, goal_row, completed: DayBitmap, old_meta, event_date_iso, runs: StreakRuns | None = None):
+    stats = _compute_basic_streak_stats(completed, runs)
     stat_view = {
         "current": int(stats["currentStreak"]),
         "longest": int(stats["bestStreak"]),
@@ -322,12 +310,8 @@ def _build_plan_reward_state(plan_row, goal_row, completed_dates, old_meta, even
     for badge_id in earned_badges:
         badge_earned_dates[badge_id] = previous_badge_dates.get(badge_id) or event_date_iso
 
-    rewarded_completion_dates = {}
-    for key, val in completed_dates.items():
-        if val is True:
-            rewarded_completion_dates[key] = True
-
-    completion_coins_total = len(rewarded_completion_dates) * COINS_PER_COMPLETION
+    # every completed day earns its coins once
+    completion_coins_total = completed.count() * COINS_PER_COMPLETION
     milestone_coins_total = sum(
         int(m.get("coins") or 0)
         for m in milestones
@@ -341,7 +325,6 @@ def _build_plan_reward_state(plan_row, goal_row, completed_dates, old_meta, even
         "bestStreak": int(stats["bestStreak"]),
         "totalCompletions": int(stats["totalCompletions"]),
         "awardedMilestones": awarded_milestones,
-        "rewardedCompletionDates": rewarded_completion_dates,
         "earnedBadges": earned_badges,
         "badgeEarnedDates": badge_earned_dates,
         "completionCoinsTotal": completion_coins_total,
@@ -418,14 +401,16 @@ def action_plan_create(info: ActionPlanInfo, response: fastapi.Response, user: U
         info.createdById = info.createdById or user.id
         info.createdByName = info.createdByName or user.name
         info.createdByRole = info.createdByRole or user.role
-        info.createdAt = info.createdAt or int(__import__("time").time())
-        if db.try_execute(*SQLHelper.action_plan_create(info)):
-            response.status_code = 200
-            db.write()
-        else:
+        info.createdAt = info.createdAt or int(time.time())
+        if not db.try_execute(*SQLHelper.action_plan_create(info)):
             response.status_code = 500
             return response
         ap_id = db.created_id()
+        if info.completedDates and not replace_plan_completions(db, ap_id, info.completedDates):
+            response.status_code = 500
+            return response
+        response.status_code = 200
+        db.write()
     return {"id": ap_id}
 
 
@@ -456,7 +441,7 @@ def action_plan_delete(plan_id: int, response: fastapi.Response, user: UserInfo
 
 @router.get("/action-plan/get/{plan_id}")
 def action_plan_get(plan_id: int, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
+    with Database(readonly=True) as db:
         if not db.try_execute(*SQLHelper.action_plan_get(plan_id)):
             response.status_code = 500
             return response
@@ -503,33 +488,50 @@ def action_plan_update(info: ActionPlanInfo, response: fastapi.Response, user: U
             return {"error": "Not allowed to update this action plan"}
 
         sql_and_params = SQLHelper.action_plan_update_partial(updates, plan_id)
-        if db.try_execute(*sql_and_params):
-            response.status_code = 200
-            db.write()
-        else:
+        if not db.try_execute(*sql_and_params):
             response.status_code = 500
             return response
+        if "completedDates" in updates and not replace_plan_completions(db, plan_id, updates["completedDates"]):
+            response.status_code = 500
+            return response
+        response.status_code = 200
+        db.write()
 
     return {"id": plan_id}
 
 
 @router.get("/action-plan/list")
-def action_plan_list(response: fastapi.Response, goalId: int = None, user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
-        if not db.try_execute(*SQLHelper.action_plan_list(user.id)):
-            response.status_code = 500
-            return response
-        rows = db.cursor().fetchall()
+def action_plan_list(
+    response: fastapi.Response,
+    goalId: int = None,
+    after: int | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+    assigneeId: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    user: UserInfo = Depends(state.require_user),
+):
+    try:
+        page = ListParams("action_plans", after, limit, fields, since, until)
+        with Database(readonly=True) as db:
+            # goalId is filtered in SQL (idx_action_plans_goalId) rather than after fetching everything
+            query = page.query(db, SQLHelper.action_plan_list(user.id), [
+                ("goalId = ?", goalId),
+                ("assigneeId = ?", assigneeId),
+            ])
+            if not db.try_execute(*query):
+                response.status_code = 500
+                return response
+            rows = db.cursor().fetchall()
+    except ValueError as exc:
+        response.status_code = 400
+        return {"error": str(exc)}
 
-    out = []
-    for row in rows:
-        plan = row_to_plan(row)
-        if goalId is not None and plan.get("goalId") != goalId:
-            continue
-        out.append(plan)
+    out = [page.project(row_to_plan(row)) for row in rows]
 
     response.status_code = 200
-    return {"plans": out}
+    return {"plans": out, **page.page(rows[-1]["id"] if rows else None, len(rows))}
 
 
 @router.post("/action-plan/delete-by-goal")
@@ -560,128 +562,246 @@ def action_plan_delete_by_goal(info: dict, response: fastapi.Response, user: Use
     return {"removed": True}
 
 
-@router.post("/action-plan/complete")
-def complete_action_plan(
-    payload: ActionPlanDateMutationRequest,
-    response: fastapi.Response,
-    user: UserInfo = Depends(state.require_user),
-):
-    _validate_completion_date(payload.dateISO)
-
-    with Database() as db:
-        if not db.try_execute(*SQLHelper.action_plan_get(payload.actionPlanId)):
-            response.status_code = 500
-            return response
-
-        plan_row = db.cursor().fetchone()
+class _PlanProgress:
+    """One action plan's completion state while a request changes it."""
+
+    __slots__ = ("row", "goal", "completed", "runs", "meta", "state")
+
+    def __init__(self, row: dict, goal: dict | None):
+        self.row = row
+        self.goal = goal
+        self.completed = daybitmap.from_row(row)
+        self.runs = _streak_runs(row["meta"], self.completed)
+        self.meta = _safe_json_object(row["meta"], {})
+        self.meta.pop("rewardedCompletionDates", None)
+        # the reward state after the last change, None until something is applied
+        self.state = None
+
+    @property
+    def id(self):
+        return self.row["id"]
+
+    @property
+    def assignee_id(self):
+        return self.row["assigneeId"]
+
+
+class _ProgressBatch:
+    """Completion changes made by one request.
+
+    Each plan, goal and assignee game profile is read once, every change is
+    applied to the in-memory copies, and `commit` writes each touched plan
+    and profile once, in one transaction.
+    """
+
+    def __init__(self, db: Database, user: UserInfo):
+        self.db = db
+        self.user = user
+        self.plans: dict[int, _PlanProgress] = {}
+        self.goals: dict[int, dict | None] = {}
+        # assignee id -> decoded game profile
+        self.profiles: dict[str, dict] = {}
+        self.__dirty_profiles: set[str] = set()
+        self.__completion_writes: list[tuple[str, tuple]] = []
+        self.__events: list[tuple[list, str, dict]] = []
+        # sync version of the rows written by commit
+        self.version = None
+
+    def load(self, plan_id: int) -> tuple[_PlanProgress | None, tuple[int, dict] | None]:
+        """The plan to change, or (status, error body) when the user can't change it."""
+        if plan_id in self.plans:
+            return self.plans[plan_id], None
+
+        if not self.db.try_execute(*SQLHelper.action_plan_get(plan_id)):
+            raise HTTPException(status_code=500, detail="Failed to read action plan")
+        plan_row = self.db.cursor().fetchone()
         if plan_row is None:
-            response.status_code = 404
-            return {"error": "Action plan not found"}
+            return None, (404, {"error": "Action plan not found"})
 
-        if not _can_user_manage_action_plan(db, user, plan_row):
-            response.status_code = 403
-            return {"error": "Not allowed to modify this action plan"}
-
-        goal_row = None
-        if plan_row["goalId"] is not None:
-            if not db.try_execute(*SQLHelper.goal_get(plan_row["goalId"])):
-                response.status_code = 500
-                return response
-            raw_goal = db.cursor().fetchone()
-            if raw_goal is not None:
-                goal_row = _row_to_goal_minimal(raw_goal)
+        if not _can_user_manage_action_plan(self.db, self.user, plan_row):
+            return None, (403, {"error": "Not allowed to modify this action plan"})
 
         assignee_id = plan_row["assigneeId"]
         if assignee_id is None:
-            response.status_code = 400
-            return {"error": "Action plan is missing assigneeId"}
-
-        profile_row = _ensure_game_profile(db, assignee_id)
-        profile = row_to_profile(profile_row)
-
-        completed_dates = _normalize_completed_dates(plan_row["completedDates"])
-        completed_dates[payload.dateISO] = True
-
-        old_plan_state = _read_reward_state_from_plan_meta(plan_row["meta"])
-        new_plan_state = _build_plan_reward_state(
-            plan_row,
-            goal_row,
-            completed_dates,
-            plan_row["meta"],
-            payload.dateISO,
-        )
+            return None, (400, {"error": "Action plan is missing assigneeId"})
+
+        goal_id = plan_row["goalId"]
+        if goal_id is not None and goal_id not in self.goals:
+            if not self.db.try_execute(*SQLHelper.goal_get(goal_id)):
+                raise HTTPException(status_code=500, detail="Failed to read goal")
+            raw_goal = self.db.cursor().fetchone()
+            self.goals[goal_id] = _row_to_goal_minimal(raw_goal) if raw_goal is not None else None
+
+        if str(assignee_id) not in self.profiles:
+            self.profiles[str(assignee_id)] = row_to_profile(_ensure_game_profile(self.db, assignee_id))
+
+        plan = self.plans[plan_id] = _PlanProgress(dict(plan_row), self.goals.get(goal_id))
+        return plan, None
+
+    def apply(self, plan: _PlanProgress, date_iso: str, completed: bool) -> dict:
+        """Mark or unmark one day and return the reward changes it caused."""
+        day = _parse_iso_date(date_iso).toordinal()
+        if completed:
+            plan.completed.add(day)
+            plan.runs.add(day)
+        else:
+            plan.completed.remove(day)
+            plan.runs.remove(day)
 
+        old_plan_state = _read_reward_state_from_plan_meta(plan.meta)
+        new_plan_state = _build_plan_reward_state(plan.row, plan.goal, plan.completed, plan.meta, date_iso, plan.runs)
         plan_coin_delta = int(new_plan_state["planRewardCoinsTotal"]) - int(old_plan_state["planRewardCoinsTotal"])
 
+        profile = self.profiles[str(plan.assignee_id)]
         badge_delta = _apply_badge_source_delta(
             profile.get("meta", {}),
-            payload.actionPlanId,
+            plan.id,
             old_plan_state["earnedBadges"],
             new_plan_state["earnedBadges"],
-            payload.dateISO,
+            date_iso,
         )
-
         badge_coin_delta = (
             _sum_badge_coins(badge_delta["globallyAddedBadges"])
             - _sum_badge_coins(badge_delta["globallyRemovedBadges"])
         )
+        profile["coins"] = max(0, int(profile.get("coins") or 0) + plan_coin_delta + badge_coin_delta)
+        profile["meta"] = badge_delta["meta"]
+        self.__dirty_profiles.add(str(plan.assignee_id))
 
-        total_coin_delta = plan_coin_delta + badge_coin_delta
-        next_coins = max(0, int(profile.get("coins") or 0) + total_coin_delta)
-
-        merged_plan_meta = _safe_json_object(plan_row["meta"], {})
-        merged_plan_meta.update({
+        plan.meta.update({
             "currentStreak": new_plan_state["currentStreak"],
             "bestStreak": new_plan_state["bestStreak"],
             "totalCompletions": new_plan_state["totalCompletions"],
             "awardedMilestones": new_plan_state["awardedMilestones"],
-            "rewardedCompletionDates": new_plan_state["rewardedCompletionDates"],
             "earnedBadges": new_plan_state["earnedBadges"],
             "badgeEarnedDates": new_plan_state["badgeEarnedDates"],
             "completionCoinsTotal": new_plan_state["completionCoinsTotal"],
             "milestoneCoinsTotal": new_plan_state["milestoneCoinsTotal"],
             "planRewardCoinsTotal": new_plan_state["planRewardCoinsTotal"],
+            "streakRuns": plan.runs.state(),
         })
+        plan.state = new_plan_state
 
-        if not db.try_execute(
-            *SQLHelper.action_plan_update_progress(
-                payload.actionPlanId,
-                completed_dates,
-                new_plan_state["currentStreak"],
-                new_plan_state["bestStreak"],
-                new_plan_state["totalCompletions"],
-                merged_plan_meta,
-            )
-        ):
-            response.status_code = 500
-            return response
+        if completed:
+            self.__completion_writes.append(SQLHelper.plan_completion_add(plan.id, plan.assignee_id, date_iso, time.time()))
+        else:
+            self.__completion_writes.append(SQLHelper.plan_completion_delete(plan.id, date_iso))
+        self.__events.append((
+            [plan.assignee_id, plan.row["createdById"]],
+            "action_plan.completed" if completed else "action_plan.incompleted",
+            {"actionPlanId": plan.id, "dateISO": date_iso},
+        ))
+
+        clamp = max if completed else min
+        return {
+            "badgeDelta": badge_delta,
+            "coinsEarned": clamp(0, plan_coin_delta),
+            "badgeCoinsEarned": clamp(0, badge_coin_delta),
+            "milestoneCoinsEarned": clamp(
+                0,
+                int(new_plan_state["milestoneCoinsTotal"]) - int(old_plan_state["milestoneCoinsTotal"]),
+            ),
+        }
 
-        if not db.try_execute(
-            *SQLHelper.profile_update_partial_for_user(
-                {
-                    "coins": next_coins,
-                    "meta": badge_delta["meta"],
-                },
-                assignee_id,
-            )
-        ):
-            response.status_code = 500
-            return {"error": "Failed to persist assignee game profile"}
+    def commit(self) -> bool:
+        if not self.__dirty_profiles:
+            # nothing was applied
+            return True
+        # every row written here shares one sync version, taken up front so
+        # the views below can carry it without reading the rows back
+        if not self.db.try_execute(*SQLHelper.sync_clock_advance()):
+            return False
+        self.version = self.db.cursor().fetchone()[0]
+
+        for plan in self.plans.values():
+            if plan.state is None:
+                continue
+            if not self.db.try_execute(
+                *SQLHelper.action_plan_update_progress(
+                    plan.id,
+                    plan.completed,
+                    plan.state["currentStreak"],
+                    plan.state["bestStreak"],
+                    plan.state["totalCompletions"],
+                    plan.meta,
+                    self.version,
+                )
+            ):
+                return False
+
+        for assignee_id in self.__dirty_profiles:
+            profile = self.profiles[assignee_id]
+            profile["rowVersion"] = self.version
+            if not self.db.try_execute(
+                *SQLHelper.profile_update_partial_for_user(
+                    {"coins": profile["coins"], "meta": profile["meta"], "rowVersion": self.version},
+                    assignee_id,
+                )
+            ):
+                return False
+
+        for write in self.__completion_writes:
+            if not self.db.try_execute(*write):
+                return False
+
+        self.db.write()
+        for account_ids, event_type, data in self.__events:
+            events.publish_family(self.db, account_ids, event_type, data)
+        return True
 
-        db.write()
+    def plan_view(self, plan: _PlanProgress) -> dict:
+        """The plan as row_to_plan would return it after the commit."""
+        row = dict(plan.row)
+        row["completedDays"] = plan.completed.to_blob()
+        row["completedDates"] = None
+        row["meta"] = plan.meta
+        if plan.state is not None:
+            row["streak"] = plan.state["currentStreak"]
+            row["rowVersion"] = self.version
+        return row_to_plan(row)
+
+    def profile_view(self, assignee_id) -> dict:
+        """The assignee's game profile as row_to_profile would return it after the commit."""
+        return dict(self.profiles[str(assignee_id)])
+
+    def profile_summary(self, assignee_id) -> dict:
+        """The reward totals responses report for an assignee after the commit."""
+        profile = self.profiles[str(assignee_id)]
+        return {
+            "totalCoins": int(profile.get("coins") or 0),
+            "earnedBadges": profile.get("meta", {}).get("earnedBadges", []),
+            "badgeEarnedDates": profile.get("meta", {}).get("badgeEarnedDates", {}),
+        }
 
-        if not db.try_execute(*SQLHelper.action_plan_get(payload.actionPlanId)):
-            response.status_code = 500
-            return response
-        updated_row = db.cursor().fetchone()
 
-        if not db.try_execute(*SQLHelper.get_game_profile(assignee_id)):
-            response.status_code = 500
-            return response
-        updated_profile_row = db.cursor().fetchone()
+def _mutation_result(plan: _PlanProgress, delta: dict) -> dict:
+    """What one complete/incomplete change reports, for the single and the batch endpoints alike."""
+    return {
+        "currentStreak": plan.state["currentStreak"],
+        "bestStreak": plan.state["bestStreak"],
+        "totalCompletions": plan.state["totalCompletions"],
+        "newBadges": delta["badgeDelta"]["globallyAddedBadges"],
+        "coinsEarned": delta["coinsEarned"],
+        "badgeCoinsEarned": delta["badgeCoinsEarned"],
+        "milestoneCoinsEarned": delta["milestoneCoinsEarned"],
+    }
+
+
+def _mutate_action_plan(db: Database, payload: ActionPlanDateMutationRequest, response: fastapi.Response, user: UserInfo, completed: bool):
+    unit = _ProgressBatch(db, user)
+    plan, error = unit.load(payload.actionPlanId)
+    if error is not None:
+        response.status_code, body = error
+        return body
+
+    delta = unit.apply(plan, payload.dateISO, completed)
+    if not unit.commit():
+        response.status_code = 500
+        return response
 
-    updated_plan = row_to_plan(updated_row)
-    updated_profile = row_to_profile(updated_profile_row)
+    # built from what was just written, the same way as the batch endpoint; nothing is read back
+    updated_plan = unit.plan_view(plan)
+    result = _mutation_result(plan, delta)
 
     response.status_code = 200
     return {
@@ -689,179 +809,101 @@ def complete_action_plan(
         "actionPlanId": updated_plan["id"],
         "assigneeId": updated_plan.get("assigneeId"),
         "assigneeName": updated_plan.get("assigneeName"),
-        "completedDates": updated_plan.get("completedDates", {}),
-        "current": updated_plan.get("currentStreak", 0),
-        "currentStreak": updated_plan.get("currentStreak", 0),
-        "longest": updated_plan.get("bestStreak", 0),
-        "bestStreak": updated_plan.get("bestStreak", 0),
-        "totalCompletions": updated_plan.get("totalCompletions", 0),
-        "earnedBadges": updated_profile.get("meta", {}).get("earnedBadges", []),
-        "newBadges": badge_delta["globallyAddedBadges"],
-        "badgeEarnedDates": updated_profile.get("meta", {}).get("badgeEarnedDates", {}),
-        "coinsEarned": max(0, plan_coin_delta),
-        "badgeCoinsEarned": max(0, badge_coin_delta),
-        "milestoneCoinsEarned": max(
-            0,
-            int(new_plan_state["milestoneCoinsTotal"]) - int(old_plan_state["milestoneCoinsTotal"]),
-        ),
-        "totalCoins": int(updated_profile.get("coins") or 0),
-        "awardedMilestones": new_plan_state["awardedMilestones"],
+        "completedDates": updated_plan["completedDates"],
+        **result,
+        "current": result["currentStreak"],
+        "longest": result["bestStreak"],
+        **unit.profile_summary(plan.assignee_id),
+        "awardedMilestones": plan.state["awardedMilestones"],
         "plan": updated_plan,
-        "profile": updated_profile,
-        "completedDateISO": payload.dateISO,
+        "profile": unit.profile_view(plan.assignee_id),
+        ("completedDateISO" if completed else "incompletedDateISO"): payload.dateISO,
     }
 
 
-@router.post("/action-plan/incomplete")
-def incomplete_action_plan(
+@router.post("/action-plan/complete")
+async def complete_action_plan(
     payload: ActionPlanDateMutationRequest,
     response: fastapi.Response,
     user: UserInfo = Depends(state.require_user),
 ):
-    _parse_iso_date(payload.dateISO)
-
-    with Database() as db:
-        if not db.try_execute(*SQLHelper.action_plan_get(payload.actionPlanId)):
-            response.status_code = 500
-            return response
-
-        plan_row = db.cursor().fetchone()
-        if plan_row is None:
-            response.status_code = 404
-            return {"error": "Action plan not found"}
-
-        if not _can_user_manage_action_plan(db, user, plan_row):
-            response.status_code = 403
-            return {"error": "Not allowed to modify this action plan"}
+    _validate_completion_date(payload.dateISO)
 
-        goal_row = None
-        if plan_row["goalId"] is not None:
-            if not db.try_execute(*SQLHelper.goal_get(plan_row["goalId"])):
-                response.status_code = 500
-                return response
-            raw_goal = db.cursor().fetchone()
-            if raw_goal is not None:
-                goal_row = _row_to_goal_minimal(raw_goal)
+    async with AsyncDatabase() as db:
+        return await db.run(_mutate_action_plan, payload, response, user, True)
 
-        assignee_id = plan_row["assigneeId"]
-        if assignee_id is None:
-            response.status_code = 400
-            return {"error": "Action plan is missing assigneeId"}
-
-        profile_row = _ensure_game_profile(db, assignee_id)
-        profile = row_to_profile(profile_row)
-
-        completed_dates = _normalize_completed_dates(plan_row["completedDates"])
-        completed_dates.pop(payload.dateISO, None)
-
-        old_plan_state = _read_reward_state_from_plan_meta(plan_row["meta"])
-        new_plan_state = _build_plan_reward_state(
-            plan_row,
-            goal_row,
-            completed_dates,
-            plan_row["meta"],
-            payload.dateISO,
-        )
 
-        plan_coin_delta = int(new_plan_state["planRewardCoinsTotal"]) - int(old_plan_state["planRewardCoinsTotal"])
+@router.post("/action-plan/incomplete")
+async def incomplete_action_plan(
+    payload: ActionPlanDateMutationRequest,
+    response: fastapi.Response,
+    user: UserInfo = Depends(state.require_user),
+):
+    _parse_iso_date(payload.dateISO)
 
-        badge_delta = _apply_badge_source_delta(
-            profile.get("meta", {}),
-            payload.actionPlanId,
-            old_plan_state["earnedBadges"],
-            new_plan_state["earnedBadges"],
-            payload.dateISO,
-        )
+    async with AsyncDatabase() as db:
+        return await db.run(_mutate_action_plan, payload, response, user, False)
 
-        badge_coin_delta = (
-            _sum_badge_coins(badge_delta["globallyAddedBadges"])
-            - _sum_badge_coins(badge_delta["globallyRemovedBadges"])
-        )
 
-        total_coin_delta = plan_coin_delta + badge_coin_delta
-        next_coins = max(0, int(profile.get("coins") or 0) + total_coin_delta)
+def _complete_action_plan_batch(db: Database, payload: ActionPlanBatchRequest, response: fastapi.Response, user: UserInfo):
+    unit = _ProgressBatch(db, user)
+    results = []
+    for item in payload.mutations:
+        result = {"actionPlanId": item.actionPlanId, "dateISO": item.dateISO, "completed": item.completed}
+        results.append(result)
+        try:
+            if item.completed:
+                _validate_completion_date(item.dateISO)
+            else:
+                _parse_iso_date(item.dateISO)
+        except HTTPException as exc:
+            result.update({"success": False, "status": exc.status_code, "error": exc.detail})
+            continue
 
-        merged_plan_meta = _safe_json_object(plan_row["meta"], {})
-        merged_plan_meta.update({
-            "currentStreak": new_plan_state["currentStreak"],
-            "bestStreak": new_plan_state["bestStreak"],
-            "totalCompletions": new_plan_state["totalCompletions"],
-            "awardedMilestones": new_plan_state["awardedMilestones"],
-            "rewardedCompletionDates": new_plan_state["rewardedCompletionDates"],
-            "earnedBadges": new_plan_state["earnedBadges"],
-            "badgeEarnedDates": new_plan_state["badgeEarnedDates"],
-            "completionCoinsTotal": new_plan_state["completionCoinsTotal"],
-            "milestoneCoinsTotal": new_plan_state["milestoneCoinsTotal"],
-            "planRewardCoinsTotal": new_plan_state["planRewardCoinsTotal"],
-        })
+        plan, error = unit.load(item.actionPlanId)
+        if error is not None:
+            status, body = error
+            result.update({"success": False, "status": status, **body})
+            continue
 
-        if not db.try_execute(
-            *SQLHelper.action_plan_update_progress(
-                payload.actionPlanId,
-                completed_dates,
-                new_plan_state["currentStreak"],
-                new_plan_state["bestStreak"],
-                new_plan_state["totalCompletions"],
-                merged_plan_meta,
-            )
-        ):
-            response.status_code = 500
-            return response
+        delta = unit.apply(plan, item.dateISO, item.completed)
+        result.update({"success": True, "status": 200, **_mutation_result(plan, delta)})
 
-        if not db.try_execute(
-            *SQLHelper.profile_update_partial_for_user(
-                {
-                    "coins": next_coins,
-                    "meta": badge_delta["meta"],
-                },
-                assignee_id,
-            )
-        ):
-            response.status_code = 500
-            return {"error": "Failed to persist assignee game profile"}
+    if not unit.commit():
+        response.status_code = 500
+        return {"error": "Failed to save action plan progress"}
 
-        db.write()
+    response.status_code = 200
+    return {
+        "success": all(r["success"] for r in results),
+        "results": results,
+        "plans": [unit.plan_view(plan) for plan in unit.plans.values() if plan.state is not None],
+        # per assignee: the game profile after every change in the batch
+        "profiles": {assignee_id: unit.profile_summary(assignee_id) for assignee_id in unit.profiles},
+    }
 
-        if not db.try_execute(*SQLHelper.action_plan_get(payload.actionPlanId)):
-            response.status_code = 500
-            return response
-        updated_row = db.cursor().fetchone()
 
-        if not db.try_execute(*SQLHelper.get_game_profile(assignee_id)):
-            response.status_code = 500
-            return response
-        updated_profile_row = db.cursor().fetchone()
+@router.post("/action-plan/complete-batch")
+async def complete_action_plan_batch(
+    payload: ActionPlanBatchRequest,
+    response: fastapi.Response,
+    user: UserInfo = Depends(state.require_user),
+):
+    """Apply many complete/incomplete changes in one transaction.
 
-    updated_plan = row_to_plan(updated_row)
-    updated_profile = row_to_profile(updated_profile_row)
+    Items are applied in order, so a later item sees the effect of earlier ones
+    on the same plan. An item that fails validation or access checks is
+    reported in its result and skipped; the rest still apply.
+    """
+    if not payload.mutations:
+        response.status_code = 400
+        return {"error": "mutations required"}
+    if len(payload.mutations) > MAX_BATCH_MUTATIONS:
+        response.status_code = 400
+        return {"error": f"at most {MAX_BATCH_MUTATIONS} mutations per batch"}
 
-    response.status_code = 200
-    return {
-        "success": True,
-        "actionPlanId": updated_plan["id"],
-        "assigneeId": updated_plan.get("assigneeId"),
-        "assigneeName": updated_plan.get("assigneeName"),
-        "completedDates": updated_plan.get("completedDates", {}),
-        "current": updated_plan.get("currentStreak", 0),
-        "currentStreak": updated_plan.get("currentStreak", 0),
-        "longest": updated_plan.get("bestStreak", 0),
-        "bestStreak": updated_plan.get("bestStreak", 0),
-        "totalCompletions": updated_plan.get("totalCompletions", 0),
-        "earnedBadges": updated_profile.get("meta", {}).get("earnedBadges", []),
-        "newBadges": badge_delta["globallyAddedBadges"],
-        "badgeEarnedDates": updated_profile.get("meta", {}).get("badgeEarnedDates", {}),
-        "coinsEarned": min(0, plan_coin_delta),
-        "badgeCoinsEarned": min(0, badge_coin_delta),
-        "milestoneCoinsEarned": min(
-            0,
-            int(new_plan_state["milestoneCoinsTotal"]) - int(old_plan_state["milestoneCoinsTotal"]),
-        ),
-        "totalCoins": int(updated_profile.get("coins") or 0),
-        "awardedMilestones": new_plan_state["awardedMilestones"],
-        "plan": updated_plan,
-        "profile": updated_profile,
-        "incompletedDateISO": payload.dateISO,
-    }
+    async with AsyncDatabase() as db:
+        return await db.run(_complete_action_plan_batch, payload, response, user)
 
 
 def row_to_plan(row) -> dict:
@@ -879,21 +921,12 @@ def row_to_plan(row) -> dict:
         except Exception:
             pass
 
-    if data.get("completedDates"):
-        try:
-            data["completedDates"] = json.loads(data["completedDates"])
-        except Exception:
-            data["completedDates"] = {}
-    else:
-        data["completedDates"] = {}
+    data["completedDates"] = daybitmap.from_row(data).iso_dict()
+    data.pop("completedDays", None)
 
-    if data.get("meta"):
-        try:
-            data["meta"] = json.loads(data["meta"])
-        except Exception:
-            data["meta"] = {}
-    else:
-        data["meta"] = {}
+    # a str straight from the row, or already a dict when _ProgressBatch builds the view;
+    # streakRuns is server-side state (see _streak_runs) and stays out of responses
+    data["meta"] = {k: v for k, v in _safe_json_object(data.get("meta"), {}).items() if k != "streakRuns"}
 
     meta = data.get("meta") or {}
 
@@ -902,7 +935,8 @@ def row_to_plan(row) -> dict:
     data["totalCompletions"] = int(data.get("totalCompletions") or meta.get("totalCompletions") or 0)
 
     data["awardedMilestones"] = meta.get("awardedMilestones", [])
-    data["rewardedCompletionDates"] = meta.get("rewardedCompletionDates", {})
+    # every completed day is rewarded; no longer stored separately in meta
+    data["rewardedCompletionDates"] = dict(data["completedDates"])
     data["earnedBadges"] = meta.get("earnedBadges", [])
     data["badgeEarnedDates"] = meta.get("badgeEarnedDates", {})
 
@@ -6,6 +6,8 @@ import state
 from modules.datatypes import UserInfo, ChildInfo
 from state import SQLHelper
 from state.database import Database
+from util import hashing
+from util.listing import ListParams
 
 router = fastapi.APIRouter()
 
@@ -25,7 +27,11 @@ def child_create(child: ChildInfo, response: fastapi.Response, user: UserInfo =
         response.status_code = 400
         return {"error": "child password is required"}
 
-    hashed = util.hash_password(child.password)
+    try:
+        hashed = util.hash_password(child.password)
+    except hashing.HashingBusy:
+        response.status_code = 503
+        return {"error": "Server busy, please try again"}
 
     child.parentId = user.id
 
@@ -43,23 +49,40 @@ def child_create(child: ChildInfo, response: fastapi.Response, user: UserInfo =
             return {"error": "Failed to create child"}
 
 @router.get("/child/list")
-def child_list(user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
-        rows = db.execute(*SQLHelper.child_list(user.id)).fetchall()
+def child_list(
+    response: fastapi.Response,
+    after: int | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+    user: UserInfo = Depends(state.require_user),
+):
+    try:
+        page = ListParams("children", after, limit, fields)
+        with Database(readonly=True) as db:
+            rows = db.execute(*page.query(db, SQLHelper.child_list(user.id))).fetchall()
+    except ValueError as exc:
+        response.status_code = 400
+        return {"error": str(exc)}
 
     children = []
     for row in rows:
+        if page.fields:
+            # a partial row doesn't make a valid ChildInfo; hand back just what was asked for
+            data = dict(row)
+            data.pop("password", None)
+            children.append(data)
+            continue
         full_child = util.get_child_from_row(row)
         if full_child is None:
             continue
         full_child.password = ""
         children.append(full_child.model_dump())
 
-    return {"children": children}
+    return {"children": children, **page.page(rows[-1]["id"] if rows else None, len(rows))}
 
 @router.get("/child/get/{child_id}")
 def child_get(child_id: int, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
+    with Database(readonly=True) as db:
         row = db.execute(*SQLHelper.child_get(child_id, user.id)).fetchone()
 
     if not row:
@@ -88,13 +111,14 @@ def child_delete(child_id: int, response: fastapi.Response, user: UserInfo = Dep
         if row["parentId"] == user.id:
             if db.try_execute(*SQLHelper.child_delete(child_id)):
                 db.write()
-                return {"success": True}
             else:
                 response.status_code = 500
                 return {"error": "Failed to delete child"}
         else:
             response.status_code = 403
             return {"error": "unauthorized"}
+    state.accounts.invalidate(child_id, child=True)
+    return {"success": True}
 
 @router.post("/child/update")
 def child_update(child: ChildInfo, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
@@ -104,6 +128,15 @@ def child_update(child: ChildInfo, response: fastapi.Response, user: UserInfo =
 
     child_id = child.id
 
+    hashed = None
+    if getattr(child, "password", None) is not None and str(child.password).strip():
+        # hash before taking the writer so the KDF never runs under the write lock
+        try:
+            hashed = util.hash_password(child.password)
+        except hashing.HashingBusy:
+            response.status_code = 503
+            return {"error": "Server busy, please try again"}
+
     with Database() as db:
         row = db.execute(*SQLHelper.child_get(child_id, user.id)).fetchone()
         if not row:
@@ -115,13 +148,13 @@ def child_update(child: ChildInfo, response: fastapi.Response, user: UserInfo =
             return {"error": "unauthorized"}
 
         fields = {}
-        for field_name in ("parentId", "name", "username", "age", "code", "createdAt", "theme", "friends"):
+        for field_name in ("parentId", "name", "username", "age", "code", "createdAt", "theme"):
             value = getattr(child, field_name, None)
             if value is not None:
                 fields[field_name] = value
 
-        if getattr(child, "password", None) is not None and str(child.password).strip():
-            fields["password"] = util.hash_password(child.password)
+        if hashed is not None:
+            fields["password"] = hashed
 
         if not fields:
             response.status_code = 400
@@ -129,7 +162,12 @@ def child_update(child: ChildInfo, response: fastapi.Response, user: UserInfo =
 
         if db.try_execute(*SQLHelper.child_update_partial(fields, child_id)):
             db.write()
-            return {"success": True}
+        else:
+            response.status_code = 500
+            return {"error": "Failed to update child"}
 
-        response.status_code = 500
-        return {"error": "Failed to update child"}
+    state.accounts.invalidate(child_id, child=True)
+    if "password" in fields:
+        # the old password must not keep the child logged in anywhere
+        state.sessions.revoke_account(child_id)
+    return {"success": True}
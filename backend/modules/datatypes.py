@@ -111,7 +111,6 @@ class ChildInfo(pydantic.BaseModel):
     createdAt: Optional[int] = None
     theme: Optional[str] = "pink"
     password: Optional[str] = None
-    friends: Optional[List[str]] = None
 
 
 class Item(pydantic.BaseModel):
@@ -0,0 +1,60 @@
+import asyncio
+
+import fastapi
+from fastapi.params import Depends
+from fastapi.responses import StreamingResponse
+
+import state
+from modules.datatypes import UserInfo, ChildInfo
+from state import events
+
+router = fastapi.APIRouter()
+
+
+async def _stream(request: fastapi.Request, subscription: events.Subscription, backlog: list | None):
+    try:
+        # tell the browser how long to wait before reconnecting
+        yield "retry: 3000\n\n"
+        if backlog is None:
+            yield events.Event(events.bus.last_id, "resync", {}).encode()
+        elif not backlog:
+            yield events.Event(events.bus.last_id, "ready", {}).encode()
+        for event in backlog or ():
+            yield event.encode()
+
+        while not subscription.overflowed:
+            try:
+                event = await asyncio.wait_for(subscription.queue.get(), events.bus.heartbeat)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                # an SSE comment keeps proxies from timing the connection out
+                yield ": ping\n\n"
+                continue
+            yield event.encode()
+    finally:
+        subscription.close()
+
+
+@router.get("/events")
+async def event_stream(
+    request: fastapi.Request,
+    last_event_id: str | None = fastapi.Header(None),
+    lastEventId: int | None = None,
+    user: UserInfo | ChildInfo = Depends(state.require_user),
+):
+    """Server-sent events for the logged-in account.
+
+    Reconnects resume after the Last-Event-ID header (or ?lastEventId= for
+    clients that can't set it). A "resync" event means some events were lost:
+    call /sync, then carry on with this stream.
+    """
+    resume = lastEventId
+    if last_event_id and last_event_id.strip().isdigit():
+        resume = int(last_event_id.strip())
+    subscription, backlog = events.bus.subscribe(user.id, resume)
+    return StreamingResponse(
+        _stream(request, subscription, backlog),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
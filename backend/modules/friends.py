@@ -1,14 +1,19 @@
 #Sprint 5 new file, backend helping for friends list.
 
 import json
+import time
+
 import fastapi
 from pydantic import BaseModel
 from fastapi import Depends
 
 import state
 from modules.datatypes import UserInfo, ChildInfo
-from state.database import Database
+from modules.game import row_to_profile
+from state.database import AsyncDatabase, Database
 from state import SQLHelper
+from state import events
+from util import etag
 
 router = fastapi.APIRouter()
 
@@ -17,61 +22,11 @@ class FriendRequest(BaseModel):
     friend: str
 
 
-def _load_list(raw_value) -> list[str]:
-    """Load string lists stored in DB.
-
-    Supports:
-      - JSON list strings (["a", "b"])
-      - legacy plain strings ("a")
-      - legacy comma-separated strings ("a, b")
-      - already-parsed lists
-    """
-    if raw_value is None:
-        return []
-
-    if isinstance(raw_value, list):
-        return [str(x).strip() for x in raw_value if str(x).strip()]
-
-    if not isinstance(raw_value, str):
-        return []
-
-    raw = raw_value.strip()
-    if not raw:
-        return []
-
-    try:
-        parsed = json.loads(raw)
-        if isinstance(parsed, list):
-            return [str(x).strip() for x in parsed if str(x).strip()]
-        if isinstance(parsed, str):
-            return [parsed.strip()] if parsed.strip() else []
-    except Exception:
-        pass
-
-    if "," in raw:
-        parts = [p.strip() for p in raw.split(",")]
-        return [p for p in parts if p]
-
-    return [raw]
-
-
-def _dedupe_case_insensitive(values: list[str]) -> list[str]:
-    seen = set()
-    out: list[str] = []
-    for v in values:
-        key = v.lower()
-        if key in seen:
-            continue
-        seen.add(key)
-        out.append(v)
-    return out
-
-
-def _resolve_friend_identifier(friend_raw: str, db: Database) -> tuple[str | None, str | None]:
-    """Validate that the friend exists and return a canonical identifier.
+def _resolve_friend(friend_raw: str, db: Database) -> tuple[dict | None, str | None]:
+    """Validate that the friend exists and return {"id", "identifier"} for it.
 
     Input formats:
-      - "username" (regular user)
+      - "username" (regular user; the email works too)
       - "childUsername#code" (child account)
     """
     value = (friend_raw or "").strip()
@@ -89,9 +44,7 @@ def _resolve_friend_identifier(friend_raw: str, db: Database) -> tuple[str | Non
         if not row:
             return None, 'Friend not found. For a child account, use the exact "username#code".'
 
-        data = dict(row)
-        canonical = f"{(data.get('username') or username).strip()}#{(data.get('code') or code).strip()}"
-        return canonical, None
+        return {"id": row["id"], "identifier": _identifier_from_row(dict(row), "child")}, None
 
     row = db.execute(*SQLHelper.user_get_by_username(value)).fetchone()
     if not row:
@@ -100,20 +53,7 @@ def _resolve_friend_identifier(friend_raw: str, db: Database) -> tuple[str | Non
     if not row:
         return None, 'Friend not found. Use a user username, or for child accounts use "username#code".'
 
-    data = dict(row)
-    canonical = (data.get("username") or value).strip()
-    return canonical, None
-
-
-def _is_self(friend_id: str, user: UserInfo | ChildInfo) -> bool:
-    if isinstance(user, ChildInfo):
-        me_u = (user.username or "").strip()
-        me_c = (user.code or "").strip()
-        me = f"{me_u}#{me_c}" if me_u and me_c else ""
-        return bool(me) and friend_id.lower() == me.lower()
-
-    me = (getattr(user, "username", "") or "").strip()
-    return bool(me) and friend_id.lower() == me.lower()
+    return {"id": row["id"], "identifier": _identifier_from_row(dict(row), "user")}, None
 
 
 def _identifier_from_row(data: dict, account_type: str) -> str:
@@ -134,276 +74,217 @@ def _get_account_by_identifier(identifier: str, db: Database) -> tuple[str | Non
     return ("user", dict(row)) if row else (None, None)
 
 
-def _get_current_account(user: UserInfo | ChildInfo, db: Database) -> tuple[str | None, dict | None]:
-    if isinstance(user, ChildInfo):
-        row = None
-        if getattr(user, "id", None) is not None:
-            row = db.execute(*SQLHelper.child_get_by_id(int(user.id))).fetchone()
-        if not row:
-            row = db.execute(*SQLHelper.child_get_by_code(user.code)).fetchone()
-        return ("child", dict(row)) if row else (None, None)
+def _self_identifier(user: UserInfo | ChildInfo) -> str:
+    return _identifier_from_row(user.model_dump(), "child" if isinstance(user, ChildInfo) else "user")
 
-    row = None
-    if getattr(user, "id", None) is not None:
-        row = db.execute(*SQLHelper.user_get(int(user.id))).fetchone()
-    if not row:
-        row = db.execute(*SQLHelper.user_get_by_email(user.email or user.username)).fetchone()
-    return ("user", dict(row)) if row else (None, None)
 
+def _friend_state(db: Database, account_id: int, exclude_request: int | None = None) -> tuple[list[str], list[str]]:
+    friends = [r["identifier"] for r in db.execute(*SQLHelper.friend_list(account_id)).fetchall() if r["identifier"]]
+    requests = [
+        r["identifier"] for r in db.execute(*SQLHelper.friend_request_list(account_id)).fetchall()
+        if r["identifier"] and r["id"] != exclude_request
+    ]
+    return friends, requests
 
-def _save_friends(db: Database, account_type: str, account_id: int, friends: list[str]):
-    friends_json = json.dumps(_dedupe_case_insensitive(friends))
-    if account_type == "child":
-        return db.try_execute(*SQLHelper.child_set_friends(account_id, friends_json))
-    return db.try_execute(*SQLHelper.user_set_friends(account_id, friends_json))
 
+def _friends_list(db: Database, response, user, if_none_match=None):
+    # a primary key lookup; the counter moves with every edge or rename that changes the lists
+    row = db.execute(*SQLHelper.friend_version(user.id)).fetchone()
+    tag = etag.make("friends", user.id, row[0] if row else 0)
+    if etag.matches(if_none_match, tag):
+        return etag.not_modified(tag)
+    response.headers["ETag"] = tag
+
+    friends, incoming = _friend_state(db, user.id)
+    return {"friends": friends, "requests": incoming}
 
-def _save_incoming_requests(db: Database, account_type: str, account_id: int, requests: list[str]):
-    requests_json = json.dumps(_dedupe_case_insensitive(requests))
-    if account_type == "child":
-        return db.try_execute(*SQLHelper.child_set_incoming_friend_requests(account_id, requests_json))
-    return db.try_execute(*SQLHelper.user_set_incoming_friend_requests(account_id, requests_json))
 
+@router.get("/friends/list")
+async def friends_list(
+    response: fastapi.Response,
+    if_none_match: str | None = fastapi.Header(None),
+    user: UserInfo = Depends(state.require_user),
+):
+    async with AsyncDatabase(readonly=True) as db:
+        return await db.run(_friends_list, response, user, if_none_match)
+
+
+def _friends_add(db: Database, friend_raw, response, user):
+    target, err = _resolve_friend(friend_raw, db)
+    if err:
+        response.status_code = 404 if "not found" in err.lower() else 400
+        return {"error": err}
+
+    if target["id"] == user.id:
+        response.status_code = 400
+        return {"error": "You can't add yourself as a friend."}
 
-def _get_friend_state(data: dict) -> tuple[list[str], list[str]]:
-    friends = _dedupe_case_insensitive(_load_list(data.get("friends")))
-    incoming = _dedupe_case_insensitive(_load_list(data.get("incomingFriendRequests")))
-    return friends, incoming
+    if db.execute(*SQLHelper.friendship_exists(user.id, target["id"])).fetchone():
+        friends, requests = _friend_state(db, user.id)
+        return {"friends": friends, "requests": requests, "message": "You are already friends."}
 
+    if db.execute(*SQLHelper.friend_request_exists(target["id"], user.id)).fetchone():
+        friends, requests = _friend_state(db, user.id)
+        return {"friends": friends, "requests": requests, "message": "Friend request already sent."}
 
-@router.get("/friends/list")
-def friends_list(response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
-        account_type, data = _get_current_account(user, db)
-        if not data:
-            response.status_code = 404
-            return {"error": "user not found"}
+    if not db.try_execute(*SQLHelper.friend_request_create(target["id"], user.id, time.time())):
+        response.status_code = 500
+        return {"error": "Failed to send friend request"}
+    db.write()
+    events.publish_family(db, [target["id"]], "friends.request", {"from": _self_identifier(user)})
 
-        friends, incoming = _get_friend_state(data)
-        return {"friends": friends, "requests": incoming}
+    friends, requests = _friend_state(db, user.id)
+    return {"friends": friends, "requests": requests, "message": "Friend request sent."}
 
 
 @router.post("/friends/add")
-def friends_add(req: FriendRequest, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
+async def friends_add(req: FriendRequest, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
     friend_raw = (req.friend or "").strip()
     if not friend_raw:
         response.status_code = 400
         return {"error": "friend is required"}
 
-    with Database() as db:
-        friend_id, err = _resolve_friend_identifier(friend_raw, db)
-        if err:
-            response.status_code = 404 if "not found" in err.lower() else 400
-            return {"error": err}
-
-        if _is_self(friend_id, user):
-            response.status_code = 400
-            return {"error": "You can't add yourself as a friend."}
-
-        current_type, current_data = _get_current_account(user, db)
-        if not current_data:
-            response.status_code = 404
-            return {"error": "user not found"}
-
-        target_type, target_data = _get_account_by_identifier(friend_id, db)
-        if not target_data:
-            response.status_code = 404
-            return {"error": "friend not found"}
-
-        current_id = _identifier_from_row(current_data, current_type)
-        current_friends, current_requests = _get_friend_state(current_data)
-        target_friends, target_requests = _get_friend_state(target_data)
-
-        current_friend_keys = {f.lower() for f in current_friends}
-        target_friend_keys = {f.lower() for f in target_friends}
-        target_request_keys = {f.lower() for f in target_requests}
-
-        if friend_id.lower() in current_friend_keys:
-            return {
-                "friends": current_friends,
-                "requests": current_requests,
-                "message": "You are already friends."
-            }
-
-        # Self-heal partial friendships so both sides stay in sync.
-        if current_id.lower() in target_friend_keys:
-            current_friends.append(friend_id)
-            _save_friends(db, current_type, current_data["id"], current_friends)
-            db.write()
-            return {
-                "friends": _dedupe_case_insensitive(current_friends),
-                "requests": current_requests,
-                "message": "Friendship synced successfully."
-            }
-
-        if current_id.lower() in target_request_keys:
-            return {
-                "friends": current_friends,
-                "requests": current_requests,
-                "message": "Friend request already sent."
-            }
-
-        target_requests.append(current_id)
-        _save_incoming_requests(db, target_type, target_data["id"], target_requests)
-        db.write()
-
-        return {
-            "friends": current_friends,
-            "requests": current_requests,
-            "message": "Friend request sent."
-        }
+    async with AsyncDatabase() as db:
+        return await db.run(_friends_add, friend_raw, response, user)
+
+
+def _friends_accept(db: Database, friend_raw, response, user):
+    requester, err = _resolve_friend(friend_raw, db)
+    if err:
+        response.status_code = 404 if "not found" in err.lower() else 400
+        return {"error": err}
+
+    # consuming the request and adding both edges happen in one transaction,
+    # so concurrent accepts can't undo each other
+    if not db.try_execute(*SQLHelper.friend_request_delete(user.id, requester["id"])):
+        response.status_code = 500
+        return {"error": "Failed to accept friend request"}
+    if db.cursor().rowcount == 0:
+        response.status_code = 404
+        return {"error": "No pending friend request from that user."}
+
+    if not db.try_execute(*SQLHelper.friendship_create(user.id, requester["id"], time.time())):
+        response.status_code = 500
+        return {"error": "Failed to accept friend request"}
+    db.write()
+    events.publish_family(db, [requester["id"], user.id], "friends.accepted", {"between": [_self_identifier(user), requester["identifier"]]})
+
+    friends, requests = _friend_state(db, user.id)
+    return {"friends": friends, "requests": requests, "message": "Friend request accepted."}
 
 
 @router.post("/friends/accept")
-def friends_accept(req: FriendRequest, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
+async def friends_accept(req: FriendRequest, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
     friend_raw = (req.friend or "").strip()
     if not friend_raw:
         response.status_code = 400
         return {"error": "friend is required"}
 
-    with Database() as db:
-        friend_id, err = _resolve_friend_identifier(friend_raw, db)
-        if err:
-            response.status_code = 404 if "not found" in err.lower() else 400
-            return {"error": err}
-
-        current_type, current_data = _get_current_account(user, db)
-        if not current_data:
-            response.status_code = 404
-            return {"error": "user not found"}
+    async with AsyncDatabase() as db:
+        return await db.run(_friends_accept, friend_raw, response, user)
 
-        requester_type, requester_data = _get_account_by_identifier(friend_id, db)
-        if not requester_data:
-            response.status_code = 404
-            return {"error": "friend not found"}
 
-        current_id = _identifier_from_row(current_data, current_type)
-        current_friends, current_requests = _get_friend_state(current_data)
-        requester_friends, _ = _get_friend_state(requester_data)
+def _friends_decline(db: Database, friend_raw, response, user):
+    """Read side of /friends/decline; returns (body, update) so the write can be submitted on its own."""
+    requester, err = _resolve_friend(friend_raw, db)
+    if err:
+        response.status_code = 404 if "not found" in err.lower() else 400
+        return {"error": err}, None
 
-        request_keys = {f.lower() for f in current_requests}
-        if friend_id.lower() not in request_keys:
-            response.status_code = 404
-            return {"error": "No pending friend request from that user."}
+    if not db.execute(*SQLHelper.friend_request_exists(user.id, requester["id"])).fetchone():
+        response.status_code = 404
+        return {"error": "No pending friend request from that user."}, None
 
-        if friend_id.lower() not in {f.lower() for f in current_friends}:
-            current_friends.append(friend_id)
-        if current_id.lower() not in {f.lower() for f in requester_friends}:
-            requester_friends.append(current_id)
-
-        current_requests = [f for f in current_requests if f.lower() != friend_id.lower()]
-
-        _save_friends(db, current_type, current_data["id"], current_friends)
-        _save_incoming_requests(db, current_type, current_data["id"], current_requests)
-        _save_friends(db, requester_type, requester_data["id"], requester_friends)
-        db.write()
-
-        return {
-            "friends": _dedupe_case_insensitive(current_friends),
-            "requests": _dedupe_case_insensitive(current_requests),
-            "message": "Friend request accepted."
-        }
+    friends, requests = _friend_state(db, user.id, exclude_request=requester["id"])
+    return {
+        "friends": friends,
+        "requests": requests,
+        "message": "Friend request declined."
+    }, SQLHelper.friend_request_delete(user.id, requester["id"])
 
 
 @router.post("/friends/decline")
-def friends_decline(req: FriendRequest, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
+async def friends_decline(req: FriendRequest, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
     friend_raw = (req.friend or "").strip()
     if not friend_raw:
         response.status_code = 400
         return {"error": "friend is required"}
 
-    with Database() as db:
-        friend_id, err = _resolve_friend_identifier(friend_raw, db)
-        if err:
-            response.status_code = 404 if "not found" in err.lower() else 400
-            return {"error": err}
+    async with AsyncDatabase(readonly=True) as db:
+        body, update = await db.run(_friends_decline, friend_raw, response, user)
 
-        current_type, current_data = _get_current_account(user, db)
-        if not current_data:
-            response.status_code = 404
-            return {"error": "user not found"}
+    # one small DELETE, handed to the group commit writer when it's enabled
+    if update is not None and not await AsyncDatabase.try_submit(*update):
+        response.status_code = 500
+        return {"error": "Failed to decline friend request"}
+    return body
 
-        current_friends, current_requests = _get_friend_state(current_data)
-        if friend_id.lower() not in {f.lower() for f in current_requests}:
-            response.status_code = 404
-            return {"error": "No pending friend request from that user."}
 
-        current_requests = [f for f in current_requests if f.lower() != friend_id.lower()]
-        _save_incoming_requests(db, current_type, current_data["id"], current_requests)
-        db.write()
+def _friends_remove(db: Database, friend_raw, response, user):
+    friend, err = _resolve_friend(friend_raw, db)
+    if err:
+        response.status_code = 404 if "not found" in err.lower() else 400
+        return {"error": err}
 
-        return {
-            "friends": current_friends,
-            "requests": _dedupe_case_insensitive(current_requests),
-            "message": "Friend request declined."
-        }
+    if not db.try_execute(*SQLHelper.friendship_delete(user.id, friend["id"])):
+        response.status_code = 500
+        return {"error": "Failed to remove friend"}
+    db.write()
+
+    friends, requests = _friend_state(db, user.id)
+    return {"friends": friends, "requests": requests}
 
 
 @router.post("/friends/remove")
-def friends_remove(req: FriendRequest, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
+async def friends_remove(req: FriendRequest, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
     friend_raw = (req.friend or "").strip()
     if not friend_raw:
         response.status_code = 400
         return {"error": "friend is required"}
 
-    with Database() as db:
-        friend_id, err = _resolve_friend_identifier(friend_raw, db)
-        if err:
-            response.status_code = 404 if "not found" in err.lower() else 400
-            return {"error": err}
+    async with AsyncDatabase() as db:
+        return await db.run(_friends_remove, friend_raw, response, user)
 
-        current_type, current_data = _get_current_account(user, db)
-        if not current_data:
-            response.status_code = 404
-            return {"error": "user not found"}
 
-        current_id = _identifier_from_row(current_data, current_type)
-        current_friends, current_requests = _get_friend_state(current_data)
-        current_friends = [f for f in current_friends if f.lower() != friend_id.lower()]
-        _save_friends(db, current_type, current_data["id"], current_friends)
+def _row_to_friend_profile(row) -> dict:
+    data = dict(row)
+    try:
+        data["stats"] = json.loads(data["stats"]) if data["stats"] else {}
+    except ValueError:
+        data["stats"] = {}
+    profile = {"id": data.pop("profileId"), "coins": data.pop("coins"), "inventory": data.pop("inventory"), "meta": data.pop("meta")}
+    if profile["id"] is not None:
+        data["game_profile"] = row_to_profile(profile)
+    return data
 
-        target_type, target_data = _get_account_by_identifier(friend_id, db)
-        if target_data:
-            target_friends, _ = _get_friend_state(target_data)
-            target_friends = [f for f in target_friends if f.lower() != current_id.lower()]
-            _save_friends(db, target_type, target_data["id"], target_friends)
 
-        db.write()
-        return {"friends": _dedupe_case_insensitive(current_friends), "requests": current_requests}
+def _get_friend_profile(db: Database, username, response, user):
+    _, user_row = _get_account_by_identifier(username.strip(), db)
+    # the join through friendships is the confirmed-friend check
+    row = db.execute(*SQLHelper.friend_profiles(user.id, user_row["id"])).fetchone() if user_row else None
+    if row is None:
+        response.status_code = 403
+        return {"error": "That profile is only available for confirmed friends."}
+
+    return {"user": _row_to_friend_profile(row)}
 
 
 @router.get("/friends/get/{username}")
-def get_friend_profile(username: str, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
+async def get_friend_profile(username: str, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
     if not username or not username.strip():
         response.status_code = 400
         return {"error": "username is required"}
 
-    with Database() as db:
-        current_type, current_data = _get_current_account(user, db)
-        if not current_data:
-            response.status_code = 404
-            return {"error": "user not found"}
-
-        current_friends, _ = _get_friend_state(current_data)
-        if username.strip().lower() not in {f.lower() for f in current_friends}:
-            response.status_code = 403
-            return {"error": "That profile is only available for confirmed friends."}
-
-        if "#" in username:
-            user_row = db.execute(*SQLHelper.child_get_by_username_code(*username.split("#", 1))).fetchone()
-        else:
-            user_row = db.execute(*SQLHelper.user_get_by_username(username.strip())).fetchone()
-        if not user_row:
-            response.status_code = 404
-            return {"error": "user not found"}
-
-        user_obj = dict(user_row)
-        user_id = user_obj.get("id")
-        profile_row = db.execute(*SQLHelper.get_game_profile(user_id)).fetchone()
-        if profile_row:
-            user_obj["game_profile"] = dict(profile_row)
-
-    if "password" in user_obj:
-        del user_obj["password"]
-
-    return {"user": user_obj}
+    async with AsyncDatabase(readonly=True) as db:
+        return await db.run(_get_friend_profile, username, response, user)
+
+
+def _friend_profiles(db: Database, user):
+    return {"friends": [_row_to_friend_profile(row) for row in db.execute(*SQLHelper.friend_profiles(user.id)).fetchall()]}
+
+
+@router.get("/friends/profiles")
+async def friends_profiles(user: UserInfo = Depends(state.require_user)):
+    """Every confirmed friend with their game profile, in one query, for the friends screen."""
+    async with AsyncDatabase(readonly=True) as db:
+        return await db.run(_friend_profiles, user)
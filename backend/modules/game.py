@@ -7,11 +7,16 @@ from fastapi.params import Depends
 import state
 from modules.datatypes import UserInfo, GameProfile
 from state import SQLHelper
-from state.database import Database
+from state.database import AsyncDatabase, Database
+from util import etag
+from util.listing import ListParams
 import typing
 
 router = fastapi.APIRouter()
 
+# the item catalog is the same for everyone and changes only on deploy
+ITEMS_CACHE_CONTROL = "public, max-age=86400"
+
 
 def row_to_profile(row) -> dict:
     data = dict(row)
@@ -60,22 +65,33 @@ def can_access_game_profile(db: Database, user: UserInfo, target_id) -> bool:
 
 
 @router.get("/game/profile")
-def get_game_profile(
+async def get_game_profile(
     response: fastapi.Response,
     userId: int = None,
+    if_none_match: str | None = fastapi.Header(None),
     user: UserInfo = Depends(state.require_user),
 ):
     target_id = userId if userId is not None else user.id
 
-    with Database() as db:
-        if not can_access_game_profile(db, user, target_id):
+    async with AsyncDatabase(readonly=True) as db:
+        if not await db.run(can_access_game_profile, user, target_id):
             response.status_code = 403
             return {"error": "Not allowed to view this game profile"}
 
-        if not db.try_execute(*SQLHelper.get_game_profile(target_id)):
+        if not await db.try_execute(*SQLHelper.game_profile_version(target_id)):
             response.status_code = 500
             return response
-        row = db.cursor().fetchone()
+        version = await db.fetchone()
+        if version is not None:
+            tag = etag.make("game_profile", target_id, version[0])
+            if etag.matches(if_none_match, tag):
+                return etag.not_modified(tag)
+            response.headers["ETag"] = tag
+
+        if not await db.try_execute(*SQLHelper.get_game_profile(target_id)):
+            response.status_code = 500
+            return response
+        row = await db.fetchone()
     if row is None:
         response.status_code = 404
         return response
@@ -85,12 +101,12 @@ def get_game_profile(
 
 
 @router.post("/game/profile")
-def create_game_profile(payload: GameProfile, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
+async def create_game_profile(payload: GameProfile, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
     # allow caller to override userId but default to authenticated user
     sql_and_params = SQLHelper.create_game_profile(payload, user.id)
-    with Database() as db:
-        if db.try_execute(*sql_and_params):
-            db.write()
+    async with AsyncDatabase() as db:
+        if await db.try_execute(*sql_and_params):
+            await db.write()
         else:
             response.status_code = 500
             return response
@@ -100,7 +116,7 @@ def create_game_profile(payload: GameProfile, response: fastapi.Response, user:
 
 
 @router.patch("/game/profile")
-def update_game_profile(
+async def update_game_profile(
     profile: GameProfile,
     response: fastapi.Response,
     userId: int = None,
@@ -114,37 +130,57 @@ def update_game_profile(
 
     target_id = userId if userId is not None else user.id
 
-    with Database() as db:
-        if not can_access_game_profile(db, user, target_id):
+    async with AsyncDatabase(readonly=True) as db:
+        if not await db.run(can_access_game_profile, user, target_id):
             response.status_code = 403
             return {"error": "Not allowed to update this game profile"}
 
-        sql_and_params = SQLHelper.profile_update_partial(updates, target_id)
-        if db.try_execute(*sql_and_params):
-            db.write()
-            response.status_code = 200
-        else:
-            response.status_code = 500
-            return response
+    sql_and_params = SQLHelper.profile_update_partial(updates, target_id)
+    if await AsyncDatabase.try_submit(*sql_and_params):
+        response.status_code = 200
+    else:
+        response.status_code = 500
+        return response
     return {"id": target_id}
 
 @router.get("/game/item/list")
-def list_game_items(response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
-        if not db.try_execute(*SQLHelper.item_list()):
-            response.status_code = 500
-            return response
-        rows = db.cursor().fetchall()
+def list_game_items(
+    response: fastapi.Response,
+    after: int | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+    type: str | None = None,
+    placement: str | None = None,
+    if_none_match: str | None = fastapi.Header(None),
+    user: UserInfo = Depends(state.require_user),
+):
+    # the catalog only changes with state/items.json, so its checksum is the version
+    tag = etag.make("items", Database.items_checksum, after, limit, fields, type, placement)
+    if etag.matches(if_none_match, tag):
+        return etag.not_modified(tag, ITEMS_CACHE_CONTROL)
+
+    try:
+        page = ListParams("items", after, limit, fields)
+        with Database(readonly=True) as db:
+            query = page.query(db, SQLHelper.item_list(), [("type = ?", type), ("placement = ?", placement)])
+            if not db.try_execute(*query):
+                response.status_code = 500
+                return response
+            rows = db.cursor().fetchall()
+    except ValueError as exc:
+        response.status_code = 400
+        return {"error": str(exc)}
 
     out = []
     for row in rows:
         out.append(row_to_item(row))
     response.status_code = 200
-    return {"items": out}
+    response.headers.update(etag.headers(tag, ITEMS_CACHE_CONTROL))
+    return {"items": out, **page.page(rows[-1]["id"] if rows else None, len(rows))}
 
 @router.get("/game/item/{id}")
 def get_game_item(id: int, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
+    with Database(readonly=True) as db:
         if not db.try_execute(*SQLHelper.get_item(id)):
             response.status_code = 500
             return response
@@ -8,10 +8,11 @@ from fastapi.params import Depends
 from pydantic import BaseModel, Field
 
 import state
-from modules.action_plans import row_to_plan
+from modules.action_plans import replace_plan_completions, row_to_plan
 from modules.datatypes import ActionPlanInfo, GoalInfo, UserInfo
 from state import SQLHelper
 from state.database import Database
+from util.listing import ListParams
 
 router = fastapi.APIRouter()
 
@@ -226,7 +227,7 @@ def goal_delete(goal_id: int, response: fastapi.Response, user: UserInfo = Depen
 
 @router.get("/goals/get/{goal_id}")
 def goal_get(goal_id: int, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
+    with Database(readonly=True) as db:
         if not db.try_execute(*SQLHelper.goal_get(goal_id)):
             response.status_code = 500
             return response
@@ -358,11 +359,21 @@ def goal_bundle_save(
                     ):
                         response.status_code = 500
                         return {"error": "Failed to update action plan"}
+                    if "completedDates" in updates and not replace_plan_completions(
+                        db, int(incoming_id), updates["completedDates"]
+                    ):
+                        response.status_code = 500
+                        return {"error": "Failed to update action plan"}
                     incoming_ids.add(incoming_id)
                 else:
                     if not db.try_execute(*SQLHelper.action_plan_create(plan_info)):
                         response.status_code = 500
                         return {"error": "Failed to create action plan"}
+                    if plan_info.completedDates and not replace_plan_completions(
+                        db, db.created_id(), plan_info.completedDates
+                    ):
+                        response.status_code = 500
+                        return {"error": "Failed to create action plan"}
 
             for existing_id in existing_by_id:
                 if existing_id in incoming_ids:
@@ -398,17 +409,34 @@ def goal_bundle_save(
 
 
 @router.get("/goals/list")
-def goal_list(response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
-        if not db.try_execute(*SQLHelper.goal_list(user.id)):
-            response.status_code = 500
-            return response
-        rows = db.cursor().fetchall()
+def goal_list(
+    response: fastapi.Response,
+    after: int | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+    assigneeId: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    user: UserInfo = Depends(state.require_user),
+):
+    try:
+        page = ListParams("goals", after, limit, fields, since, until)
+        with Database(readonly=True) as db:
+            query = page.query(db, SQLHelper.goal_list(user.id), [
+                ("assigneeId = ?", assigneeId),
+            ])
+            if not db.try_execute(*query):
+                response.status_code = 500
+                return response
+            rows = db.cursor().fetchall()
+    except ValueError as exc:
+        response.status_code = 400
+        return {"error": str(exc)}
     out = []
     for row in rows:
-        out.append(row_to_goal(row))
+        out.append(page.project(row_to_goal(row)))
     response.status_code = 200
-    return {"goals": out}
+    return {"goals": out, **page.page(rows[-1]["id"] if rows else None, len(rows))}
 
 
 def row_to_goal(row) -> dict:
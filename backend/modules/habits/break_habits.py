@@ -43,7 +43,7 @@ def break_habit_delete(habit_id: int, response: fastapi.Response, user: UserInfo
 @util.check_habit_ownership("break")
 @router.get("/habit/break/get/{habit_id}")
 def break_habit_get(habit_id: int, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
+    with Database(readonly=True) as db:
         if not db.try_execute(*SQLHelper.break_get(habit_id)):
             response.status_code = 500
             return response
@@ -75,7 +75,7 @@ def break_habit_update(info: BreakHabitInfo, response: fastapi.Response, user: U
 
 @router.get("/habit/break/list")
 def break_habit_list(response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
+    with Database(readonly=True) as db:
         if not db.try_execute(*SQLHelper.break_list(user.id)):
             response.status_code = 500
             return response
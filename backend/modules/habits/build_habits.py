@@ -8,6 +8,7 @@ import util
 from modules.datatypes import BuildHabitInfo, UserInfo
 from state import SQLHelper
 from state.database import Database
+from util.listing import ListParams
 
 router = fastapi.APIRouter()
 
@@ -43,7 +44,7 @@ def build_habit_delete(habit_id: int, response: fastapi.Response, user: UserInfo
 @util.check_habit_ownership("build")
 @router.get("/habit/build/get/{habit_id}")
 def build_habit_get(habit_id: int, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
+    with Database(readonly=True) as db:
         if not db.try_execute(*SQLHelper.build_get(habit_id)):
             response.status_code = 500
             return response
@@ -69,24 +70,33 @@ def build_habit_update(info: BuildHabitInfo, response: fastapi.Response, user: U
         response.status_code = 400
         return {"error": "habit id required in payload"}
     habit_id = info.id
-    with Database() as db:
-        if db.try_execute(*SQLHelper.build_update(info, habit_id)):
-            response.status_code = 200
-            db.write()
-        else:
-            response.status_code = 500
-            return response
+    if Database.try_submit(*SQLHelper.build_update(info, habit_id)):
+        response.status_code = 200
+    else:
+        response.status_code = 500
+        return response
     return {"id": habit_id}
 
 
 @util.check_habit_ownership("build")
 @router.get("/habit/build/list")
-def build_habit_list(response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
-        if not db.try_execute(*SQLHelper.build_list(user.id)):
-            response.status_code = 500
-            return response
-        rows = db.cursor().fetchall()
+def build_habit_list(
+    response: fastapi.Response,
+    after: int | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+    user: UserInfo = Depends(state.require_user),
+):
+    try:
+        page = ListParams("build_habits", after, limit, fields)
+        with Database(readonly=True) as db:
+            if not db.try_execute(*page.query(db, SQLHelper.build_list(user.id))):
+                response.status_code = 500
+                return response
+            rows = db.cursor().fetchall()
+    except ValueError as exc:
+        response.status_code = 400
+        return {"error": str(exc)}
     out = []
     for row in rows:
         data = dict(row)
@@ -97,4 +107,4 @@ def build_habit_list(response: fastapi.Response, user: UserInfo = Depends(state.
                 data["steps"] = [data["steps"]]
         out.append(data)
     response.status_code = 200
-    return {"habits": out}
\ No newline at end of file
+    return {"habits": out, **page.page(rows[-1]["id"] if rows else None, len(rows))}
\ No newline at end of file
@@ -1,25 +1,37 @@
-import uuid
 import fastapi
+from fastapi.concurrency import run_in_threadpool
 
 import state
 import util
 from modules.datatypes import UserInfo, ChildInfo
 from state import SQLHelper
-from state.database import Database
+from state.database import AsyncDatabase
+from util import hashing
 
 router = fastapi.APIRouter()
 
+BUSY = {"error": "Too many logins right now, please try again"}
+
 @router.post("/login")
-def login(user: UserInfo, response: fastapi.Response):
-    key = uuid.uuid4().hex
-    full_user = util.get_full_user(user)
+async def login(user: UserInfo, response: fastapi.Response):
+    async with AsyncDatabase(readonly=True) as db:
+        full_user = await db.run(util.find_user, user.username)
     if full_user is None:
         response.status_code = 404
         return {"error": "User not found"}
-    if full_user.password != util.hash_password(user.password):
+    # the KDF runs in the hashing process pool; this only awaits it
+    try:
+        matches, upgraded = await hashing.hasher.verify_async(user.password, full_user.password)
+    except hashing.HashingBusy:
+        response.status_code = 503
+        return BUSY
+    if not matches:
         response.status_code = 400
         return {"error": "invalid credentials"}
-    state.sessions[key] = full_user
+    if upgraded:
+        if await AsyncDatabase.try_submit(*SQLHelper.user_update_partial({"password": upgraded}, full_user.id)):
+            state.accounts.invalidate(full_user.id, child=False)
+    key = await run_in_threadpool(state.sessions.issue, full_user)
     response.set_cookie(key="session_token", value=key)
     full_user.password = ""
 
@@ -27,8 +39,7 @@ def login(user: UserInfo, response: fastapi.Response):
 
 #Sprint 5 addition: Making the username of the child required:
 @router.post("/login/child")
-def login_child(child_info: ChildInfo, response: fastapi.Response):
-    key = uuid.uuid4().hex
+async def login_child(child_info: ChildInfo, response: fastapi.Response):
     raw = (child_info.username or "").strip()
 
     if "#" not in raw:
@@ -48,8 +59,9 @@ def login_child(child_info: ChildInfo, response: fastapi.Response):
         response.status_code = 400
         return {"error": "password is required"}
 
-    with Database() as db:
-        row = db.execute(*SQLHelper.child_get_by_username_code(username, code)).fetchone()
+    async with AsyncDatabase(readonly=True) as db:
+        await db.try_execute(*SQLHelper.child_get_by_username_code(username, code))
+        row = await db.fetchone()
 
     #Child not found
     full_child = util.get_child_from_row(row)
@@ -59,58 +71,82 @@ def login_child(child_info: ChildInfo, response: fastapi.Response):
 
     #Password check
     stored_hash = dict(row).get("password") if row else None
-    if stored_hash != util.hash_password(child_info.password):
+    try:
+        matches, upgraded = await hashing.hasher.verify_async(child_info.password, stored_hash)
+    except hashing.HashingBusy:
+        response.status_code = 503
+        return BUSY
+    if not matches:
         response.status_code = 401
         return {"error": "Invalid password"}
+    if upgraded:
+        if await AsyncDatabase.try_submit(*SQLHelper.child_update_partial({"password": upgraded}, full_child.id)):
+            state.accounts.invalidate(full_child.id, child=True)
 
     #Scrub passwords:
     full_child.password = ""
 
-    state.sessions[key] = full_child
+    key = await run_in_threadpool(state.sessions.issue, full_child)
     response.set_cookie(key="session_token", value=key)
     return {"success": True, "child": full_child}
 
 @router.post("/logout")
 def logout(response: fastapi.Response, session_token: str = fastapi.Cookie(None)):
-    if session_token in state.sessions:
-        del state.sessions[session_token]
+    state.sessions.revoke(session_token)
     response.delete_cookie(key="session_token")
     return { "success": True }
 
-@router.post("/signup")
-def signup(user: UserInfo, response: fastapi.Response):
-    with Database() as db:
-        new_id = db.create_new_id()
-        if new_id is None:
-            response.status_code = 500
-            return {"error": "Failed to create user id"}
-        user.id = new_id
-        if not db.execute(*SQLHelper.user_check(user)).fetchone():
-            password = util.hash_password(user.password)
-            if db.try_execute(*SQLHelper.user_create(user, password)):
-                response.status_code = 200
-                db.write()
-            else:
-                response.status_code = 500
-                return {"error": "failed to create user"}
+def _create_user(db, user: UserInfo, password: str, response: fastapi.Response):
+    new_id = db.create_new_id()
+    if new_id is None:
+        response.status_code = 500
+        return {"error": "Failed to create user id"}
+    user.id = new_id
+    if not db.execute(*SQLHelper.user_check(user)).fetchone():
+        if db.try_execute(*SQLHelper.user_create(user, password)):
+            response.status_code = 200
+            db.write()
         else:
+            response.status_code = 500
+            return {"error": "failed to create user"}
+    else:
+        response.status_code = 400
+        return {"error": "user already exists"}
+    return None
+
+
+@router.post("/signup")
+async def signup(user: UserInfo, response: fastapi.Response):
+    # cheap duplicate check first so taken names don't cost a KDF run
+    async with AsyncDatabase(readonly=True) as db:
+        await db.try_execute(*SQLHelper.user_check(user))
+        if await db.fetchone():
             response.status_code = 400
             return {"error": "user already exists"}
 
-    key = uuid.uuid4().hex
+    # hash before taking the writer so the KDF never runs under the write lock
+    try:
+        password = await hashing.hasher.hash_async(user.password)
+    except hashing.HashingBusy:
+        response.status_code = 503
+        return BUSY
+
+    async with AsyncDatabase() as db:
+        error = await db.run(_create_user, user, password, response)
+    if error is not None:
+        return error
 
-    with Database() as db:
-        row = db.execute(*SQLHelper.user_get_by_email(user.email)).fetchone()
+    async with AsyncDatabase(readonly=True) as db:
+        await db.try_execute(*SQLHelper.user_get_by_email(user.email))
+        row = await db.fetchone()
 
     if not row:
         response.status_code = 500
         return {"error": "failed to load created user"}
 
-    data = dict(row)
-    data['friends'] = util._parse_friends(data.get('friends'))
-    full_user = UserInfo.model_validate(data)
+    full_user = UserInfo.model_validate(dict(row))
 
-    state.sessions[key] = full_user
+    key = await run_in_threadpool(state.sessions.issue, full_user)
     response.set_cookie(key="session_token", value=key)
     full_user.password = ""
     return {"success": True, "user": full_user}
@@ -0,0 +1,92 @@
+import time
+
+import fastapi
+from fastapi.params import Depends
+
+import state
+import util
+from modules.action_plans import row_to_plan
+from modules.datatypes import UserInfo, ChildInfo
+from modules.game import row_to_profile
+from modules.goals import row_to_goal
+from modules.tasks import row_to_task
+from state import SQLHelper
+from state.database import Database
+
+router = fastapi.APIRouter()
+
+# tombstones this many versions behind the clock are dropped; main.py sets it from SYNC_TOMBSTONE_VERSIONS
+TOMBSTONE_VERSIONS = 100_000
+PRUNE_INTERVAL = 600.0
+_last_prune = 0.0
+
+
+def _row_to_child(row) -> dict:
+    child = util.get_child_from_row(row)
+    child.password = ""
+    return child.model_dump()
+
+
+# the same shapes the list endpoints return
+SYNC_ROWS = {
+    "tasks": row_to_task,
+    "goals": row_to_goal,
+    "action_plans": row_to_plan,
+    "children": _row_to_child,
+    "game_profiles": row_to_profile,
+}
+
+
+@router.get("/sync")
+def sync(response: fastapi.Response, since: int = 0, user: UserInfo | ChildInfo = Depends(state.require_user)):
+    """Everything the account can see that changed after `since`.
+
+    Returns {"version": N, "changes": {table: [rows]}, "deleted": {table: [ids]}},
+    leaving out tables with nothing to report. Pass N back as `since` on the
+    next poll; since=0 returns every visible row. Apply "deleted" before
+    "changes": a row reassigned away and back can show up in both.
+
+    Deletions are only remembered for TOMBSTONE_VERSIONS versions. A `since`
+    older than that gets every visible row, as for since=0, plus
+    "resync": true: the client replaces what it has rather than merging.
+    """
+    if since < 0:
+        response.status_code = 400
+        return {"error": "since must not be negative"}
+
+    family = not isinstance(user, ChildInfo)
+    changes, deleted = {}, {}
+    with Database(readonly=True) as db:
+        # read the clock first: anything committed after it is sent again next time, never skipped
+        row = db.execute(*SQLHelper.sync_version()).fetchone()
+        version, pruned = (row[0], row[1]) if row else (0, 0)
+        if since >= version:
+            return {"version": version, "changes": {}, "deleted": {}}
+        resync = 0 < since < pruned
+        if resync:
+            since = 0
+
+        for table, convert in SYNC_ROWS.items():
+            rows = db.execute(*SQLHelper.sync_changed_rows(table, user.id, family, since)).fetchall()
+            if rows:
+                changes[table] = [convert(r) for r in rows]
+            ids = [r[0] for r in db.execute(*SQLHelper.sync_deleted_ids(table, user.id, family, since)).fetchall()]
+            if ids:
+                deleted[table] = ids
+
+    _prune_tombstones()
+    response.status_code = 200
+    body = {"version": version, "changes": changes, "deleted": deleted}
+    if resync:
+        body["resync"] = True
+    return body
+
+
+def _prune_tombstones():
+    global _last_prune
+    now = time.monotonic()
+    if now - _last_prune < PRUNE_INTERVAL:
+        return
+    _last_prune = now
+    # fire and forget, like the session purge: a lost prune just waits for the next interval
+    Database.submit(*SQLHelper.sync_tombstones_prune(TOMBSTONE_VERSIONS))
@@ -6,8 +6,10 @@ from fastapi.params import Depends
 
 import state
 from modules.datatypes import TaskInfo, UserInfo, ChildInfo
-from state import SQLHelper
-from state.database import Database
+from state import SQLHelper, events
+from state.database import AsyncDatabase, Database
+from util import daybitmap, etag
+from util.listing import ListParams
 
 router = fastapi.APIRouter()
 
@@ -24,6 +26,9 @@ def task_create(
                 response.status_code = 200
                 db.write()
                 task_id = db.created_id()
+                # a provider's task waits for the parent's approval
+                event = "task.pending" if info.needsApproval else "task.created"
+                events.publish_family(db, [info.assigneeId, info.createdById], event, {"id": task_id})
                 return {"id": task_id}
 
             response.status_code = 500
@@ -62,7 +67,7 @@ def task_get(
     user: UserInfo = Depends(state.require_user),
 ):
     try:
-        with Database() as db:
+        with Database(readonly=True) as db:
             if not db.try_execute(*SQLHelper.task_get(task_id)):
                 response.status_code = 500
                 return {"error": "Failed to fetch task"}
@@ -102,14 +107,20 @@ def task_update(
 
         sql_and_params = SQLHelper.task_update_partial(updates, task_id)
 
-        with Database() as db:
-            if db.try_execute(*sql_and_params):
-                response.status_code = 200
-                db.write()
-                return {"id": task_id}
+        # single small UPDATE, so let it ride the group commit when that's enabled
+        if Database.try_submit(*sql_and_params):
+            if events.bus.active:
+                with Database(readonly=True) as db:
+                    row = db.execute(*SQLHelper.task_get(task_id)).fetchone()
+                    if row is not None:
+                        # clearing needsApproval is how a parent approves a pending task
+                        event = "task.approved" if updates.get("needsApproval") is False else "task.updated"
+                        events.publish_family(db, [row["assigneeId"], row["createdById"]], event, {"id": task_id})
+            response.status_code = 200
+            return {"id": task_id}
 
-            response.status_code = 500
-            return {"error": "Failed to update task"}
+        response.status_code = 500
+        return {"error": "Failed to update task"}
     except Exception as exc:
         traceback.print_exc()
         response.status_code = 500
@@ -117,82 +128,81 @@ def task_update(
 
 
 @router.get("/task/list")
-def task_list(
+async def task_list(
     response: fastapi.Response,
+    after: int | None = None,
+    limit: int | None = None,
+    fields: str | None = None,
+    status: str | None = None,
+    assigneeId: str | None = None,
+    since: str | None = None,
+    until: str | None = None,
+    if_none_match: str | None = fastapi.Header(None),
     user: UserInfo | ChildInfo = Depends(state.require_user),
 ):
     try:
-        if isinstance(user, ChildInfo):
-            return task_list_child(response, user)
-
-        out = []
-
-        with Database() as db:
-            if db.try_execute(*SQLHelper.task_list(user.id)):
-                rows = db.cursor().fetchall() or []
-                for row in rows:
-                    try:
-                        out.append(row_to_task(row))
-                    except Exception:
-                        traceback.print_exc()
-            else:
-                print("task_list: failed to fetch own user tasks for user.id =", user.id)
-
-            children = []
-            try:
-                if db.try_execute(*SQLHelper.child_list(user.id)):
-                    children = db.cursor().fetchall() or []
-                else:
-                    print("task_list: child_list query failed for user.id =", user.id)
-            except Exception:
-                traceback.print_exc()
-
-            for child in children:
-                try:
-                    child_id = safe_get(child, "id")
-                    if child_id is None:
-                        continue
-
-                    if not db.try_execute(*SQLHelper.child_task_list(int(child_id))):
-                        print("task_list: child_task_list query failed for child_id =", child_id)
-                        continue
-
-                    child_rows = db.cursor().fetchall() or []
-                    for row in child_rows:
-                        try:
-                            out.append(row_to_task(row))
-                        except Exception:
-                            traceback.print_exc()
-                except Exception:
-                    traceback.print_exc()
-                    continue
+        page = ListParams("tasks", after, limit, fields, since, until)
+    except ValueError as exc:
+        response.status_code = 400
+        return {"error": str(exc)}
+    where = [
+        ("status = ?", status),
+        ("assigneeId = ?", assigneeId),
+    ]
 
-        response.status_code = 200
-        return {"tasks": out}
+    try:
+        family = not isinstance(user, ChildInfo)
+        # versions are read before the tasks: a write in between only makes the tag stale, never the body
+        async with AsyncDatabase(readonly=True) as db:
+            versions = await db.run(_task_versions, user.id, family)
+        tag = etag.make("tasks", user.id, family, versions, after, limit, fields, status, assigneeId, since, until)
+        if etag.matches(if_none_match, tag):
+            return etag.not_modified(tag)
+
+        if not family:
+            response.headers["ETag"] = tag
+            return await task_list_child(response, user, page, where)
+
+        async with AsyncDatabase(readonly=True) as db:
+            body = await db.run(_encode_task_query, SQLHelper.family_task_list(user.id), page, where)
+
+        if body is None:
+            response.status_code = 500
+            return {"error": "Failed to fetch tasks"}
+        return tasks_response(body, etag.headers(tag))
 
+    except ValueError as exc:
+        response.status_code = 400
+        return {"error": str(exc)}
     except Exception as exc:
         traceback.print_exc()
         response.status_code = 500
         return {"error": f"task_list crashed: {str(exc)}"}
 
 
-def task_list_child(response: fastapi.Response, user: ChildInfo):
+async def task_list_child(response: fastapi.Response, user: ChildInfo, page: ListParams | None = None, where=()):
     try:
         if user.id is None:
             response.status_code = 400
             return {"error": "Child id missing from session"}
 
-        with Database() as db:
-            if not db.try_execute(*SQLHelper.child_task_list(int(user.id))):
+        page = page or ListParams("tasks")
+        async with AsyncDatabase(readonly=True) as db:
+            query = await db.run(page.query, SQLHelper.child_task_list(int(user.id)), where)
+            if not await db.try_execute(*query):
                 response.status_code = 500
                 return {"error": "Failed to fetch child tasks"}
 
-            rows = db.cursor().fetchall()
+            rows = await db.fetchall()
 
-        out = [row_to_task(row) for row in (rows or [])]
+        rows = rows or []
+        out = [page.project(row_to_task(row)) for row in rows]
         response.status_code = 200
-        return {"tasks": out}
+        return {"tasks": out, **page.page(rows[-1]["id"] if rows else None, len(rows))}
 
+    except ValueError as exc:
+        response.status_code = 400
+        return {"error": str(exc)}
     except Exception as exc:
         traceback.print_exc()
         response.status_code = 500
@@ -205,29 +215,13 @@ def task_list_pending(
     user: UserInfo = Depends(state.require_user),
 ):
     try:
-        tasks = []
+        with Database(readonly=True) as db:
+            body = _encode_task_query(db, SQLHelper.family_task_list_pending(user.id))
 
-        with Database() as db:
-            if not db.try_execute(*SQLHelper.child_list(user.id)):
-                response.status_code = 500
-                return {"error": "Failed to fetch child list"}
-
-            child_rows = db.cursor().fetchall()
-
-            for child in child_rows or []:
-                child_id = safe_get(child, "id")
-                if child_id is None:
-                    continue
-
-                if not db.try_execute(*SQLHelper.task_list_pending(int(child_id))):
-                    continue
-
-                pending_rows = db.cursor().fetchall()
-                for row in pending_rows or []:
-                    tasks.append(row_to_task(row))
-
-        response.status_code = 200
-        return {"tasks": tasks}
+        if body is None:
+            response.status_code = 500
+            return {"error": "Failed to fetch pending tasks"}
+        return tasks_response(body)
 
     except Exception as exc:
         traceback.print_exc()
@@ -241,7 +235,7 @@ def get_child_tasks(
     user: ChildInfo = Depends(state.require_user),
 ):
     try:
-        with Database() as db:
+        with Database(readonly=True) as db:
             if not db.try_execute(
                 "SELECT * FROM tasks WHERE needsApproval = 0 AND assigneeId = ?",
                 (user.id,),
@@ -261,16 +255,40 @@ def get_child_tasks(
         return {"error": f"get_child_tasks crashed: {str(exc)}"}
 
 
-def safe_get(row, key, default=None):
-    try:
-        if isinstance(row, dict):
-            return row.get(key, default)
-        return row[key]
-    except Exception:
+def _encode_task_query(db: Database, query: tuple[str, tuple], page: ListParams | None = None, where=()) -> bytes | None:
+    """Run a task query and encode {"tasks": [...]} straight off the cursor.
+
+    Rows are converted and serialized one at a time on the database thread, so
+    no list of sqlite rows is built and FastAPI doesn't re-walk the result.
+    With `page`, the query is filtered/paged first and `"next"` is appended.
+    """
+    if page is not None:
+        query = page.query(db, query, where)
+    if not db.try_execute(*query):
+        return None
+    parts = []
+    last_id, count = None, 0
+    for row in db.cursor():
+        last_id, count = row["id"], count + 1
         try:
-            return getattr(row, key, default)
+            task = row_to_task(row)
+            if page is not None:
+                task = page.project(task)
+            parts.append(json.dumps(task, ensure_ascii=False, separators=(",", ":")))
         except Exception:
-            return default
+            traceback.print_exc()
+    body = '{"tasks":[' + ",".join(parts) + "]"
+    if page is not None and page.limit is not None:
+        body += ',"next":' + json.dumps(page.page(last_id, count)["next"])
+    return (body + "}").encode()
+
+
+def _task_versions(db: Database, account_id: int, family: bool) -> list[tuple]:
+    return [tuple(row) for row in db.execute(*SQLHelper.task_list_version(account_id, family)).fetchall()]
+
+
+def tasks_response(body: bytes, headers: dict | None = None) -> fastapi.Response:
+    return fastapi.Response(content=body, media_type="application/json", headers=headers)
 
 
 def row_to_task(row) -> dict:
@@ -288,11 +306,9 @@ def row_to_task(row) -> dict:
         except Exception:
             data["replacements"] = [data["replacements"]]
 
-    if data.get("completedDates"):
-        try:
-            data["completedDates"] = json.loads(data["completedDates"])
-        except Exception:
-            data["completedDates"] = [data["completedDates"]]
+    if "completedDays" in data or data.get("completedDates"):
+        data["completedDates"] = daybitmap.from_row(data).iso_list()
+        data.pop("completedDays", None)
 
     if data.get("frequency"):
         try:
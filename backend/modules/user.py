@@ -5,9 +5,11 @@ import fastapi
 from fastapi.params import Depends
 
 import state
+import util
 from modules.datatypes import UserInfo, ChildInfo
 from state import SQLHelper
 from state.database import Database
+from util import hashing
 
 router = fastapi.APIRouter()
 
@@ -38,25 +40,18 @@ def user_delete(user_id: int, response: fastapi.Response):
         else:
             response.status_code = 500
             return response
+    state.accounts.invalidate(user_id, child=False)
     return {"success": True}
 
 
 @router.get("/user/get")
 def user_get_current(response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
-    with Database() as db:
-        if isinstance(user, ChildInfo):
-            if not db.try_execute(*SQLHelper.child_get_by_code(user.code)):
-                response.status_code = 500
-                return response
-        elif not db.try_execute(*SQLHelper.user_get_by_email(user.email)):
-            response.status_code = 500
-            return response
-        row = db.cursor().fetchone()
+    row = state.accounts.cache.row(user.id, isinstance(user, ChildInfo))
     if row is None:
         response.status_code = 404
         return response
     response.status_code = 200
-    return json.dumps(dict(row))
+    return json.dumps(row)
 
 @router.post("/user/update")
 def user_update(info: UserInfo, response: fastapi.Response, user: UserInfo = Depends(state.require_user)):
@@ -65,6 +60,14 @@ def user_update(info: UserInfo, response: fastapi.Response, user: UserInfo = Dep
         response.status_code = 400
         return {"error": "no fields to update"}
 
+    if updates.get("password"):
+        # never store the plain password
+        try:
+            updates["password"] = util.hash_password(updates["password"])
+        except hashing.HashingBusy:
+            response.status_code = 503
+            return {"error": "Server busy, please try again"}
+
     sql_and_params = SQLHelper.user_update_partial(updates, user.id)
     with Database() as db:
         if db.try_execute(*sql_and_params):
@@ -73,4 +76,9 @@ def user_update(info: UserInfo, response: fastapi.Response, user: UserInfo = Dep
         else:
             response.status_code = 500
             return response
+    state.accounts.invalidate(user.id, child=False)
+    if "password" in updates:
+        # log out every other session, then give this client a fresh one
+        state.sessions.revoke_account(user.id)
+        response.set_cookie(key="session_token", value=state.sessions.issue(user))
     return {"id": user.id}
\ No newline at end of file
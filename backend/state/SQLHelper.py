@@ -2,7 +2,9 @@ import json
 
 from modules.datatypes import ActionPlanInfo, GoalInfo, UserInfo, BuildHabitInfo, BreakHabitInfo, TaskInfo, FormedHabitInfo, ChildInfo, \
     GameProfile
+from state import migrations
 from state.database import Database
+from util.daybitmap import DayBitmap
 
 
 def formed_habit_create(info: FormedHabitInfo):
@@ -148,14 +150,14 @@ def user_get(user_id: int):
     If callers need the user's habits, use `user_get_with_habits`.
     """
     query = (
-        "SELECT id, username, email, password, name, age, role, createdAt, type, theme, profilePic, stats, code, meta, friends, incomingFriendRequests "
+        "SELECT id, username, email, password, name, age, role, createdAt, type, theme, profilePic, stats, code, meta "
         "FROM users WHERE id = ?"
     )
     return query, (user_id,)
 
 def user_get_by_email(email: str):
     query = (
-        "SELECT id, username, email, password, name, age, role, createdAt, type, theme, profilePic, stats, code, meta, friends, incomingFriendRequests "
+        "SELECT id, username, email, password, name, age, role, createdAt, type, theme, profilePic, stats, code, meta "
         "FROM users WHERE email = ? OR username = ?"
     )
     return query, (email, email)
@@ -190,23 +192,13 @@ def user_get_by_username(username: str):
     query = "SELECT * FROM users WHERE lower(username) = lower(?)"
     return query, (username,)
 
-#Sprint 5 change: setting friendslist for user:
-def user_set_friends(user_id: int, friends_json: str):
-    query = "UPDATE users SET friends = ? WHERE id = ?"
-    return query, (friends_json, user_id)
-
-#Sprint 7 addition:
-def user_set_incoming_friend_requests(user_id: int, requests_json: str):
-    query = "UPDATE users SET incomingFriendRequests = ? WHERE id = ?"
-    return query, (requests_json, user_id)
-
 def task_create(info: TaskInfo):
     query = (
-        "INSERT INTO tasks (assigneeId, assigneeName, title, notes, taskType, steps, habitToBreak, replacements, frequency, streak, completedDates, status, createdAt, createdById, createdByName, createdByRole, needsApproval, targetType, targetName, meta) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        "INSERT INTO tasks (assigneeId, assigneeName, title, notes, taskType, steps, habitToBreak, replacements, frequency, streak, completedDays, status, createdAt, createdById, createdByName, createdByRole, needsApproval, targetType, targetName, meta) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
     )
     steps_json = json.dumps(info.steps) if info.steps else None
     replacements_json = json.dumps(info.replacements) if info.replacements else None
-    completed_json = json.dumps(info.completedDates) if info.completedDates else None
+    completed_days = DayBitmap.from_iso(info.completedDates).to_blob()
     freq_json = json.dumps(info.frequency) if info.frequency is not None else None
     meta_json = json.dumps(info.meta) if info.meta else None
     needs = 1 if info.needsApproval else 0
@@ -221,7 +213,7 @@ def task_create(info: TaskInfo):
         replacements_json,
         freq_json,
         info.streak,
-        completed_json,
+        completed_days,
         info.status,
         info.createdAt,
         info.createdById,
@@ -244,6 +236,17 @@ def task_get(task_id: int):
     return query, (task_id,)
 
 
+def _completed_days_update(fields: dict) -> dict:
+    """Route a client's completedDates (ISO dict or list) to the completedDays bitmap."""
+    if "completedDates" not in fields:
+        return fields
+    fields = dict(fields)
+    fields["completedDays"] = DayBitmap.from_iso(fields.pop("completedDates")).to_blob()
+    # clears JSON a row may still carry from before the bitmap
+    fields["completedDates"] = None
+    return fields
+
+
 def task_update_partial(fields: dict, task_id: int):
     """
     Build a parameterized UPDATE for only the provided task fields.
@@ -252,6 +255,7 @@ def task_update_partial(fields: dict, task_id: int):
     if not fields:
         raise ValueError("no fields to update")
 
+    fields = _completed_days_update(fields)
     set_clauses = []
     params = []
     for col, val in fields.items():
@@ -278,6 +282,19 @@ def child_task_list(child_id: int):
     query = "SELECT * FROM tasks WHERE assigneeId = ?"
     return query, (child_id,)
 
+def family_task_list(parent_id: int):
+    """The parent's own tasks followed by every child's, in one statement.
+
+    tasks.assigneeId is TEXT, so children.id is cast to keep the join on idx_tasks_assigneeId.
+    """
+    query = (
+        "SELECT * FROM tasks WHERE assigneeId = ? "
+        "UNION ALL "
+        "SELECT tasks.* FROM children JOIN tasks ON tasks.assigneeId = CAST(children.id AS TEXT) "
+        "WHERE children.parentId = ?"
+    )
+    return query, (parent_id, parent_id)
+
 #Sprint 5 Change: Including Username when creating child as well as a password:
 def child_create(id_: int, child: ChildInfo, hashed_password: str):
     query = "INSERT INTO children (parentId, id, name, username, age, code, password, createdAt, theme) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
@@ -319,7 +336,7 @@ def child_update_partial(fields: dict, child_id: int):
     if not fields:
         raise ValueError("no fields to update")
 
-    allowed = {"parentId", "name", "username", "age", "code", "createdAt", "theme", "password", "friends", "incomingFriendRequests"}
+    allowed = {"parentId", "name", "username", "age", "code", "createdAt", "theme", "password"}
     set_clauses = []
     params = []
 
@@ -339,16 +356,6 @@ def child_update_partial(fields: dict, child_id: int):
     sql = f"UPDATE children SET {set_clause} WHERE id = ?"
     return sql, tuple(params)
 
-#Sprint 5: Setting friendlist for Child accounts:
-def child_set_friends(child_id: int, friends_json: str):
-    query = "UPDATE children SET friends = ? WHERE id = ?"
-    return query, (friends_json, child_id)
-
-#Sprint 7 Addition to add friends:
-def child_set_incoming_friend_requests(child_id: int, requests_json: str):
-    query = "UPDATE children SET incomingFriendRequests = ? WHERE id = ?"
-    return query, (requests_json, child_id)
-
 def formed_habit_list(userId):
     query = "SELECT * FROM formed_habits WHERE userId = ?"
     return query, (userId,)
@@ -377,6 +384,13 @@ def task_list_pending(child_id: int):
 
     return query, (child_id,)
 
+def family_task_list_pending(parent_id: int):
+    query = (
+        "SELECT * FROM tasks WHERE needsApproval = 1 AND createdByRole = 'provider' "
+        "AND assigneeId IN (SELECT CAST(id AS TEXT) FROM children WHERE parentId = ?)"
+    )
+    return query, (parent_id,)
+
 def get_game_profile(userId: int):
     query = "SELECT * FROM game_profiles WHERE id = ?"
     return query, (userId,)
@@ -439,7 +453,7 @@ def item_list():
     return query, ()
 
 def goal_create(info: 'GoalInfo'):
-    # match the columns and order defined in state.database:create_tables (includes `location` before `meta`)
+    # match the columns and order defined in state.migrations (baseline schema) (includes `location` before `meta`)
     query = "INSERT INTO goals (title, goal, goalType, whyItMatters, startDate, endDate, assigneeId, assigneeName, triggers, replacements, makeItEasier, savingFor, rewardGoalTitle, rewardGoalCostCoins, milestoneRewards, createdAt, createdById, createdByName, createdByRole, location, meta) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
     triggers_json = json.dumps(info.triggers) if info.triggers else None
     replacements_json = json.dumps(info.replacements) if info.replacements else None
@@ -504,11 +518,12 @@ def goal_list(owner_id: int):
 
 # Action plan helpers
 def action_plan_create(info: 'ActionPlanInfo'):
-    query = "INSERT INTO action_plans (goalId, title, notes, assigneeId, assigneeName, schedule, frequency, frequencyLabel, completedDates, streak, createdAt, createdById, createdByName, createdByRole, meta) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    query = "INSERT INTO action_plans (goalId, title, notes, assigneeId, assigneeName, schedule, frequency, frequencyLabel, completedDays, streak, createdAt, createdById, createdByName, createdByRole, meta) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
     schedule_json = json.dumps(info.schedule) if info.schedule else None
     freq_json = json.dumps(info.frequency) if info.frequency else None
-    completed_json = json.dumps(info.completedDates) if info.completedDates else None
-    meta_json = json.dumps(info.meta) if info.meta else None
+    completed_days = DayBitmap.from_iso(info.completedDates).to_blob()
+    meta = _client_plan_meta(info.meta)
+    meta_json = json.dumps(meta) if meta else None
     return query, (
         info.goalId,
         info.title,
@@ -518,7 +533,7 @@ def action_plan_create(info: 'ActionPlanInfo'):
         schedule_json,
         freq_json,
         info.frequencyLabel,
-        completed_json,
+        completed_days,
         info.streak,
         info.createdAt,
         info.createdById,
@@ -543,16 +558,43 @@ def action_plan_get(plan_id: int):
     return query, (plan_id,)
 
 
+def _client_plan_meta(meta):
+    """A client's plan meta without "streakRuns", which only the server writes (see modules.action_plans)."""
+    if isinstance(meta, str):
+        try:
+            meta = json.loads(meta)
+        except ValueError:
+            return meta
+    if isinstance(meta, dict):
+        return {k: v for k, v in meta.items() if k != "streakRuns"}
+    return meta
+
+
 def action_plan_update_partial(fields: dict, plan_id: int):
     if not fields:
         raise ValueError("no fields to update")
+    fields = _completed_days_update(fields)
     set_clauses = []
     params = []
+    rewrites_days = "completedDays" in fields
     for col, val in fields.items():
+        if col == "meta":
+            val = _client_plan_meta(val)
+            if isinstance(val, dict) and not rewrites_days:
+                # the stored runs still describe the stored days, so carry them over
+                set_clauses.append(
+                    "meta = CASE WHEN json_valid(meta) AND json_type(meta, '$.streakRuns') = 'array' "
+                    "THEN json_set(?, '$.streakRuns', json(json_extract(meta, '$.streakRuns'))) ELSE ? END"
+                )
+                params += [json.dumps(val)] * 2
+                continue
         if isinstance(val, (list, dict)):
             val = json.dumps(val)
         set_clauses.append(f"{col} = ?")
         params.append(val)
+    if rewrites_days and "meta" not in fields:
+        # meta.streakRuns describes the old days; the next completion rebuilds it from the bitmap
+        set_clauses.append("meta = CASE WHEN json_valid(meta) THEN json_remove(meta, '$.streakRuns') ELSE meta END")
     params.append(plan_id)
     set_clause = ", ".join(set_clauses)
     sql = f"UPDATE action_plans SET {set_clause} WHERE id = ?"
@@ -561,12 +603,14 @@ def action_plan_update_partial(fields: dict, plan_id: int):
 
 def action_plan_update_progress(
     plan_id: int,
-    completed_dates: dict,
+    completed_days: DayBitmap,
     current_streak: int,
     best_streak: int,
     total_completions: int,
     existing_meta=None,
+    row_version: int | None = None,
 ):
+    """`row_version` stamps the row directly (see sync_clock_advance) instead of through the sync trigger."""
     meta = existing_meta if isinstance(existing_meta, dict) else {}
     meta = dict(meta)
     meta["currentStreak"] = int(current_streak or 0)
@@ -575,13 +619,14 @@ def action_plan_update_progress(
 
     query = """
         UPDATE action_plans
-        SET completedDates = ?, streak = ?, meta = ?
+        SET completedDays = ?, completedDates = NULL, streak = ?, meta = ?, rowVersion = COALESCE(?, rowVersion)
         WHERE id = ?
     """
     params = (
-        json.dumps(completed_dates),
+        completed_days.to_blob(),
         int(current_streak or 0),
         json.dumps(meta),
+        row_version,
         plan_id,
     )
     return query, params
@@ -596,7 +641,245 @@ def action_plan_list_by_goal(goal_id: int):
     query = "SELECT * FROM action_plans WHERE goalId = ?"
     return query, (goal_id,)
 
+
+# plan_completions: one row per (plan, completed day), mirroring completedDays
+def plan_completion_add(plan_id: int, assignee_id, day_iso: str, created_at: float):
+    query = "INSERT OR IGNORE INTO plan_completions (plan_id, assignee_id, day, createdAt) VALUES (?, CAST(? AS INTEGER), ?, ?)"
+    return query, (plan_id, assignee_id, day_iso, created_at)
+
+
+def plan_completion_delete(plan_id: int, day_iso: str):
+    query = "DELETE FROM plan_completions WHERE plan_id = ? AND day = ?"
+    return query, (plan_id, day_iso)
+
+
+def plan_completions_clear(plan_id: int):
+    query = "DELETE FROM plan_completions WHERE plan_id = ?"
+    return query, (plan_id,)
+
+
+def plan_completions_add_many(plan_id: int, days_iso: list[str], created_at: float):
+    """Insert a whole set of days for a plan, taking the assignee from the plan row."""
+    query = (
+        "INSERT OR IGNORE INTO plan_completions (plan_id, assignee_id, day, createdAt) "
+        "SELECT p.id, CAST(p.assigneeId AS INTEGER), d.value, ? FROM action_plans p, json_each(?) d "
+        "WHERE p.id = ?"
+    )
+    return query, (created_at, json.dumps(days_iso), plan_id)
+
 # adding functionality to check if child code exists when creating a child account
 def child_code_exists(code: str):
     query = "SELECT id FROM children WHERE code = ?"
     return query, (code,)
+
+
+def session_create(token: str, account_id: int, kind: str, account_json: str, created_at: float):
+    query = "INSERT OR REPLACE INTO sessions (token, accountId, kind, account, createdAt, lastSeen) VALUES (?, ?, ?, ?, ?, ?)"
+    return query, (token, account_id, kind, account_json, created_at, created_at)
+
+def session_get(token: str):
+    query = "SELECT * FROM sessions WHERE token = ?"
+    return query, (token,)
+
+def session_touch(token: str, last_seen: float):
+    query = "UPDATE sessions SET lastSeen = ? WHERE token = ? AND lastSeen < ?"
+    return query, (last_seen, token, last_seen)
+
+def session_delete(token: str):
+    query = "DELETE FROM sessions WHERE token = ?"
+    return query, (token,)
+
+def session_delete_account(account_id: int):
+    query = "DELETE FROM sessions WHERE accountId = ?"
+    return query, (account_id,)
+
+def session_purge(idle_before: float, created_before: float):
+    query = "DELETE FROM sessions WHERE lastSeen < ? OR createdAt < ?"
+    return query, (idle_before, created_before)
+
+def revoked_token_create(jti: str, expires_at: float, revoked_at: float):
+    query = "INSERT OR IGNORE INTO revoked_tokens (jti, expiresAt, revokedAt) VALUES (?, ?, ?)"
+    return query, (jti, expires_at, revoked_at)
+
+def revoked_token_list_since(revoked_at: float):
+    query = "SELECT jti, expiresAt FROM revoked_tokens WHERE revokedAt >= ?"
+    return query, (revoked_at,)
+
+def revoked_token_purge(now: float):
+    query = "DELETE FROM revoked_tokens WHERE expiresAt < ?"
+    return query, (now,)
+
+def token_version_bump(account_id: int, updated_at: float):
+    query = (
+        "INSERT INTO token_versions (account_id, version, updatedAt) VALUES (?, 1, ?) "
+        "ON CONFLICT(account_id) DO UPDATE SET version = version + 1, updatedAt = excluded.updatedAt "
+        "RETURNING version"
+    )
+    return query, (account_id, updated_at)
+
+def token_version_list_since(updated_at: float):
+    query = "SELECT account_id, version FROM token_versions WHERE updatedAt >= ?"
+    return query, (updated_at,)
+
+def app_meta_get(key: str):
+    query = "SELECT value FROM app_meta WHERE key = ?"
+    return query, (key,)
+
+def app_meta_insert(key: str, value: str):
+    """Store `value` under `key` unless something is already there."""
+    query = "INSERT OR IGNORE INTO app_meta (key, value) VALUES (?, ?)"
+    return query, (key, value)
+
+# Delta sync (see modules/sync.py). rowVersion and the tombstones are kept by triggers, see state.migrations.
+def sync_version():
+    """(current version, low-water mark): deletions at or below `pruned` are no longer recorded."""
+    query = "SELECT version, pruned FROM sync_clock WHERE id = 1"
+    return query, ()
+
+
+def sync_tombstones_prune(keep_versions: int):
+    """Drop tombstones more than `keep_versions` behind the clock (trg_sync_clock_prune does the delete)."""
+    query = "UPDATE sync_clock SET pruned = MAX(pruned, version - ?) WHERE id = 1"
+    return query, (keep_versions,)
+
+
+def sync_clock_advance():
+    """Take the next sync version, returned by the statement itself.
+
+    Writers that already know every value they store use it to set rowVersion
+    in the same UPDATE; the sync triggers skip rows whose rowVersion changed,
+    so the caller knows the row's version without reading it back.
+    """
+    query = "UPDATE sync_clock SET version = version + 1 WHERE id = 1 RETURNING version"
+    return query, ()
+
+# a parent also sees their children's rows in these; goals and plans follow goal_list/action_plan_list
+SYNC_FAMILY_TABLES = {"tasks", "children", "game_profiles"}
+
+# visibility columns holding INTEGER ids; the others, and the tombstone owners, hold TEXT ids
+_SYNC_INTEGER_COLUMNS = {("children", "parentId"), ("children", "id"), ("game_profiles", "id")}
+
+def _sync_scope(table: str, columns: tuple, account_id: int, family: bool):
+    # each column is compared against ids of its own type so its index stays usable
+    clauses, params = [], []
+    for c in columns:
+        integer = (table, c) in _SYNC_INTEGER_COLUMNS
+        account = account_id if integer else str(account_id)
+        if family:
+            child_id = "id" if integer else "CAST(id AS TEXT)"
+            clauses.append(f"{c} IN (SELECT ? UNION ALL SELECT {child_id} FROM children WHERE parentId = ?)")
+            params += [account, account_id]
+        else:
+            clauses.append(f"{c} = ?")
+            params.append(account)
+    return f"({' OR '.join(clauses)})", tuple(params)
+
+def sync_changed_rows(table: str, account_id: int, family: bool, since: int):
+    """Rows of `table` visible to the account and written after version `since`.
+
+    `family` is True for a parent, who also sees their children's rows in SYNC_FAMILY_TABLES.
+    """
+    columns = migrations.SYNC_TABLES[table]
+    clause, params = _sync_scope(table, columns, account_id, family and table in SYNC_FAMILY_TABLES)
+    query = f"SELECT * FROM {table} WHERE rowVersion > ? AND {clause}"
+    return query, (since, *params)
+
+def sync_deleted_ids(table: str, account_id: int, family: bool, since: int):
+    columns = migrations.SYNC_TABLES[table]
+    # the delete triggers copy the visibility columns, in order, into ownerA/ownerB
+    clause, params = _sync_scope("sync_tombstones", ("ownerA", "ownerB")[:len(columns)], account_id, family and table in SYNC_FAMILY_TABLES)
+    query = f"SELECT rowId FROM sync_tombstones WHERE tableName = ? AND version > ? AND {clause}"
+    return query, (table, since, *params)
+
+# Version lookups for conditional GETs (util.etag): a few index probes instead of the full query.
+def task_list_version(account_id: int, family: bool):
+    """(assignee, newest task version, newest task tombstone) for the account, plus its children when `family`."""
+    accounts_sql = "SELECT ? AS id UNION ALL SELECT CAST(id AS TEXT) FROM children WHERE parentId = ?" if family else "SELECT ? AS id"
+    query = (
+        "SELECT a.id, "
+        "(SELECT MAX(rowVersion) FROM tasks WHERE assigneeId = a.id), "
+        "(SELECT MAX(version) FROM sync_tombstones WHERE tableName = 'tasks' AND ownerA = a.id) "
+        f"FROM ({accounts_sql}) a ORDER BY a.id"
+    )
+    return query, (str(account_id), account_id) if family else (str(account_id),)
+
+def game_profile_version(profile_id: int):
+    query = "SELECT rowVersion FROM game_profiles WHERE id = ?"
+    return query, (profile_id,)
+
+def child_parents(child_ids: list[int]):
+    """Parents of whichever of these ids are children (ids are shared with users)."""
+    query = f"SELECT DISTINCT parentId FROM children WHERE id IN ({', '.join('?' * len(child_ids))}) AND parentId IS NOT NULL"
+    return query, tuple(child_ids)
+
+# Friends (friendships/friend_requests edge tables, see state.migrations).
+# An account shows up as "username" for users and "username#code" for children;
+# ids are shared between the two tables, so exactly one join matches.
+_FRIEND_IDENTIFIER = (
+    "COALESCE(trim(u.username), CASE WHEN trim(c.username) <> '' AND trim(c.code) <> '' "
+    "THEN trim(c.username) || '#' || trim(c.code) ELSE trim(c.username) END)"
+)
+
+def friend_list(account_id: int):
+    query = (
+        f"SELECT f.friend_id AS id, {_FRIEND_IDENTIFIER} AS identifier FROM friendships f "
+        "LEFT JOIN users u ON u.id = f.friend_id LEFT JOIN children c ON c.id = f.friend_id "
+        "WHERE f.account_id = ? ORDER BY f.createdAt, f.friend_id"
+    )
+    return query, (account_id,)
+
+def friend_request_list(account_id: int):
+    """Incoming requests, oldest first."""
+    query = (
+        f"SELECT r.from_id AS id, {_FRIEND_IDENTIFIER} AS identifier FROM friend_requests r "
+        "LEFT JOIN users u ON u.id = r.from_id LEFT JOIN children c ON c.id = r.from_id "
+        "WHERE r.to_id = ? ORDER BY r.createdAt, r.from_id"
+    )
+    return query, (account_id,)
+
+def friendship_exists(account_id: int, friend_id: int):
+    query = "SELECT 1 FROM friendships WHERE account_id = ? AND friend_id = ?"
+    return query, (account_id, friend_id)
+
+def friendship_create(account_id: int, friend_id: int, created_at: float):
+    query = "INSERT OR IGNORE INTO friendships (account_id, friend_id, createdAt) VALUES (?, ?, ?), (?, ?, ?)"
+    return query, (account_id, friend_id, created_at, friend_id, account_id, created_at)
+
+def friendship_delete(account_id: int, friend_id: int):
+    query = "DELETE FROM friendships WHERE (account_id = ? AND friend_id = ?) OR (account_id = ? AND friend_id = ?)"
+    return query, (account_id, friend_id, friend_id, account_id)
+
+def friend_request_exists(to_id: int, from_id: int):
+    query = "SELECT 1 FROM friend_requests WHERE to_id = ? AND from_id = ?"
+    return query, (to_id, from_id)
+
+def friend_request_create(to_id: int, from_id: int, created_at: float):
+    query = "INSERT OR IGNORE INTO friend_requests (to_id, from_id, createdAt) VALUES (?, ?, ?)"
+    return query, (to_id, from_id, created_at)
+
+def friend_request_delete(to_id: int, from_id: int):
+    query = "DELETE FROM friend_requests WHERE to_id = ? AND from_id = ?"
+    return query, (to_id, from_id)
+
+def friend_version(account_id: int):
+    query = "SELECT version FROM friend_versions WHERE account_id = ?"
+    return query, (account_id,)
+
+def friend_profiles(account_id: int, friend_id: int | None = None):
+    """Confirmed friends with their game profile, public columns only (no password, email or friend lists)."""
+    query = (
+        f"SELECT f.friend_id AS id, {_FRIEND_IDENTIFIER} AS identifier, "
+        "CASE WHEN u.id IS NULL THEN 'child' ELSE 'user' END AS kind, "
+        "COALESCE(u.username, c.username) AS username, c.code AS code, COALESCE(u.name, c.name) AS name, "
+        "COALESCE(u.theme, c.theme) AS theme, u.profilePic AS profilePic, u.stats AS stats, "
+        "g.id AS profileId, g.coins AS coins, g.inventory AS inventory, g.meta AS meta "
+        "FROM friendships f "
+        "LEFT JOIN users u ON u.id = f.friend_id LEFT JOIN children c ON c.id = f.friend_id "
+        "LEFT JOIN game_profiles g ON g.id = f.friend_id "
+        "WHERE f.account_id = ?"
+    )
+    params = (account_id,)
+    if friend_id is not None:
+        query += " AND f.friend_id = ?"
+        params += (friend_id,)
+    return query + " ORDER BY f.createdAt, f.friend_id", params
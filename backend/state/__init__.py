@@ -1,6 +1,10 @@
 from modules.datatypes import UserInfo, ChildInfo
+from state import accounts
+from state.session_store import MemorySessionStore, SqliteSessionStore
+from state.tokens import TokenSessionStore
 
-sessions: dict[str, UserInfo | ChildInfo] = {}
+# main.py swaps in the store picked by SESSION_STORE so all workers share logins
+sessions: MemorySessionStore | TokenSessionStore = MemorySessionStore()
 
 from fastapi import Depends, Cookie, HTTPException
 
@@ -8,7 +12,12 @@ def require_user(session_token: str | None = Cookie(default=None, alias="session
     if not session_token:
         raise HTTPException(status_code=401, detail="Not authenticated")
 
-    user = sessions.get(session_token)
+    session = sessions.get(session_token)
+    if not session:
+        raise HTTPException(status_code=401, detail="Invalid session")
+
+    # the session pins the account; handlers get its current row, not the login snapshot
+    user = accounts.cache.get(session.id, isinstance(session, ChildInfo))
     if not user:
         raise HTTPException(status_code=401, detail="Invalid session")
 
@@ -0,0 +1,113 @@
+"""Per-account cache of users/children rows.
+
+require_user resolves the session to the account's current row through this
+cache, so handlers get fresh account data (profile fields, theme, role)
+without querying the users or children table themselves.
+
+Handlers that write a users or children row call `invalidate` once the
+write has committed, which drops the entry in this worker. A lookup that
+started before the latest invalidation still returns what it read but does
+not cache it, since the read may predate the commit. Other workers' writes
+are picked up once an entry is `ttl` seconds old.
+
+Rows are handed out as copies with the password hash blanked. Read-modify-write
+handlers should read the row inside their own write transaction, not from here.
+"""
+
+import collections
+import threading
+import time
+
+from modules.datatypes import UserInfo, ChildInfo
+from state import SQLHelper
+from state.database import Database
+
+
+class _Entry:
+    __slots__ = ("row", "account", "loaded")
+
+    def __init__(self, row: dict, account: UserInfo | ChildInfo, loaded: float):
+        self.row = row
+        self.account = account
+        self.loaded = loaded
+
+
+class AccountCache:
+    def __init__(self, max_entries: int = 10000, ttl: float = 5.0):
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = ttl
+        self.__entries: collections.OrderedDict[tuple[bool, int], _Entry] = collections.OrderedDict()
+        self.__invalidated: dict[tuple[bool, int], float] = {}
+        self.__lock = threading.Lock()
+
+    def row(self, account_id: int, child: bool = False, db: Database | None = None) -> dict | None:
+        """The account's row as a dict. Pass `db` when already inside a session."""
+        entry = self.__lookup(int(account_id), child, db)
+        return None if entry is None else dict(entry.row)
+
+    def get(self, account_id: int, child: bool = False, db: Database | None = None) -> UserInfo | ChildInfo | None:
+        entry = self.__lookup(int(account_id), child, db)
+        return None if entry is None else entry.account.model_copy()
+
+    def invalidate(self, account_id, child: bool | None = None):
+        """Forget an account; `child=None` covers both tables."""
+        try:
+            account_id = int(account_id)
+        except (TypeError, ValueError):
+            return
+        now = time.monotonic()
+        with self.__lock:
+            for kind in ((False, True) if child is None else (child,)):
+                self.__entries.pop((kind, account_id), None)
+                self.__invalidated[(kind, account_id)] = now
+            if len(self.__invalidated) > self.max_entries:
+                # a lookup that started more than ttl ago would be stored already expired
+                self.__invalidated = {k: t for k, t in self.__invalidated.items() if now - t < self.ttl}
+
+    def clear(self):
+        with self.__lock:
+            self.__entries.clear()
+            self.__invalidated.clear()
+
+    def __lookup(self, account_id: int, child: bool, db: Database | None) -> _Entry | None:
+        key = (child, account_id)
+        now = time.monotonic()
+        with self.__lock:
+            entry = self.__entries.get(key)
+            if entry is not None and now - entry.loaded < self.ttl:
+                self.__entries.move_to_end(key)
+                return entry
+
+        entry = self.__load(account_id, child, db, now)
+        with self.__lock:
+            if entry is None:
+                self.__entries.pop(key, None)
+            elif self.__invalidated.get(key, float("-inf")) < now:
+                self.__entries[key] = entry
+                self.__entries.move_to_end(key)
+                while len(self.__entries) > self.max_entries:
+                    self.__entries.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def __load(account_id: int, child: bool, db: Database | None, now: float) -> _Entry | None:
+        query = SQLHelper.child_get_by_id(account_id) if child else SQLHelper.user_get(account_id)
+        if db is None:
+            with Database(readonly=True) as db:
+                row = db.execute(*query).fetchone()
+        else:
+            row = db.execute(*query).fetchone()
+        if row is None:
+            return None
+        row = dict(row)
+        row["password"] = ""
+        account = ChildInfo.model_validate(row) if child else UserInfo.model_validate(row)
+        return _Entry(row, account, now)
+
+
+# main.py replaces this with one sized from the environment
+cache = AccountCache()
+
+
+def invalidate(account_id, child: bool | None = None):
+    cache.invalidate(account_id, child)
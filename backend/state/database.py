@@ -1,35 +1,323 @@
+import asyncio
+import functools
+import hashlib
+import json
 import os
+import queue
 import sqlite3
 import threading
+import time
 import traceback
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from state import migrations
+
+
+ITEMS_FILE = os.path.join(os.path.dirname(__file__), "items.json")
+
+
+class ConnectionPool:
+    """Hands out warm sqlite connections instead of reopening the file per request.
+
+    Each pooled connection keeps its own page cache and prepared statement
+    cache, so cheap lookups don't pay for opening the file and parsing the
+    schema every time. Idle connections are health checked before reuse.
+    """
+
+    def __init__(self, filename: str, size: int = 8, cached_statements: int = 256, readonly: bool = False):
+        self.filename = filename
+        self.size = max(1, int(size))
+        self.cached_statements = cached_statements
+        self.readonly = readonly
+        # LIFO so the most recently used (hottest cache) connection goes out first
+        self.__idle: queue.LifoQueue = queue.LifoQueue()
+        self.__slots = threading.BoundedSemaphore(self.size)
+        self.__closed = False
+
+    def connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(
+            self.filename,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+        )
+        # set row_factory before creating cursors so they return sqlite3.Row objects
+        connection.row_factory = sqlite3.Row
+        if self.readonly:
+            # reader connections refuse writes so a mislabelled handler fails loudly
+            connection.execute("PRAGMA query_only = ON")
+        return connection
+
+    @staticmethod
+    def is_healthy(connection: sqlite3.Connection) -> bool:
+        try:
+            connection.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self, timeout: float | None = None) -> sqlite3.Connection:
+        if self.__closed:
+            raise RuntimeError("connection pool is closed")
+        if not self.__slots.acquire(timeout=timeout):
+            raise TimeoutError("timed out waiting for a database connection")
+        try:
+            while True:
+                try:
+                    connection = self.__idle.get_nowait()
+                except queue.Empty:
+                    return self.connect()
+                if self.is_healthy(connection):
+                    return connection
+                self.__discard(connection)
+        except BaseException:
+            self.__slots.release()
+            raise
+
+    def release(self, connection: sqlite3.Connection) -> None:
+        try:
+            if connection.in_transaction:
+                # never hand out a connection with someone else's uncommitted work
+                connection.rollback()
+        except sqlite3.Error:
+            traceback.print_exc()
+            self.__discard(connection)
+            connection = None
+
+        if connection is not None:
+            if self.__closed:
+                self.__discard(connection)
+            else:
+                self.__idle.put(connection)
+        self.__slots.release()
+
+    def close(self) -> None:
+        self.__closed = True
+        while True:
+            try:
+                self.__discard(self.__idle.get_nowait())
+            except queue.Empty:
+                break
+
+    @staticmethod
+    def __discard(connection: sqlite3.Connection) -> None:
+        try:
+            connection.close()
+        except sqlite3.Error:
+            pass
+
+
+class GroupCommitWriter:
+    """Opt-in group commit for small single-statement writes.
+
+    Callers queue a statement and get a Future back. One writer thread drains
+    the queue every few milliseconds and applies the whole batch in a single
+    transaction (one fsync), with a savepoint per statement so a failing
+    statement only fails its own caller. Each Future resolves to
+    (lastrowid, rowcount) or raises the sqlite3.Error for that statement.
+    """
+
+    def __init__(self, pool: ConnectionPool, window: float = 0.002, max_batch: int = 256):
+        self.pool = pool
+        self.window = window
+        self.max_batch = max_batch
+        self.__queue: queue.Queue = queue.Queue()
+        self.__thread = threading.Thread(target=self.__run, name="sqlite-group-commit", daemon=True)
+        self.__thread.start()
+
+    def submit(self, sql: str, params: tuple) -> Future:
+        future = Future()
+        self.__queue.put((sql, params, future))
+        return future
+
+    def stop(self) -> None:
+        self.__queue.put(None)
+        self.__thread.join()
+
+    def __run(self):
+        running = True
+        while running:
+            item = self.__queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self.__queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    running = False
+                    break
+                batch.append(item)
+            self.__apply(batch)
+
+    def __apply(self, batch):
+        done = []
+        with Database.write_lock:
+            connection = None
+            try:
+                connection = self.pool.acquire()
+                connection.execute("BEGIN TRANSACTION")
+                for sql, params, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    connection.execute("SAVEPOINT group_item")
+                    try:
+                        cursor = connection.execute(sql, params)
+                    except sqlite3.Error as exc:
+                        connection.execute("ROLLBACK TO group_item")
+                        connection.execute("RELEASE group_item")
+                        future.set_exception(exc)
+                        continue
+                    connection.execute("RELEASE group_item")
+                    done.append((future, (cursor.lastrowid, cursor.rowcount)))
+                connection.commit()
+            except Exception as exc:
+                # the whole batch is lost, so everyone still waiting gets the error
+                traceback.print_exc()
+                for _, _, future in batch:
+                    if not future.done():
+                        if future.running() or future.set_running_or_notify_cancel():
+                            future.set_exception(exc)
+                done = []
+            finally:
+                if connection is not None:
+                    self.pool.release(connection)
+        for future, result in done:
+            future.set_result(result)
+
+
+class IdAllocator:
+    """Hands out account ids from blocks reserved in the ids table.
+
+    Reserving a block is a single write that moves the ids AUTOINCREMENT
+    sequence forward by `block_size`; the ids inside the block are then handed
+    out from memory. Whatever is left of a block when the worker exits is
+    skipped, so restarts and other workers never see the same id twice.
+    """
+
+    def __init__(self, block_size: int = 32):
+        self.block_size = max(1, int(block_size))
+        self.__lock = threading.Lock()
+        self.__next = 0
+        self.__end = 0
+
+    def allocate(self, reserve) -> int:
+        """`reserve(count)` must durably claim `count` ids and return the highest one."""
+        with self.__lock:
+            if self.__next >= self.__end:
+                last = reserve(self.block_size)
+                self.__next, self.__end = last - self.block_size + 1, last + 1
+            new_id = self.__next
+            self.__next += 1
+            return new_id
 
 
 class Database:
     filename: str
-    mutex: threading.Lock
+    # Single writer lane. In WAL mode readers never touch it; otherwise every
+    # context goes through it like the old global mutex did.
+    write_lock: threading.Lock
+    wal: bool = False
+    pool: ConnectionPool | None = None
+    read_pool: ConnectionPool | None = None
+    group_commit: GroupCommitWriter | None = None
+    ids: IdAllocator
+    # sha256 of state/items.json, also the catalog's ETag
+    items_checksum: str | None = None
 
     @staticmethod
-    def init(filename: str):
+    def init(filename: str, pool_size: int = 8, wal: bool = True, group_commit: bool = False, group_commit_window_ms: float = 2, id_block_size: int = 32):
         Database.filename = filename
+        Database.ids = IdAllocator(id_block_size)
         if not os.path.exists(Database.filename):
             open(Database.filename, "w").close()
-        Database.mutex = threading.Lock()
+        if Database.group_commit is not None:
+            Database.group_commit.stop()
+            Database.group_commit = None
+        Database.write_lock = threading.Lock()
+        for pool in (Database.pool, Database.read_pool):
+            if pool is not None:
+                pool.close()
+        # writes are serialized by write_lock, so one warm writer connection is enough
+        Database.pool = ConnectionPool(filename, 1)
+        Database.read_pool = ConnectionPool(filename, pool_size, readonly=True)
+        Database.wal = Database.__set_journal_mode(filename, wal)
+        # one executor thread per read connection plus the writer, see AsyncDatabase
+        AsyncDatabase.init(pool_size + 1)
         with Database() as db:
             db.create_tables()
             db.populate_items(db)
             # commit created tables so the DB is usable immediately
             db.write()
+        if group_commit:
+            Database.group_commit = GroupCommitWriter(Database.pool, group_commit_window_ms / 1000)
 
+    @staticmethod
+    def submit(sql: str, params: tuple) -> Future:
+        """Queue a single write statement; see GroupCommitWriter.
 
-    def __init__(self):
-        self.__connection: sqlite3.Connection
+        Without group commit the statement runs and commits right away on the
+        calling thread, so callers can use this unconditionally.
+        """
+        if Database.group_commit is not None:
+            return Database.group_commit.submit(sql, params)
+        future = Future()
+        try:
+            with Database() as db:
+                cursor = db.execute(sql, params)
+                db.write()
+            future.set_result((cursor.lastrowid, cursor.rowcount))
+        except sqlite3.Error as exc:
+            future.set_exception(exc)
+        return future
+
+    @staticmethod
+    def try_submit(sql: str, params: tuple) -> bool:
+        """Blocking counterpart of try_execute for a single queued write."""
+        try:
+            Database.submit(sql, params).result()
+        except sqlite3.Error:
+            print(f"An error occured running the following query:")
+            print(f"SQL: {sql}\nParams: {params}")
+            traceback.print_exc()
+            return False
+        return True
+
+
+    @staticmethod
+    def __set_journal_mode(filename: str, wal: bool) -> bool:
+        # journal_mode is stored in the database file, so this only needs to run once per process
+        connection = sqlite3.connect(filename)
+        try:
+            mode = connection.execute(f"PRAGMA journal_mode = {'WAL' if wal else 'DELETE'}").fetchone()[0]
+        finally:
+            connection.close()
+        return str(mode).lower() == "wal"
+
+    def __init__(self, readonly: bool = False):
+        self.readonly = readonly
+        self.__pool = Database.read_pool if readonly else Database.pool
+        self.__locked = False
+        self.__connection: sqlite3.Connection | None = None
         self.__cursor: sqlite3.Cursor
 
     def close(self) -> None:
-        self.__connection.close()
+        # hand the connection back to the pool instead of closing the file
+        if self.__connection is not None:
+            self.__pool.release(self.__connection)
+            self.__connection = None
 
     def write(self):
         self.__connection.commit()
+
+    def rollback(self):
+        self.__connection.rollback()
         
     def try_execute(self, sql: str, params: tuple) -> bool:
         try:
@@ -52,360 +340,201 @@ class Database:
         return self.__cursor.lastrowid
 
     def create_new_id(self) -> int | None:
-        if self.try_execute("INSERT INTO ids DEFAULT VALUES", ()):
-            self.write()
-            return self.created_id()
-        else:
+        # Served from this worker's reserved block, so usually no write at all.
+        # A refill commits on this connection: call it before writing anything else.
+        try:
+            return Database.ids.allocate(self.__reserve_ids)
+        except sqlite3.Error:
+            print("Failed to reserve a block of ids")
+            traceback.print_exc()
             return None
 
+    def __reserve_ids(self, count: int) -> int:
+        self.write()
+        self.__cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # skip past the sequence (and any id written without it) in one statement
+            last = self.__cursor.execute(
+                "INSERT INTO ids (id) SELECT MAX("
+                "COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'ids'), 0), "
+                "COALESCE((SELECT MAX(id) FROM ids), 0)) + ? RETURNING id",
+                (count,),
+            ).fetchone()[0]
+            self.write()
+        except BaseException:
+            self.rollback()
+            raise
+        finally:
+            self.__cursor.execute("BEGIN TRANSACTION")
+        return last
+
     def __enter__(self):
-        self.mutex.acquire()
-        self.__connection = sqlite3.connect(self.filename)
-        # set row_factory before creating cursor so the cursor returns sqlite3.Row objects
-        self.__connection.row_factory = sqlite3.Row
+        # WAL lets readers run alongside the single writer; without it readers queue up too
+        self.__locked = not (self.readonly and self.wal)
+        if self.__locked:
+            self.write_lock.acquire()
+        try:
+            self.__connection = self.__pool.acquire()
+        except BaseException:
+            if self.__locked:
+                self.write_lock.release()
+            raise
         self.__cursor = self.__connection.cursor()
-        self.try_execute("BEGIN TRANSACTION", ())
+        # Read-only sessions open a deferred transaction too, so every statement in the
+        # session sees one snapshot (e.g. /sync's clock read and the per-table queries
+        # after it). Under WAL that is only a read mark; it never takes the write lock,
+        # and the pool rolls it back when the connection is released.
+        self.try_execute("BEGIN TRANSACTION" if not self.readonly else "BEGIN DEFERRED", ())
         return self
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.mutex.release()
-        self.__connection.close()
+        self.close()
+        if self.__locked:
+            self.write_lock.release()
 
     def create_tables(self):
+        # cheap when the schema is current: one PRAGMA read, no introspection
+        migrations.migrate(self)
 
-        self.__connection.execute("CREATE TABLE IF NOT EXISTS ids (id INTEGER PRIMARY KEY AUTOINCREMENT);")
 
+    @staticmethod
+    def populate_items(db) -> bool:
+        # The catalog is declared in state/items.json and upserted by path in one transaction.
+        # Its checksum is stored alongside, so a worker starting against an up to date
+        # catalog does a single lookup and no writes.
+        with open(ITEMS_FILE, "rb") as f:
+            raw = f.read()
+        checksum = hashlib.sha256(raw).hexdigest()
+        Database.items_checksum = checksum
+        row = db.execute("SELECT value FROM app_meta WHERE key = ?", ("items_checksum",)).fetchone()
+        if row is not None and row[0] == checksum:
+            return False
 
+        items = [(i["name"], i["path"], i["price"], i["type"], i["placement"]) for i in json.loads(raw)]
+        try:
+            db.cursor().executemany(
+                "INSERT INTO items (name, path, price, type, placement) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(path) DO UPDATE SET name = excluded.name, price = excluded.price, "
+                "type = excluded.type, placement = excluded.placement",
+                items,
+            )
+            db.execute(
+                "INSERT INTO app_meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                ("items_checksum", checksum),
+            )
+            db.write()
+        except sqlite3.Error:
+            print("Failed to populate the item catalog")
+            traceback.print_exc()
+            db.rollback()
+            return False
+        return True
 
-        #Sprint 5 Additions: Adding usernames to children.
-        self.__connection.execute(
-            "CREATE TABLE IF NOT EXISTS children (id INTEGER PRIMARY KEY AUTOINCREMENT, parentId INTEGER, name TEXT, username TEXT, friends TEXT, incomingFriendRequests TEXT, password TEXT, childCode INTEGER, age INTEGER, code TEXT, createdAt TEXT, theme TEXT)"
-        )
 
-        def ensure_column(table: str, column: str, col_def: str):
-            try:
-                cols = [r[1] for r in self.__connection.execute(f"PRAGMA table_info({table})").fetchall()]
-                if column not in cols:
-                    self.__connection.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_def}")
-            except sqlite3.Error:
-                traceback.print_exc()
+class AsyncDatabase:
+    """asyncio front end for Database.
 
-        ensure_column("children", "username", "TEXT")
-        ensure_column("children", "friends", "TEXT")
-        ensure_column("children", "incomingFriendRequests", "TEXT")
-        ensure_column("children", "password", "TEXT") #Sprint 5 addon for Passwords for children
-        ensure_column("children", "childCode", "INTEGER")
+    Every SQLite call runs on a dedicated executor so async handlers never block
+    the event loop or tie up FastAPI's threadpool. Sessions are gated on the
+    event loop before they claim an executor thread, so threads are only ever
+    parked on work that can make progress (never on the write lock or an empty pool).
 
-        # Users table (matches backend `UserInfo` model)
-        self.__connection.execute(
-            "CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, email TEXT, password TEXT, name TEXT, age INTEGER, role TEXT, createdAt TEXT, type TEXT, theme TEXT, profilePic TEXT, stats TEXT, code TEXT, meta TEXT, friends TEXT, incomdingFriendRequests, TEXT)"
-        )
-        ensure_column("users", "friends", "TEXT")
-        ensure_column("users", "incomingFriendRequests", "TEXT")
+        async with AsyncDatabase(readonly=True) as db:
+            if await db.try_execute(*SQLHelper.task_list(user.id)):
+                rows = await db.fetchall()
+    """
+    executor: ThreadPoolExecutor | None = None
+    __gates: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple[asyncio.Lock, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
 
-        # Tasks table (represents frontend Task objects)
-        self.__connection.execute(
-            "CREATE TABLE IF NOT EXISTS tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, assigneeId TEXT, assigneeName TEXT, title TEXT, notes TEXT, taskType TEXT, steps TEXT, habitToBreak TEXT, replacements TEXT, frequency TEXT, streak INTEGER, completedDates TEXT, status TEXT, createdAt TEXT, createdById TEXT, createdByName TEXT, createdByRole TEXT, needsApproval INTEGER, targetType TEXT, targetName TEXT, meta TEXT)"
-        )
+    @staticmethod
+    def init(workers: int):
+        if AsyncDatabase.executor is not None:
+            AsyncDatabase.executor.shutdown(wait=False)
+        AsyncDatabase.executor = ThreadPoolExecutor(max_workers=max(2, workers), thread_name_prefix="sqlite")
+        AsyncDatabase.__gates = weakref.WeakKeyDictionary()
+
+    def __init__(self, readonly: bool = False):
+        self.readonly = readonly
+        self.__db = Database(readonly=readonly)
+        self.__gate = None
+        self.__loop = None
+
+    def __get_gate(self):
+        loop = asyncio.get_running_loop()
+        gates = AsyncDatabase.__gates.get(loop)
+        if gates is None:
+            gates = (asyncio.Lock(), asyncio.Semaphore(Database.read_pool.size))
+            AsyncDatabase.__gates[loop] = gates
+        writer_gate, reader_gate = gates
+        # mirrors Database.__enter__: only WAL readers stay off the writer lane
+        return reader_gate if (self.readonly and Database.wal) else writer_gate
+
+    async def __call(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args))
+
+    async def __aenter__(self):
+        self.__loop = asyncio.get_running_loop()
+        self.__gate = self.__get_gate()
+        await self.__gate.acquire()
+        future = self.__loop.run_in_executor(self.executor, self.__db.__enter__)
+        try:
+            await asyncio.shield(future)
+        except asyncio.CancelledError:
+            # the executor job keeps running; make sure whatever it acquired gets released
+            future.add_done_callback(self.__release_abandoned)
+            raise
+        except BaseException:
+            self.__gate.release()
+            raise
+        return self
 
-        # Build / Break / Formed habit tables
-        self.__connection.execute(
-            "CREATE TABLE IF NOT EXISTS build_habits (id INTEGER PRIMARY KEY AUTOINCREMENT, account_id INTEGER, goal TEXT, cue TEXT, steps TEXT)"
-        )
-        self.__connection.execute(
-            "CREATE TABLE IF NOT EXISTS break_habits (id INTEGER PRIMARY KEY AUTOINCREMENT, account_id INTEGER, habit TEXT, replacements TEXT, microSteps TEXT, savedOn TEXT)"
-        )
-        self.__connection.execute(
-            "CREATE TABLE IF NOT EXISTS formed_habits (id INTEGER PRIMARY KEY AUTOINCREMENT, userId INTEGER, title TEXT, type TEXT, createdAt TEXT, details TEXT, completedAt TEXT, meta TEXT)"
-        )
-        
-        self.__connection.execute(
-            "CREATE TABLE IF NOT EXISTS game_profiles (id INTEGER PRIMARY KEY, coins INTEGER, inventory TEXT, meta TEXT)"
-        )
-        self.__connection.execute(
-            "CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, price INTEGER, type TEXT, path TEXT UNIQUE, placement TEXT)"
-        )
-        ensure_column("game_profiles", "meta", "TEXT") # Allows for future expansion of game profile features without needing DB schema changes
-
-        # Goals table for the new habit system
-        self.__connection.execute(
-            "CREATE TABLE IF NOT EXISTS goals ("
-            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
-            "title TEXT, "
-            "goal TEXT, "
-            "goalType TEXT, "
-            "whyItMatters TEXT, "
-            "startDate TEXT, "
-            "endDate TEXT, "
-            "assigneeId TEXT, "
-            "assigneeName TEXT, "
-            "triggers TEXT, "
-            "replacements TEXT, "
-            "makeItEasier TEXT, "
-            "savingFor TEXT, "
-            "rewardGoalTitle TEXT, "
-            "rewardGoalCostCoins INTEGER, "
-            "milestoneRewards TEXT, "
-            "createdAt TEXT, "
-            "createdById TEXT, "
-            "createdByName TEXT, "
-            "createdByRole TEXT, "
-            "location TEXT, "
-            "meta TEXT"
-            ")"
-        )
+    def __release_abandoned(self, future):
+        if future.cancelled() or future.exception() is not None:
+            self.__gate.release()
+            return
+        release = self.executor.submit(self.__db.__exit__, None, None, None)
+        release.add_done_callback(lambda _: self.__loop.call_soon_threadsafe(self.__gate.release))
 
-        # Action plans table (also known as action_plans)
-        self.__connection.execute(
-            "CREATE TABLE IF NOT EXISTS action_plans ("
-            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
-            "goalId INTEGER, "
-            "title TEXT, "
-            "notes TEXT, "
-            "assigneeId TEXT, "
-            "assigneeName TEXT, "
-            "schedule TEXT, "
-            "frequency TEXT, "
-            "frequencyLabel TEXT, "
-            "completedDates TEXT, "
-            "streak INTEGER, "
-            "createdAt TEXT, "
-            "createdById TEXT, "
-            "createdByName TEXT, "
-            "createdByRole TEXT, "
-            "meta TEXT"
-            ")"
-        )
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        try:
+            await asyncio.shield(self.__call(self.__db.__exit__, exc_type, exc_val, exc_tb))
+        finally:
+            self.__gate.release()
 
+    async def run(self, func, *args, **kwargs):
+        """Run func(db, *args, **kwargs) on the executor with the underlying sync Database."""
+        return await self.__call(functools.partial(func, self.__db, *args, **kwargs))
 
-    @staticmethod
-    def populate_items(db):
-        def create_item(name: str, path: str, price: int, type_: str, placement: str) -> int | None:
-            def item_create(name, path, price, type_, placement):
-                query = "INSERT OR IGNORE INTO items (name, path, price, type, placement) VALUES (?, ?, ?, ?, ?)"
-                return query, (name, path, price, type_, placement)
-            if db.try_execute(*item_create(name, path, price, type_, placement)):
-                db.write()
-                return db.created_id()
-            else:
-                return None
-
-        if create_item("Base", "/base/base", 0, "Default", "Base") is None:
-            print("Failed to create item 'base'")
-        if create_item("Default Eyebrows", "/eyebrows/eyebrows1", 0, "Default", "Eyebrows") is None:
-            print("Failed to create item 'Default Eyebrows'")
-        if create_item("Default Eyes", "/eyes/eyes1", 0, "Default", "Eyes") is None:
-            print("Failed to create item 'Default Eyes'")
-        if create_item("Default Mouth", "/mouths/mouth1", 0, "Default", "Mouths") is None:
-            print("Failed to create item 'Default Mouth'")
-        if create_item("Default Hair", "/hair/hair1", 0, "Default", "Hair") is None:
-            print("Failed to create item 'Default Hair'")
-        if create_item("Default Shirt", "/shirts/shirt1", 0, "Default", "Shirts") is None:
-            print("Failed to create item 'Default Shirt'")
-        if create_item("Default Pants", "/pants/pants1", 0, "Default", "Pants") is None:
-            print("Failed to create item 'Default Pants'")
-        if create_item("Default Shoes", "/shoes/shoes1", 0, "Default", "Shoes") is None:
-            print("Failed to create item 'Default Shoes'")
-
-        if create_item("Angry", "/eyebrows/eyebrows2", 10, "avatar", "Eyebrows") is None:
-            print("Failed to create item 'Angry'")
-        if create_item("Monobrow", "/eyebrows/eyebrows3", 10, "avatar", "Eyebrows") is None:
-            print("Failed to create item 'Monobrow'")
-        if create_item("Worried", "/eyebrows/eyebrows4", 10, "avatar", "Eyebrows") is None:
-            print("Failed to create item 'Worried'")
-        if create_item("Thick", "/eyebrows/eyebrows5", 10, "avatar", "Eyebrows") is None:
-            print("Failed to create item 'Thick'")
-        if create_item("Arched", "/eyebrows/eyebrows6", 10, "avatar", "Eyebrows") is None:
-            print("Failed to create item 'Arched'")
-        if create_item("Furrowed", "/eyebrows/eyebrows7", 10, "avatar", "Eyebrows") is None:
-            print("Failed to create item 'Furrowed'")
-        if create_item("Inquisitive", "/eyebrows/eyebrows8", 10, "avatar", "Eyebrows") is None:
-            print("Failed to create item 'Inquisitive'")
-        if create_item("Upturned", "/eyebrows/eyebrows9", 10, "avatar", "Eyebrows") is None:
-            print("Failed to create item 'Upturned'")
-        if create_item("Round", "/eyebrows/eyebrows10", 10, "avatar", "Eyebrows") is None:
-            print("Failed to create item 'Round'")
-        if create_item("Short", "/eyebrows/eyebrows11", 10, "avatar", "Eyebrows") is None:
-            print("Failed to create item 'Short'")
-
-        if create_item("Large", "/eyes/eyes2", 30, "avatar", "Eyes") is None:
-            print("Failed to create item 'Large'")
-        if create_item("Narrow", "/eyes/eyes3", 30, "avatar", "Eyes") is None:
-            print("Failed to create item 'Narrow'")
-        if create_item("Tall", "/eyes/eyes4", 30, "avatar", "Eyes") is None:
-            print("Failed to create item 'Tall'")
-        if create_item("Round", "/eyes/eyes5", 30, "avatar", "Eyes") is None:
-            print("Failed to create item 'Round'")
-        if create_item("Sharp", "/eyes/eyes6", 30, "avatar", "Eyes") is None:
-            print("Failed to create item 'Sharp'")
-        if create_item("Tired", "/eyes/eyes7", 30, "avatar", "Eyes") is None:
-            print("Failed to create item 'Tired'")
-        if create_item("Upturned", "/eyes/eyes8", 30, "avatar", "Eyes") is None:
-            print("Failed to create item 'Upturned'")
-        if create_item("Long Eyelashes", "/eyes/eyes9", 30, "avatar", "Eyes") is None:
-            print("Failed to create item 'Long Eyelashes'")
-        if create_item("Wide", "/eyes/eyes10", 30, "avatar", "Eyes") is None:
-            print("Failed to create item 'Wide'")
-
-        if create_item("Curved", "/mouths/mouth2", 15, "avatar", "Mouths") is None:
-            print("Failed to create item 'Curved'")
-        if create_item("Small", "/mouths/mouth3", 15, "avatar", "Mouths") is None:
-            print("Failed to create item 'Small'")
-        if create_item("Open", "/mouths/mouth4", 15, "avatar", "Mouths") is None:
-            print("Failed to create item 'Open'")
-        if create_item("Open Fangs", "/mouths/mouth5", 15, "avatar", "Mouths") is None:
-            print("Failed to create item 'Open Fangs'")
-        if create_item("Closed Fangs", "/mouths/mouth6", 15, "avatar", "Mouths") is None:
-            print("Failed to create item 'Closed Fangs'")
-        if create_item("Cartoon", "/mouths/mouth7", 15, "avatar", "Mouths") is None:
-            print("Failed to create item 'Cartoon'")
-        if create_item("Open Smile", "/mouths/mouth8", 15, "avatar", "Mouths") is None:
-            print("Failed to create item 'Open Smile'")
-        if create_item("Catlike", "/mouths/mouth9", 15, "avatar", "Mouths") is None:
-            print("Failed to create item 'Catlike'")
-        if create_item("V-Shape", "/mouths/mouth10", 15, "avatar", "Mouths") is None:
-            print("Failed to create item 'V-Shape'")
-        if create_item("Pointed Down", "/mouths/mouth11", 15, "avatar", "Mouths") is None:
-            print("Failed to create item 'Pointed Down'")
-        if create_item("Straight", "/mouths/mouth12", 15, "avatar", "Mouths") is None:
-            print("Failed to create item 'Straight'")
-
-        if create_item("Short", "/hair/hair2", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Short'")
-        if create_item("Cornrows", "/hair/hair3", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Cornrows'")
-        if create_item("Bob", "/hair/hair4", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Bob'")
-        if create_item("Short Bangs", "/hair/hair5", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Short Bangs'")
-        if create_item("Middle Part", "/hair/hair6", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Middle Part'")     
-        if create_item("Bun", "/hair/hair7", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Bun'")   
-        if create_item("High Pigtails", "/hair/hair8", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'High Pigtails'")
-        if create_item("Twintails", "/hair/hair9", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Twintails'") 
-        if create_item("Buzzed", "/hair/hair10", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Buzzed'")   
-        if create_item("Ruffled", "/hair/hair11", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Ruffled'")
-        if create_item("Unruly Long", "/hair/hair12", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Unruly Long'")
-        if create_item("Pixie", "/hair/hair13", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Pixie'")
-        if create_item("Shaggy", "/hair/hair14", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Shaggy'")
-        if create_item("Upward", "/hair/hair15", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Upward'")
-        if create_item("Semi-Bowl", "/hair/hair16", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Semi-Bowl'")
-        if create_item("Curled Afro", "/hair/hair17", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Cornrows'")
-        if create_item("Sideswept", "/hair/hair18", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Sideswept'")
-        if create_item("Styled Afro", "/hair/hair19", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Curled Afro 1'")
-        if create_item("Pixie 2", "/hair/hair20", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Pixie 2'")
-        if create_item("Locs", "/hair/hair21", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Curled Afro 2'")
-        if create_item("Ponytail", "/hair/hair22", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Ponytail'")
-        if create_item("Afro", "/hair/hair23", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Afro'")
-        if create_item("Long Anime", "/hair/hair24", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Long Anime'")
-        if create_item("Long Side Bangs", "/hair/hair25", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Long Side Bangs'")
-        if create_item("Layered", "/hair/hair26", 35, "avatar", "Hair") is None:
-            print("Failed to create item 'Layered'")
-
-        if create_item("T-Shirt", "/shirts/shirt2", 30, "avatar", "Shirts") is None:
-            print("Failed to create item 'T-Shirt'")
-        if create_item("Long Sleeve", "/shirts/shirt3", 30, "avatar", "Shirts") is None:
-            print("Failed to create item 'Long Sleeve'")
-        if create_item("Layered Heart", "/shirts/shirt4", 40, "avatar", "Shirts") is None:
-            print("Failed to create item 'Layered Heart'")
-        if create_item("Striped Tank", "/shirts/shirt5", 40, "avatar", "Shirts") is None:
-            print("Failed to create item 'Striped Tank'")
-        if create_item("Tank Top", "/shirts/shirt6", 30, "avatar", "Shirts") is None:
-            print("Failed to create item 'Tank Top'")
-        if create_item("Off-the-Shoulder", "/shirts/shirt7", 35, "avatar", "Shirts") is None:
-            print("Failed to create item 'Off-the-Shoulder'")
-        if create_item("Collared Sweatshirt", "/shirts/shirt8", 40, "avatar", "Shirts") is None:
-            print("Failed to create item 'Collared Sweatshirt'")
-        if create_item("Button-Up", "/shirts/shirt9", 35, "avatar", "Shirts") is None:
-            print("Failed to create item 'Button-Up'")
-        if create_item("Plain Sweatshirt", "/shirts/shirt10", 35, "avatar", "Shirts") is None:
-            print("Failed to create item 'Plain Sweatshirt'")
-
-        if create_item("Cardigan", "/outerwear/outerwear1", 35, "avatar", "Outerwear") is None:
-            print("Failed to create item 'Cardigan'")
-        if create_item("Plain Hoodie", "/outerwear/outerwear2", 35, "avatar", "Outerwear") is None:
-            print("Failed to create item 'Plain Hoodie'")
-        if create_item("Star Hoodie", "/outerwear/outerwear3", 45, "avatar", "Outerwear") is None:
-            print("Failed to create item 'Star Hoodie'")
-
-        if create_item("Skinny Jeans", "/pants/pants2", 20, "avatar", "Pants") is None:
-            print("Failed to create item 'Skinny Jeans'")
-        if create_item("Hi-Rise Jeans", "/pants/pants3", 20, "avatar", "Pants") is None:
-            print("Failed to create item 'Hi-Rise Jeans'")
-        if create_item("Cuffed Jeans", "/pants/pants4", 25, "avatar", "Pants") is None:
-            print("Failed to create item 'Cuffed Jeans'")
-        if create_item("Jean Shorts", "/pants/pants5", 15, "avatar", "Pants") is None:
-            print("Failed to create item 'Jean Shorts'")
-        if create_item("Long Jean Shorts", "/pants/pants6", 15, "avatar", "Pants") is None:
-            print("Failed to create item 'Long Jean Shorts'")
-        if create_item("Cargo Shorts", "/pants/pants7", 20, "avatar", "Pants") is None:
-            print("Failed to create item 'Cargo Shorts'")
-        if create_item("Cargo Pants", "/pants/pants8", 20, "avatar", "Pants") is None:
-            print("Failed to create item 'Cargo Pants'")
-        if create_item("Sweatpants", "/pants/pants9", 30, "avatar", "Pants") is None:
-            print("Failed to create item 'Sweatpants'")
-        if create_item("Slacks", "/pants/pants10", 35, "avatar", "Pants") is None:
-            print("Failed to create item 'Slacks'")
-        if create_item("Pencil Skirt", "/pants/pants11", 25, "avatar", "Pants") is None:
-            print("Failed to create item 'Pencil Skirt'")
-        if create_item("Straight Skirt", "/pants/pants12", 25, "avatar", "Pants") is None:
-            print("Failed to create item 'Straight Skirt'")
-        if create_item("Circle Skirt", "/pants/pants13", 20, "avatar", "Pants") is None:
-            print("Failed to create item 'Circle Skirt'")
-        if create_item("Mermaid Skirt", "/pants/pants14", 30, "avatar", "Pants") is None:
-            print("Failed to create item 'Mermaid Skirt'")
-        if create_item("Layered Skirt", "/pants/pants15", 20, "avatar", "Pants") is None:
-            print("Failed to create item 'Layered Skirt'")
-
-        if create_item("Loafers", "/shoes/shoes2", 30, "shoes", "Shoes") is None:
-            print("Failed to create item 'Loafers'")
-        if create_item("Sneakers", "/shoes/shoes3", 20, "shoes", "Shoes") is None:
-            print("Failed to create item 'Sneakers'")
-        if create_item("Slides", "/shoes/shoes4", 15, "shoes", "Shoes") is None:
-            print("Failed to create item 'Slides'")
-        if create_item("Sandals", "/shoes/shoes5", 20, "shoes", "Shoes") is None:
-            print("Failed to create item 'Sandals'")
-        if create_item("Slippers", "/shoes/shoes6", 15, "shoes", "Shoes") is None:
-            print("Failed to create item 'Slippers'")
-        if create_item("Heels", "/shoes/shoes7", 30, "shoes", "Shoes") is None:
-            print("Failed to create item 'Heels'")
-        if create_item("Ruffled Bow", "/shoes/shoes8", 30, "shoes", "Shoes") is None:
-            print("Failed to create item 'Ruffled Bow'")
-        if create_item("Leg Warmers", "/shoes/shoes9", 25, "shoes", "Shoes") is None:
-            print("Failed to create item 'Leg Warmers'")
-        if create_item("Hi-Top Sneakers", "/shoes/shoes10", 20, "shoes", "Shoes") is None:
-            print("Failed to create item 'Hi-Top Sneakers'")
-        if create_item("Cowboy Boots", "/shoes/shoes11", 30, "shoes", "Shoes") is None:
-            print("Failed to create item 'Cowboy Boots'")
-        if create_item("Fur Boots", "/shoes/shoes12", 25, "shoes", "Shoes") is None:
-            print("Failed to create item 'Fur Boots'")
-
-        if create_item("coins", "/images/coins", 0, "money", "money") is None:
-            print("Failed to create item 'coins")
+    async def try_execute(self, sql: str, params: tuple) -> bool:
+        return await self.__call(self.__db.try_execute, sql, params)
 
-        """
-        Usage:
-        if create_item("Red Shirt", "/items/red_shirt.png", 100, "clothing", "body") is None:
-            print("Failed to create item 'Red Shirt'")
-        if create_item("Blue Hat", "/items/blue_hat.png", 50, "clothing", "head") is None:
-        ....
-        """
+    async def fetchone(self):
+        return await self.__call(self.__db.cursor().fetchone)
+
+    async def fetchall(self):
+        return await self.__call(self.__db.cursor().fetchall)
+
+    async def write(self):
+        return await self.__call(self.__db.write)
+
+    def created_id(self) -> int:
+        return self.__db.created_id()
+
+    @staticmethod
+    async def try_submit(sql: str, params: tuple) -> bool:
+        """Async counterpart of Database.try_submit."""
+        if Database.group_commit is None:
+            async with AsyncDatabase() as db:
+                if not await db.try_execute(sql, params):
+                    return False
+                await db.write()
+                return True
+        try:
+            await asyncio.wrap_future(Database.group_commit.submit(sql, params))
+        except sqlite3.Error:
+            print(f"An error occured running the following query:")
+            print(f"SQL: {sql}\nParams: {params}")
+            traceback.print_exc()
+            return False
+        return True
@@ -0,0 +1,182 @@
+"""In-process pub/sub bus behind GET /events.
+
+Write paths publish small "something changed" events to the accounts that
+care; each open /events stream subscribes for its account and gets them
+pushed instead of polling. Events carry ids, not full rows: clients react by
+calling /sync or re-fetching the one thing that changed.
+
+Every event gets an id from one increasing counter. The last `history`
+events per account are kept so a reconnecting client can send Last-Event-ID
+and receive what it missed. Only accounts with an open stream have a
+history, kept for `history_ttl` seconds after their last stream closes so a
+client can reconnect. When the id is older than what is kept (or from
+before a restart, or the history has expired) the stream starts with a
+"resync" event instead, telling the client to fall back to /sync once.
+
+The bus lives in one worker process. With several workers a client only
+hears about writes handled by the worker it is connected to; the resync
+path and /sync cover the rest.
+"""
+
+import asyncio
+import collections
+import json
+import threading
+import time
+
+from state import SQLHelper
+
+
+def _account_ids(values) -> set[int]:
+    return {int(v) for v in values if v is not None and str(v).lstrip("-").isdigit()}
+
+
+class Event:
+    __slots__ = ("id", "type", "data")
+
+    def __init__(self, event_id: int, event_type: str, data: dict):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+
+    def encode(self) -> str:
+        return f"id: {self.id}\nevent: {self.type}\ndata: {json.dumps(self.data, separators=(',', ':'))}\n\n"
+
+
+class Subscription:
+    """One open stream. Events arrive on `queue`; `overflowed` is set when the client fell too far behind."""
+
+    def __init__(self, bus: "EventBus", account_id: int, loop: asyncio.AbstractEventLoop, queue_size: int):
+        self.bus = bus
+        self.account_id = account_id
+        self.loop = loop
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(queue_size)
+        self.overflowed = False
+
+    def _deliver(self, event: Event):
+        # runs on the subscriber's event loop
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # drop the stream rather than buffer without bound; the client resumes from its last id
+            self.overflowed = True
+
+    def close(self):
+        self.bus._unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self, history: int = 100, queue_size: int = 256, heartbeat: float = 15.0, history_ttl: float = 60.0):
+        self.history = max(1, int(history))
+        self.queue_size = max(1, int(queue_size))
+        self.heartbeat = heartbeat
+        self.history_ttl = history_ttl
+        # start from the clock so ids keep increasing across restarts
+        self.__next_id = self.__first_id = int(time.time() * 1000)
+        # account -> id of the newest event that fell out of its history
+        self.__evicted: dict[int, int] = {}
+        self.__subscribers: dict[int, set[Subscription]] = {}
+        self.__history: dict[int, collections.deque[Event]] = {}
+        # account -> when its last stream closed, oldest first; the history goes once history_ttl has passed
+        self.__idle: dict[int, float] = {}
+        self.__lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """Whether anyone is listening; publishers skip their audience lookups when not."""
+        return bool(self.__subscribers)
+
+    @property
+    def last_id(self) -> int:
+        return self.__next_id
+
+    def publish(self, account_ids, event_type: str, data: dict) -> int:
+        """Send an event to every open stream of each account. Safe to call from any thread."""
+        targets = []
+        with self.__lock:
+            self.__expire(time.monotonic())
+            self.__next_id += 1
+            event_id = self.__next_id
+            event = Event(event_id, event_type, data)
+            for account_id in _account_ids(account_ids):
+                recent = self.__history.get(account_id)
+                if recent is None:
+                    # nobody has listened recently, so nobody can resume from here
+                    continue
+                if len(recent) == self.history:
+                    self.__evicted[account_id] = recent[0].id
+                recent.append(event)
+                targets.extend(self.__subscribers.get(account_id, ()))
+        for subscription in targets:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # the subscriber's loop is gone
+                self._unsubscribe(subscription)
+        return event_id
+
+    def subscribe(self, account_id: int, last_event_id: int | None = None) -> tuple[Subscription, list[Event] | None]:
+        """Open a stream for the account, from inside its event loop.
+
+        Returns the subscription and the events after `last_event_id` to send
+        first, or None when they are no longer all available (send "resync").
+        """
+        subscription = Subscription(self, int(account_id), asyncio.get_running_loop(), self.queue_size)
+        with self.__lock:
+            self.__expire(time.monotonic())
+            self.__subscribers.setdefault(subscription.account_id, set()).add(subscription)
+            self.__idle.pop(subscription.account_id, None)
+            if subscription.account_id not in self.__history:
+                # events up to now were not recorded for this account
+                self.__history[subscription.account_id] = collections.deque(maxlen=self.history)
+                self.__evicted[subscription.account_id] = self.__next_id
+            if last_event_id is None:
+                return subscription, []
+            # anything at or before the floor may have been lost (evicted, or from before this process)
+            floor = max(self.__first_id, self.__evicted.get(subscription.account_id, 0))
+            if not floor <= last_event_id <= self.__next_id:
+                return subscription, None
+            missed = [e for e in self.__history.get(subscription.account_id, ()) if e.id > last_event_id]
+        return subscription, missed
+
+    def _unsubscribe(self, subscription: Subscription):
+        with self.__lock:
+            subscribers = self.__subscribers.get(subscription.account_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self.__subscribers[subscription.account_id]
+                    self.__idle[subscription.account_id] = time.monotonic()
+
+    def __expire(self, now: float):
+        # __idle is in closing order, so stop at the first account still within its grace period
+        while self.__idle:
+            account_id, closed = next(iter(self.__idle.items()))
+            if now - closed < self.history_ttl:
+                break
+            del self.__idle[account_id]
+            self.__history.pop(account_id, None)
+            self.__evicted.pop(account_id, None)
+
+    def tracked_accounts(self) -> int:
+        """Accounts currently holding a history (open streams plus recently closed ones)."""
+        with self.__lock:
+            self.__expire(time.monotonic())
+            return len(self.__history)
+
+
+def publish_family(db, account_ids, event_type: str, data: dict):
+    """Publish to the accounts and, for children among them, their parents."""
+    if not bus.active:
+        return
+    account_ids = list(_account_ids(account_ids))
+    if not account_ids:
+        return
+    parents = [r[0] for r in db.execute(*SQLHelper.child_parents(account_ids)).fetchall()]
+    bus.publish(account_ids + parents, event_type, data)
+
+
+# main.py replaces this with one configured from the environment
+bus = EventBus()
@@ -0,0 +1,547 @@
+"""Numbered schema migrations.
+
+The schema version lives in `PRAGMA user_version` inside the database file.
+On startup `migrate` reads that one integer and returns straight away when it
+matches the newest migration, so a warm worker never introspects the schema.
+
+Each migration runs once, in its own `BEGIN IMMEDIATE` transaction, and bumps
+user_version in the same commit. Migrations that reshape existing rows should
+go through `batched` so other workers can keep writing between batches.
+"""
+
+import json
+import sqlite3
+from typing import Callable
+
+
+# (version, description, function taking the open Database)
+MIGRATIONS: list[tuple[int, str, Callable]] = []
+
+
+def migration(version: int, description: str):
+    def register(func):
+        MIGRATIONS.append((version, description, func))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return func
+    return register
+
+
+def latest_version() -> int:
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def current_version(db) -> int:
+    return db.execute("PRAGMA user_version", ()).fetchone()[0]
+
+
+def migrate(db) -> int:
+    """Bring the schema up to date and return the resulting version."""
+    version = current_version(db)
+    if version >= latest_version():
+        return version
+
+    # commit whatever the caller started; each migration takes the write lock for itself
+    db.write()
+    for number, description, func in MIGRATIONS:
+        if number <= version:
+            continue
+        db.execute("BEGIN IMMEDIATE", ())
+        try:
+            # another worker may have applied it while we waited for the lock
+            version = current_version(db)
+            if number <= version:
+                db.write()
+                continue
+            print(f"Applying migration {number}: {description}")
+            func(db)
+            db.execute(f"PRAGMA user_version = {int(number)}", ())
+            db.write()
+            version = number
+        except BaseException:
+            db.rollback()
+            raise
+    db.execute("BEGIN TRANSACTION", ())
+    return version
+
+
+def batched(db, select_sql: str, apply: Callable, batch_size: int = 500) -> int:
+    """Run an online data migration over a table in committed batches.
+
+    `select_sql` must select the rowid first and take a single `?` for the
+    last rowid seen, e.g. "SELECT id, friends FROM users WHERE id > ? ORDER BY id LIMIT ?".
+    `apply(db, rows)` is called once per batch. The batch commits before the
+    next one starts, so it has to be idempotent: if the worker dies part way
+    the migration starts over on the next boot.
+    """
+    last_id = -1
+    total = 0
+    while True:
+        rows = db.execute(select_sql, (last_id, batch_size)).fetchall()
+        if not rows:
+            return total
+        apply(db, rows)
+        total += len(rows)
+        last_id = rows[-1][0]
+        # let other writers in between batches, then pick the lock back up
+        db.write()
+        db.execute("BEGIN IMMEDIATE", ())
+
+
+def table_columns(db, table: str) -> list[str]:
+    return [r[1] for r in db.execute(f"PRAGMA table_info({table})", ()).fetchall()]
+
+
+def ensure_column(db, table: str, column: str, col_def: str):
+    if column not in table_columns(db, table):
+        db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {col_def}", ())
+
+
+# Secondary indexes for every WHERE clause in state/SQLHelper.py.
+# (name, table, indexed columns or expressions)
+INDEXES = [
+    ("idx_users_email", "users", "email"),
+    ("idx_users_username", "users", "username"),
+    # user_get_by_username compares lower(username), so it needs an expression index
+    ("idx_users_username_lower", "users", "lower(username)"),
+    ("idx_children_parentId", "children", "parentId"),
+    ("idx_children_code", "children", "code"),
+    ("idx_children_username_lower_code", "children", "lower(username), code"),
+    # also covers task_list_pending's needsApproval filter
+    ("idx_tasks_assigneeId", "tasks", "assigneeId, needsApproval"),
+    ("idx_goals_createdById", "goals", "createdById"),
+    ("idx_goals_assigneeId", "goals", "assigneeId"),
+    ("idx_action_plans_goalId", "action_plans", "goalId"),
+    ("idx_action_plans_createdById", "action_plans", "createdById"),
+    ("idx_action_plans_assigneeId", "action_plans", "assigneeId"),
+    ("idx_formed_habits_userId", "formed_habits", "userId"),
+    ("idx_build_habits_account_id", "build_habits", "account_id"),
+    ("idx_break_habits_account_id", "break_habits", "account_id"),
+]
+
+
+@migration(1, "baseline schema")
+def _baseline(db):
+    db.execute("CREATE TABLE IF NOT EXISTS ids (id INTEGER PRIMARY KEY AUTOINCREMENT);", ())
+
+    #Sprint 5 Additions: Adding usernames to children.
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS children (id INTEGER PRIMARY KEY AUTOINCREMENT, parentId INTEGER, name TEXT, username TEXT, friends TEXT, incomingFriendRequests TEXT, password TEXT, childCode INTEGER, age INTEGER, code TEXT, createdAt TEXT, theme TEXT)", ()
+    )
+
+    # Users table (matches backend `UserInfo` model)
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, email TEXT, password TEXT, name TEXT, age INTEGER, role TEXT, createdAt TEXT, type TEXT, theme TEXT, profilePic TEXT, stats TEXT, code TEXT, meta TEXT, friends TEXT, incomingFriendRequests TEXT)", ()
+    )
+
+    # Tasks table (represents frontend Task objects)
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS tasks (id INTEGER PRIMARY KEY AUTOINCREMENT, assigneeId TEXT, assigneeName TEXT, title TEXT, notes TEXT, taskType TEXT, steps TEXT, habitToBreak TEXT, replacements TEXT, frequency TEXT, streak INTEGER, completedDates TEXT, status TEXT, createdAt TEXT, createdById TEXT, createdByName TEXT, createdByRole TEXT, needsApproval INTEGER, targetType TEXT, targetName TEXT, meta TEXT)", ()
+    )
+
+    # Build / Break / Formed habit tables
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS build_habits (id INTEGER PRIMARY KEY AUTOINCREMENT, account_id INTEGER, goal TEXT, cue TEXT, steps TEXT)", ()
+    )
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS break_habits (id INTEGER PRIMARY KEY AUTOINCREMENT, account_id INTEGER, habit TEXT, replacements TEXT, microSteps TEXT, savedOn TEXT)", ()
+    )
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS formed_habits (id INTEGER PRIMARY KEY AUTOINCREMENT, userId INTEGER, title TEXT, type TEXT, createdAt TEXT, details TEXT, completedAt TEXT, meta TEXT)", ()
+    )
+
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS game_profiles (id INTEGER PRIMARY KEY, coins INTEGER, inventory TEXT, meta TEXT)", ()
+    )
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, price INTEGER, type TEXT, path TEXT UNIQUE, placement TEXT)", ()
+    )
+
+    # Goals table for the new habit system
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS goals ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "title TEXT, "
+        "goal TEXT, "
+        "goalType TEXT, "
+        "whyItMatters TEXT, "
+        "startDate TEXT, "
+        "endDate TEXT, "
+        "assigneeId TEXT, "
+        "assigneeName TEXT, "
+        "triggers TEXT, "
+        "replacements TEXT, "
+        "makeItEasier TEXT, "
+        "savingFor TEXT, "
+        "rewardGoalTitle TEXT, "
+        "rewardGoalCostCoins INTEGER, "
+        "milestoneRewards TEXT, "
+        "createdAt TEXT, "
+        "createdById TEXT, "
+        "createdByName TEXT, "
+        "createdByRole TEXT, "
+        "location TEXT, "
+        "meta TEXT"
+        ")", ()
+    )
+
+    # Action plans table (also known as action_plans)
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS action_plans ("
+        "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+        "goalId INTEGER, "
+        "title TEXT, "
+        "notes TEXT, "
+        "assigneeId TEXT, "
+        "assigneeName TEXT, "
+        "schedule TEXT, "
+        "frequency TEXT, "
+        "frequencyLabel TEXT, "
+        "completedDates TEXT, "
+        "streak INTEGER, "
+        "createdAt TEXT, "
+        "createdById TEXT, "
+        "createdByName TEXT, "
+        "createdByRole TEXT, "
+        "meta TEXT"
+        ")", ()
+    )
+
+    # Databases created before this engine existed may be missing columns that
+    # were added with ad-hoc ALTERs over the sprints. This is the last place
+    # the schema gets introspected.
+    ensure_column(db, "children", "username", "TEXT")
+    ensure_column(db, "children", "friends", "TEXT")
+    ensure_column(db, "children", "incomingFriendRequests", "TEXT")
+    ensure_column(db, "children", "password", "TEXT")
+    ensure_column(db, "children", "childCode", "INTEGER")
+    ensure_column(db, "users", "friends", "TEXT")
+    ensure_column(db, "users", "incomingFriendRequests", "TEXT")
+    ensure_column(db, "game_profiles", "meta", "TEXT")
+
+
+@migration(2, "drop the stray users columns left by the old DDL typo")
+def _drop_users_typo_columns(db):
+    # the old DDL ended in `incomdingFriendRequests, TEXT`, which created two
+    # unused columns named "incomdingFriendRequests" and "TEXT"
+    if sqlite3.sqlite_version_info < (3, 35, 0):
+        return  # no DROP COLUMN; the columns are never read, so leave them be
+    columns = table_columns(db, "users")
+    for column in ("incomdingFriendRequests", "TEXT"):
+        if column in columns:
+            db.execute(f'ALTER TABLE users DROP COLUMN "{column}"', ())
+
+
+@migration(3, "secondary indexes for hot lookups")
+def _create_indexes(db):
+    for name, table, columns in INDEXES:
+        db.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})", ())
+
+
+@migration(4, "key/value table for bookkeeping such as the item catalog checksum")
+def _app_meta(db):
+    db.execute("CREATE TABLE IF NOT EXISTS app_meta (key TEXT PRIMARY KEY, value TEXT)", ())
+
+
+@migration(5, "shared sessions table")
+def _sessions(db):
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS sessions (token TEXT PRIMARY KEY, kind TEXT, account TEXT, createdAt REAL, lastSeen REAL)", ()
+    )
+    # both halves of session_purge's OR
+    db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_lastSeen ON sessions (lastSeen)", ())
+    db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_createdAt ON sessions (createdAt)", ())
+
+
+@migration(6, "account-wide session revocation and the signed token revocation list")
+def _session_revocation(db):
+    ensure_column(db, "sessions", "accountId", "INTEGER")
+    db.execute("CREATE INDEX IF NOT EXISTS idx_sessions_accountId ON sessions (accountId)", ())
+    db.execute("CREATE TABLE IF NOT EXISTS revoked_tokens (jti TEXT PRIMARY KEY, expiresAt REAL, revokedAt REAL)", ())
+    db.execute("CREATE INDEX IF NOT EXISTS idx_revoked_tokens_revokedAt ON revoked_tokens (revokedAt)", ())
+    db.execute("CREATE INDEX IF NOT EXISTS idx_revoked_tokens_expiresAt ON revoked_tokens (expiresAt)", ())
+    db.execute("CREATE TABLE IF NOT EXISTS token_versions (account_id INTEGER PRIMARY KEY, version INTEGER, updatedAt REAL)", ())
+    db.execute("CREATE INDEX IF NOT EXISTS idx_token_versions_updatedAt ON token_versions (updatedAt)", ())
+
+
+# Tables covered by /sync: table -> the columns that decide who can see a row.
+# They are copied onto the tombstone so deletions can be scoped the same way.
+SYNC_TABLES = {
+    "tasks": ("assigneeId",),
+    "goals": ("createdById", "assigneeId"),
+    "action_plans": ("createdById", "assigneeId"),
+    "children": ("parentId", "id"),
+    "game_profiles": ("id",),
+}
+
+
+@migration(7, "row versions and tombstones for delta sync")
+def _row_versions(db):
+    # one global clock: every insert/update takes the next value, so "changed
+    # since N" is a plain rowVersion > N across all synced tables
+    db.execute("CREATE TABLE IF NOT EXISTS sync_clock (id INTEGER PRIMARY KEY CHECK (id = 1), version INTEGER NOT NULL)", ())
+    db.execute("INSERT OR IGNORE INTO sync_clock (id, version) VALUES (1, 1)", ())
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS sync_tombstones (tableName TEXT, rowId INTEGER, ownerA TEXT, ownerB TEXT, version INTEGER, "
+        "PRIMARY KEY (tableName, rowId))", ()
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS idx_sync_tombstones_version ON sync_tombstones (tableName, version)", ())
+
+    for table, owners in SYNC_TABLES.items():
+        ensure_column(db, table, "rowVersion", "INTEGER")
+        # existing rows predate every client watermark
+        db.execute(f"UPDATE {table} SET rowVersion = 1 WHERE rowVersion IS NULL", ())
+        db.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_rowVersion ON {table} (rowVersion)", ())
+
+        stamp = (
+            "UPDATE sync_clock SET version = version + 1 WHERE id = 1; "
+            f"UPDATE {table} SET rowVersion = (SELECT version FROM sync_clock WHERE id = 1) WHERE id = NEW.id; "
+        )
+        db.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_insert AFTER INSERT ON {table} BEGIN "
+            f"{stamp}"
+            f"DELETE FROM sync_tombstones WHERE tableName = '{table}' AND rowId = NEW.id; "
+            "END", ()
+        )
+        # the WHEN keeps the trigger's own rowVersion update from stamping twice
+        db.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_update AFTER UPDATE ON {table} "
+            "WHEN NEW.rowVersion IS OLD.rowVersion BEGIN "
+            f"{stamp}"
+            "END", ()
+        )
+        owner_a, owner_b = [f"OLD.{c}" for c in owners] + ["NULL"] * (2 - len(owners))
+        db.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_sync_delete AFTER DELETE ON {table} BEGIN "
+            "UPDATE sync_clock SET version = version + 1 WHERE id = 1; "
+            "INSERT OR REPLACE INTO sync_tombstones (tableName, rowId, ownerA, ownerB, version) "
+            f"VALUES ('{table}', OLD.id, {owner_a}, {owner_b}, (SELECT version FROM sync_clock WHERE id = 1)); "
+            "END", ()
+        )
+
+
+@migration(8, "cheap per-account version lookups for conditional GETs; tombstones for reassigned rows")
+def _version_lookups(db):
+    # MAX(rowVersion) for one assignee is a single index probe with these
+    db.execute("CREATE INDEX IF NOT EXISTS idx_tasks_assigneeId_rowVersion ON tasks (assigneeId, rowVersion)", ())
+    db.execute("CREATE INDEX IF NOT EXISTS idx_sync_tombstones_ownerA ON sync_tombstones (tableName, ownerA, version)", ())
+
+    # a row whose visibility columns change disappears for the old owners, so
+    # record that like a deletion; clients apply "deleted" before "changes"
+    for table, owners in SYNC_TABLES.items():
+        owner_a, owner_b = [f"OLD.{c}" for c in owners] + ["NULL"] * (2 - len(owners))
+        moved = " OR ".join(f"NEW.{c} IS NOT OLD.{c}" for c in owners)
+        db.execute(f"DROP TRIGGER IF EXISTS trg_{table}_sync_update", ())
+        db.execute(
+            f"CREATE TRIGGER trg_{table}_sync_update AFTER UPDATE ON {table} "
+            "WHEN NEW.rowVersion IS OLD.rowVersion BEGIN "
+            "UPDATE sync_clock SET version = version + 1 WHERE id = 1; "
+            f"UPDATE {table} SET rowVersion = (SELECT version FROM sync_clock WHERE id = 1) WHERE id = NEW.id; "
+            "INSERT OR REPLACE INTO sync_tombstones (tableName, rowId, ownerA, ownerB, version) "
+            f"SELECT '{table}', OLD.id, {owner_a}, {owner_b}, version FROM sync_clock WHERE id = 1 AND ({moved}); "
+            "END", ()
+        )
+
+
+def _legacy_list(raw) -> list[str]:
+    # the formats modules/friends.py used to accept: JSON list, JSON string, "a, b" or a bare name
+    if not isinstance(raw, str) or not raw.strip():
+        return []
+    raw = raw.strip()
+    try:
+        parsed = json.loads(raw)
+    except ValueError:
+        return [p.strip() for p in raw.split(",") if p.strip()]
+    if isinstance(parsed, list):
+        return [str(x).strip() for x in parsed if str(x).strip()]
+    return [str(parsed).strip()] if str(parsed).strip() else []
+
+
+def _legacy_account_id(db, identifier: str) -> int | None:
+    if "#" in identifier:
+        username, code = (p.strip() for p in identifier.split("#", 1))
+        row = db.execute("SELECT id FROM children WHERE lower(username) = lower(?) AND code = ?", (username, code)).fetchone()
+    else:
+        row = db.execute("SELECT id FROM users WHERE lower(username) = lower(?)", (identifier,)).fetchone()
+    return row[0] if row else None
+
+
+def _bump_friend_versions(select_sql: str) -> str:
+    """Trigger statement adding one to friend_versions for every account id `select_sql` yields."""
+    return (
+        f"INSERT INTO friend_versions (account_id, version) SELECT account_id, 1 FROM ({select_sql}) WHERE true "
+        "ON CONFLICT(account_id) DO UPDATE SET version = version + 1; "
+    )
+
+
+@migration(9, "friendships and friend_requests edge tables, backfilled from the JSON columns")
+def _friend_edges(db):
+    # both directions are stored, so an account's friends are one primary key range
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS friendships (account_id INTEGER NOT NULL, friend_id INTEGER NOT NULL, createdAt REAL, "
+        "PRIMARY KEY (account_id, friend_id)) WITHOUT ROWID", ()
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS idx_friendships_friend_id ON friendships (friend_id)", ())
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS friend_requests (to_id INTEGER NOT NULL, from_id INTEGER NOT NULL, createdAt REAL, "
+        "PRIMARY KEY (to_id, from_id)) WITHOUT ROWID", ()
+    )
+    db.execute("CREATE INDEX IF NOT EXISTS idx_friend_requests_from_id ON friend_requests (from_id, to_id)", ())
+    # per-account counter behind the /friends/list ETag
+    db.execute("CREATE TABLE IF NOT EXISTS friend_versions (account_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)", ())
+
+    for table, column in (("friendships", "account_id"), ("friend_requests", "to_id")):
+        for event, row in (("INSERT", "NEW"), ("DELETE", "OLD")):
+            db.execute(
+                f"CREATE TRIGGER IF NOT EXISTS trg_{table}_{event.lower()}_version AFTER {event} ON {table} BEGIN "
+                + _bump_friend_versions(f"SELECT {row}.{column} AS account_id")
+                + "END", ()
+            )
+    # renames change how an account shows up in other people's lists
+    watchers = (
+        "SELECT account_id FROM friendships WHERE friend_id = NEW.id "
+        "UNION SELECT to_id FROM friend_requests WHERE from_id = NEW.id"
+    )
+    for table, columns in (("users", "username"), ("children", "username, code")):
+        db.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_friend_rename AFTER UPDATE OF {columns} ON {table} BEGIN "
+            + _bump_friend_versions(watchers)
+            + "END", ()
+        )
+        db.execute(
+            f"CREATE TRIGGER IF NOT EXISTS trg_{table}_friend_cleanup AFTER DELETE ON {table} BEGIN "
+            "DELETE FROM friendships WHERE account_id = OLD.id OR friend_id = OLD.id; "
+            "DELETE FROM friend_requests WHERE to_id = OLD.id OR from_id = OLD.id; "
+            "END", ()
+        )
+
+    # friendships are mutual, so one-sided legacy entries become two-way edges
+    def backfill(db, rows):
+        for account_id, friends, requests in rows:
+            for name in _legacy_list(friends):
+                friend_id = _legacy_account_id(db, name)
+                if friend_id is not None and friend_id != account_id:
+                    db.execute(
+                        "INSERT OR IGNORE INTO friendships (account_id, friend_id, createdAt) VALUES (?, ?, 0), (?, ?, 0)",
+                        (account_id, friend_id, friend_id, account_id),
+                    )
+            for name in _legacy_list(requests):
+                from_id = _legacy_account_id(db, name)
+                if from_id is not None and from_id != account_id:
+                    db.execute(
+                        "INSERT OR IGNORE INTO friend_requests (to_id, from_id, createdAt) VALUES (?, ?, 0)",
+                        (account_id, from_id),
+                    )
+
+    for table in ("users", "children"):
+        batched(
+            db,
+            f"SELECT id, friends, incomingFriendRequests FROM {table} WHERE id > ? ORDER BY id LIMIT ?",
+            backfill,
+        )
+
+
+@migration(10, "completedDays bitmap for action plans and tasks, backfilled from completedDates")
+def _completed_days(db):
+    # imported here: util's package init imports state.database, which imports this module
+    from util.daybitmap import DayBitmap
+
+    for table in ("action_plans", "tasks"):
+        ensure_column(db, table, "completedDays", "BLOB")
+
+    def backfill_tasks(db, rows):
+        for task_id, completed in rows:
+            db.execute(
+                "UPDATE tasks SET completedDays = ?, completedDates = NULL WHERE id = ?",
+                (DayBitmap.from_iso(completed).to_blob(), task_id),
+            )
+
+    # rewardedCompletionDates always equalled completedDates; plans derive it from the bitmap now
+    def backfill_plans(db, rows):
+        for plan_id, completed, meta in rows:
+            try:
+                meta = json.loads(meta) if meta else None
+            except ValueError:
+                meta = None
+            if isinstance(meta, dict) and meta.pop("rewardedCompletionDates", None) is not None:
+                db.execute("UPDATE action_plans SET meta = ? WHERE id = ?", (json.dumps(meta), plan_id))
+            db.execute(
+                "UPDATE action_plans SET completedDays = ?, completedDates = NULL WHERE id = ?",
+                (DayBitmap.from_iso(completed).to_blob(), plan_id),
+            )
+
+    batched(db, "SELECT id, completedDates FROM tasks WHERE id > ? AND completedDates IS NOT NULL ORDER BY id LIMIT ?", backfill_tasks)
+    batched(
+        db,
+        "SELECT id, completedDates, meta FROM action_plans WHERE id > ? AND completedDates IS NOT NULL ORDER BY id LIMIT ?",
+        backfill_plans,
+    )
+
+
+@migration(11, "plan_completions table, one row per completed plan day, backfilled from completedDays")
+def _plan_completions(db):
+    from util.daybitmap import DayBitmap
+
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS plan_completions (plan_id INTEGER NOT NULL, assignee_id INTEGER, "
+        "day TEXT NOT NULL, createdAt REAL, PRIMARY KEY (plan_id, day)) WITHOUT ROWID", ()
+    )
+    # "what did this account (or family) complete between two days" and "who completed anything on a day"
+    db.execute("CREATE INDEX IF NOT EXISTS idx_plan_completions_assignee_day ON plan_completions (assignee_id, day)", ())
+    db.execute("CREATE INDEX IF NOT EXISTS idx_plan_completions_day ON plan_completions (day)", ())
+    db.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_action_plans_completions_delete AFTER DELETE ON action_plans BEGIN "
+        "DELETE FROM plan_completions WHERE plan_id = OLD.id; "
+        "END", ()
+    )
+    db.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_action_plans_completions_reassign AFTER UPDATE OF assigneeId ON action_plans BEGIN "
+        "UPDATE plan_completions SET assignee_id = CAST(NEW.assigneeId AS INTEGER) WHERE plan_id = NEW.id; "
+        "END", ()
+    )
+
+    def backfill(db, rows):
+        for plan_id, assignee_id, completed in rows:
+            for day in DayBitmap.from_blob(completed).iso_list():
+                db.execute(
+                    "INSERT OR IGNORE INTO plan_completions (plan_id, assignee_id, day, createdAt) VALUES (?, ?, ?, 0)",
+                    (plan_id, assignee_id, day),
+                )
+
+    batched(
+        db,
+        "SELECT id, CAST(assigneeId AS INTEGER), completedDays FROM action_plans "
+        "WHERE id > ? AND completedDays IS NOT NULL ORDER BY id LIMIT ?",
+        backfill,
+    )
+
+
+@migration(12, "drop the legacy friends JSON columns now that friendships and friend_requests hold them")
+def _drop_legacy_friend_columns(db):
+    if sqlite3.sqlite_version_info < (3, 35, 0):
+        return  # no DROP COLUMN; nothing reads them any more, so leave them be
+    for table in ("users", "children"):
+        columns = table_columns(db, table)
+        for column in ("friends", "incomingFriendRequests"):
+            if column in columns:
+                db.execute(f'ALTER TABLE {table} DROP COLUMN "{column}"', ())
+
+
+@migration(13, "remove the session signing key that token sessions used to generate into app_meta")
+def _drop_stored_session_secret(db):
+    # SESSION_SECRET is required now; a key left here would still sign valid-looking tokens for whoever reads the file
+    db.execute("DELETE FROM app_meta WHERE key = 'session_secret'", ())
+
+
+@migration(14, "tombstone retention: a low-water mark on sync_clock and pruning of older tombstones")
+def _tombstone_retention(db):
+    # sync_tombstones_prune raises `pruned`; tombstones at or below it are gone, so
+    # /sync answers a `since` below it with a full resync instead of a partial delta
+    ensure_column(db, "sync_clock", "pruned", "INTEGER NOT NULL DEFAULT 0")
+    tables = ", ".join(f"'{table}'" for table in SYNC_TABLES)
+    db.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_sync_clock_prune AFTER UPDATE OF pruned ON sync_clock "
+        "WHEN NEW.pruned > OLD.pruned BEGIN "
+        # tableName IN (...) lets the delete walk idx_sync_tombstones_version
+        f"DELETE FROM sync_tombstones WHERE tableName IN ({tables}) AND version <= NEW.pruned; "
+        "END", ()
+    )
@@ -0,0 +1,192 @@
+"""Session stores used by state.require_user.
+
+Both stores behave like the dict `state.sessions` used to be
+(`sessions[token] = account`, `sessions.get(token)`, `del sessions[token]`),
+but expire sessions after `idle_ttl` seconds without a request or
+`absolute_ttl` seconds after login, and never hold more than `max_entries`
+sessions in memory.
+
+MemorySessionStore keeps everything in this process. SqliteSessionStore keeps
+the sessions table in the shared database so every uvicorn worker sees the
+same logins; the in-memory LRU in front of it only trusts an entry for
+`cache_seconds` before checking the table again, which is how a logout on one
+worker reaches the others.
+"""
+
+import collections
+import sqlite3
+import uuid
+import threading
+import time
+import traceback
+
+from modules.datatypes import UserInfo, ChildInfo
+from state import SQLHelper
+from state.database import Database
+
+
+class _Session:
+    __slots__ = ("account", "created", "last_seen", "checked", "stored_last_seen")
+
+    def __init__(self, account: UserInfo | ChildInfo, created: float, last_seen: float, checked: float = 0.0):
+        self.account = account
+        self.created = created
+        self.last_seen = last_seen
+        # when the shared table last confirmed this entry, and the lastSeen it holds
+        self.checked = checked
+        self.stored_last_seen = last_seen
+
+
+class MemorySessionStore:
+    def __init__(self, max_entries: int = 10000, idle_ttl: float = 7 * 24 * 3600, absolute_ttl: float = 30 * 24 * 3600):
+        self.max_entries = max(1, int(max_entries))
+        self.idle_ttl = idle_ttl
+        self.absolute_ttl = absolute_ttl
+        self._entries: collections.OrderedDict[str, _Session] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def expired(self, session: _Session, now: float) -> bool:
+        return now - session.last_seen > self.idle_ttl or now - session.created > self.absolute_ttl
+
+    def get(self, token: str | None, default=None):
+        if not token:
+            return default
+        now = time.time()
+        with self._lock:
+            session = self._entries.get(token)
+            if session is not None:
+                self._entries.move_to_end(token)
+        session = self._refresh(token, session, now)
+        if session is None or self.expired(session, now):
+            self._forget(token)
+            return default
+        session.last_seen = now
+        self._touch(token, session, now)
+        return session.account
+
+    def __getitem__(self, token: str):
+        account = self.get(token)
+        if account is None:
+            raise KeyError(token)
+        return account
+
+    def __contains__(self, token) -> bool:
+        return self.get(token) is not None
+
+    def __setitem__(self, token: str, account: UserInfo | ChildInfo):
+        # sessions never need the password hash; keep it out of memory and the shared table
+        account = account.model_copy(update={"password": ""})
+        now = time.time()
+        session = _Session(account, now, now, now)
+        self._save(token, session)
+        self._remember(token, session)
+
+    def __delitem__(self, token: str):
+        self._forget(token)
+        self._remove(token)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def issue(self, account: UserInfo | ChildInfo) -> str:
+        """Start a session for `account` and return the cookie value."""
+        token = uuid.uuid4().hex
+        self[token] = account
+        return token
+
+    def revoke(self, token: str | None):
+        if token:
+            del self[token]
+
+    def revoke_account(self, account_id: int):
+        """End every session of `account_id`, e.g. after a password change."""
+        with self._lock:
+            for token in [t for t, s in self._entries.items() if s.account.id == account_id]:
+                del self._entries[token]
+        self._remove_account(account_id)
+
+    def _remember(self, token: str, session: _Session):
+        with self._lock:
+            self._entries[token] = session
+            self._entries.move_to_end(token)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _forget(self, token: str):
+        with self._lock:
+            self._entries.pop(token, None)
+
+    # Hooks for stores that share sessions with other processes. In memory the
+    # LRU is the whole store, so an entry that fell out of it is gone.
+    def _refresh(self, token: str, session: _Session | None, now: float) -> _Session | None:
+        return session
+
+    def _save(self, token: str, session: _Session):
+        pass
+
+    def _remove(self, token: str):
+        pass
+
+    def _remove_account(self, account_id: int):
+        pass
+
+    def _touch(self, token: str, session: _Session, now: float):
+        pass
+
+
+class SqliteSessionStore(MemorySessionStore):
+    def __init__(self, max_entries: int = 10000, idle_ttl: float = 7 * 24 * 3600, absolute_ttl: float = 30 * 24 * 3600,
+                 cache_seconds: float = 5.0, purge_interval: float = 600.0):
+        super().__init__(max_entries, idle_ttl, absolute_ttl)
+        self.cache_seconds = cache_seconds
+        self.purge_interval = purge_interval
+        # lastSeen is only written back once it is this stale, not on every request
+        self.touch_interval = min(idle_ttl / 10, 300.0)
+        self.__last_purge = 0.0
+
+    def _refresh(self, token: str, session: _Session | None, now: float) -> _Session | None:
+        if session is not None and now - session.checked < self.cache_seconds:
+            return session
+        try:
+            with Database(readonly=True) as db:
+                row = db.execute(*SQLHelper.session_get(token)).fetchone()
+        except sqlite3.Error:
+            traceback.print_exc()
+            return session
+        if row is None:
+            return None
+        model = ChildInfo if row["kind"] == "child" else UserInfo
+        if session is None:
+            session = _Session(model.model_validate_json(row["account"]), row["createdAt"], row["lastSeen"])
+            self._remember(token, session)
+        # another worker may have seen a more recent request
+        session.last_seen = max(session.last_seen, row["lastSeen"])
+        session.stored_last_seen = row["lastSeen"]
+        session.checked = now
+        return session
+
+    def _save(self, token: str, session: _Session):
+        kind = "child" if isinstance(session.account, ChildInfo) else "user"
+        Database.submit(*SQLHelper.session_create(
+            token, session.account.id, kind, session.account.model_dump_json(), session.created
+        )).result()
+        self.__purge(session.created)
+
+    def _remove(self, token: str):
+        Database.submit(*SQLHelper.session_delete(token)).result()
+
+    def _remove_account(self, account_id: int):
+        Database.submit(*SQLHelper.session_delete_account(account_id)).result()
+
+    def _touch(self, token: str, session: _Session, now: float):
+        if now - session.stored_last_seen < self.touch_interval:
+            return
+        session.stored_last_seen = now
+        # fire and forget: a lost touch only shortens the idle window by touch_interval
+        Database.submit(*SQLHelper.session_touch(token, now))
+
+    def __purge(self, now: float):
+        if now - self.__last_purge < self.purge_interval:
+            return
+        self.__last_purge = now
+        Database.submit(*SQLHelper.session_purge(now - self.idle_ttl, now - self.absolute_ttl))
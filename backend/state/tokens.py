@@ -0,0 +1,166 @@
+"""Stateless signed session tokens.
+
+With SESSION_STORE=token the session cookie is the session:
+
+    base64url(payload) "." base64url(HMAC-SHA256(secret, payload))
+
+where the payload is compact JSON with the account id, account kind, role,
+the account's token version and an expiry. Any worker holding the secret can
+check a token without asking anyone else.
+
+The only shared state is a small revocation list in the database: the ids of
+logged out tokens until they would have expired anyway, and a per-account
+version that a password change bumps so every older token for that account
+stops working. Each worker keeps a copy and pulls changes every
+`refresh_seconds`.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import secrets
+import sqlite3
+import threading
+import time
+import traceback
+
+from modules.datatypes import UserInfo, ChildInfo
+from state import SQLHelper, accounts
+from state.database import Database
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+MIN_SECRET_LENGTH = 32
+
+
+def configured_secret(value: str) -> bytes:
+    """The signing key from SESSION_SECRET; token sessions refuse to start without one.
+
+    Whoever holds the key can mint a session for any account, so it is never
+    generated into the database, where every reader and backup would have it.
+    """
+    if len(value) < MIN_SECRET_LENGTH:
+        raise RuntimeError(
+            f"SESSION_STORE=token needs SESSION_SECRET set to at least {MIN_SECRET_LENGTH} random characters "
+            "(e.g. the output of: python -c \"import secrets; print(secrets.token_hex(32))\")"
+        )
+    return value.encode()
+
+
+class TokenSessionStore:
+    # revocations committed by other workers just before our last pull may carry an
+    # earlier timestamp than it, so every pull re-reads this much history
+    SYNC_OVERLAP = 60.0
+
+    def __init__(self, secret: bytes, ttl: float = 30 * 24 * 3600, refresh_seconds: float = 5.0):
+        self.secret = secret
+        self.ttl = ttl
+        self.refresh_seconds = refresh_seconds
+        self.__lock = threading.Lock()
+        self.__revoked: dict[str, float] = {}
+        self.__versions: dict[int, int] = {}
+        self.__synced = 0.0
+
+    def sign(self, payload: dict) -> str:
+        body = _b64encode(json.dumps(payload, separators=(",", ":")).encode())
+        signature = hmac.new(self.secret, body.encode(), hashlib.sha256).digest()
+        return f"{body}.{_b64encode(signature)}"
+
+    def verify(self, token: str | None) -> dict | None:
+        """Return the payload of a well-formed, correctly signed, unexpired token."""
+        if not token or token.count(".") != 1:
+            return None
+        body, signature = token.split(".")
+        expected = hmac.new(self.secret, body.encode(), hashlib.sha256).digest()
+        try:
+            if not hmac.compare_digest(expected, _b64decode(signature)):
+                return None
+            payload = json.loads(_b64decode(body))
+        except (ValueError, TypeError):
+            return None
+        if not isinstance(payload, dict) or payload.get("exp", 0) < time.time():
+            return None
+        return payload
+
+    def issue(self, account: UserInfo | ChildInfo) -> str:
+        self.__sync()
+        child = isinstance(account, ChildInfo)
+        return self.sign({
+            "id": account.id,
+            "k": "c" if child else "u",
+            "r": "child" if child else account.role,
+            "v": self.__versions.get(account.id, 0),
+            "exp": int(time.time() + self.ttl),
+            "jti": secrets.token_hex(8),
+        })
+
+    def get(self, token: str | None, default=None):
+        payload = self.verify(token)
+        if payload is None:
+            return default
+        self.__sync()
+        if payload["jti"] in self.__revoked or payload["v"] < self.__versions.get(payload["id"], 0):
+            return default
+        account = accounts.cache.get(payload["id"], payload["k"] == "c")
+        return default if account is None else account
+
+    def __getitem__(self, token: str):
+        account = self.get(token)
+        if account is None:
+            raise KeyError(token)
+        return account
+
+    def __contains__(self, token) -> bool:
+        return self.get(token) is not None
+
+    def __delitem__(self, token: str):
+        self.revoke(token)
+
+    def revoke(self, token: str | None):
+        """Log a single token out."""
+        payload = self.verify(token)
+        if payload is None:
+            return
+        now = time.time()
+        Database.submit(*SQLHelper.revoked_token_create(payload["jti"], payload["exp"], now)).result()
+        Database.submit(*SQLHelper.revoked_token_purge(now))
+        with self.__lock:
+            self.__revoked[payload["jti"]] = payload["exp"]
+
+    def revoke_account(self, account_id: int):
+        """Invalidate every token issued to `account_id` so far, e.g. after a password change."""
+        with Database() as db:
+            version = db.execute(*SQLHelper.token_version_bump(account_id, time.time())).fetchone()[0]
+            db.write()
+        with self.__lock:
+            self.__versions[account_id] = max(version, self.__versions.get(account_id, 0))
+
+    def __sync(self):
+        now = time.time()
+        if now - self.__synced < self.refresh_seconds:
+            return
+        since = self.__synced - self.SYNC_OVERLAP
+        try:
+            with Database(readonly=True) as db:
+                revoked = db.execute(*SQLHelper.revoked_token_list_since(since)).fetchall()
+                versions = db.execute(*SQLHelper.token_version_list_since(since)).fetchall()
+        except sqlite3.Error:
+            traceback.print_exc()
+            return
+        with self.__lock:
+            self.__synced = now
+            for row in revoked:
+                self.__revoked[row["jti"]] = row["expiresAt"]
+            for row in versions:
+                self.__versions[row["account_id"]] = max(row["version"], self.__versions.get(row["account_id"], 0))
+            # a revoked token past its expiry fails verify() anyway
+            for jti in [jti for jti, expires in self.__revoked.items() if expires < now]:
+                del self.__revoked[jti]
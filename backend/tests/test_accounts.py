@@ -0,0 +1,50 @@
+from modules.datatypes import UserInfo
+from state import SQLHelper
+from state.accounts import AccountCache
+from state.database import Database
+
+
+def test_account_cache_is_invalidated_after_writes(tmp_path, monkeypatch):
+    Database.init(str(tmp_path / "accounts.sqlite"))
+    with Database() as db:
+        db.execute(*SQLHelper.user_create(UserInfo(id=3, username="u", email="u@x"), "hash"))
+        db.write()
+    cache = AccountCache(ttl=60)
+    monkeypatch.setattr("state.accounts.cache", cache)
+
+    assert cache.get(3).username == "u"
+    assert cache.row(3)["password"] == ""
+
+    # building a statement has no side effects; the entry stays until the writer invalidates it
+    query = SQLHelper.user_update_partial({"name": "renamed"}, 3)
+    with Database() as db:
+        db.execute(*query)
+        db.write()
+    assert cache.get(3).name is None
+
+    cache.invalidate(3, child=False)
+    assert cache.row(3)["name"] == "renamed"
+    assert cache.get(3, child=True) is None
+
+
+def test_lookup_racing_an_invalidation_is_not_cached(tmp_path, monkeypatch):
+    Database.init(str(tmp_path / "accounts.sqlite"))
+    with Database() as db:
+        db.execute(*SQLHelper.user_create(UserInfo(id=3, username="u", email="u@x"), "hash"))
+        db.write()
+    cache = AccountCache(ttl=60)
+    user_get = SQLHelper.user_get
+
+    def commit_during_load(user_id):
+        # another handler commits and invalidates while this lookup is reading
+        cache.invalidate(user_id, child=False)
+        return user_get(user_id)
+
+    monkeypatch.setattr(SQLHelper, "user_get", commit_during_load)
+    assert cache.get(3).username == "u"
+    monkeypatch.setattr(SQLHelper, "user_get", user_get)
+
+    with Database() as db:
+        db.execute("UPDATE users SET name = 'later' WHERE id = 3", ())
+        db.write()
+    assert cache.get(3).name == "later"
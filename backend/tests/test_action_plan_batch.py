@@ -0,0 +1,144 @@
+import json
+from datetime import date, timedelta
+
+import fastapi
+
+from modules import action_plans
+from modules.datatypes import ActionPlanInfo, UserInfo
+from state import SQLHelper
+from state.database import Database
+from util.daybitmap import DayBitmap
+
+
+def test_batch_applies_in_order_and_commits_once(tmp_path):
+    Database.init(str(tmp_path / "batch.sqlite"))
+    user = UserInfo(id=5, role="user")
+    days = [(date.today() - timedelta(days=n)).isoformat() for n in range(3)]
+    with Database() as db:
+        db.execute("INSERT INTO action_plans (id, assigneeId, createdById) VALUES (1, '5', '5')", ())
+        db.execute("INSERT INTO action_plans (id, assigneeId, createdById) VALUES (2, '6', '6')", ())
+        db.write()
+
+        payload = action_plans.ActionPlanBatchRequest(mutations=[
+            {"actionPlanId": 1, "dateISO": days[2]},
+            {"actionPlanId": 1, "dateISO": days[1]},
+            {"actionPlanId": 1, "dateISO": days[0]},
+            {"actionPlanId": 1, "dateISO": days[1], "completed": False},
+            {"actionPlanId": 2, "dateISO": days[0]},
+            {"actionPlanId": 3, "dateISO": days[0]},
+            {"actionPlanId": 1, "dateISO": "tomorrow"},
+        ])
+        body = action_plans._complete_action_plan_batch(db, payload, fastapi.Response(), user)
+
+        assert [r["status"] for r in body["results"]] == [200, 200, 200, 200, 403, 404, 400]
+        assert [r.get("currentStreak") for r in body["results"][:4]] == [0, 0, 3, 1]
+        # four completions at 20 coins, one taken back
+        assert body["profiles"]["5"]["totalCoins"] == 40
+        assert body["plans"][0]["completedDates"] == {days[2]: True, days[0]: True}
+
+        plan = action_plans.row_to_plan(db.execute(*SQLHelper.action_plan_get(1)).fetchone())
+        # the views are built in memory, rowVersion included, and match a fresh read
+        assert plan == body["plans"][0]
+        profile = db.execute(*SQLHelper.get_game_profile(5)).fetchone()
+        assert profile["coins"] == 40 and profile["rowVersion"] == plan["rowVersion"]
+        completions = db.execute("SELECT day FROM plan_completions WHERE plan_id = 1 ORDER BY day", ()).fetchall()
+        assert [r[0] for r in completions] == [days[2], days[0]]
+
+
+def test_stored_streak_runs_are_checked_against_the_days(tmp_path):
+    Database.init(str(tmp_path / "batch.sqlite"))
+    user = UserInfo(id=5, role="user")
+    today = date.today()
+    days = [(today - timedelta(days=n)).isoformat() for n in range(4)]
+    with Database() as db:
+        db.execute("INSERT INTO action_plans (id, assigneeId, createdById) VALUES (1, '5', '5')", ())
+        db.write()
+        payload = action_plans.ActionPlanBatchRequest(mutations=[{"actionPlanId": 1, "dateISO": d} for d in days[2:]])
+        action_plans._complete_action_plan_batch(db, payload, fastapi.Response(), user)
+
+        # a write that bypasses action_plan_update_partial keeps the stale meta.streakRuns;
+        # the count matches but the last day doesn't, so the runs are rebuilt
+        moved = DayBitmap.from_iso([days[1], days[3]])
+        db.execute("UPDATE action_plans SET completedDays = ? WHERE id = 1", (moved.to_blob(),))
+        db.write()
+        row = db.execute(*SQLHelper.action_plan_get(1)).fetchone()
+        assert action_plans._streak_runs(row["meta"], moved).state() == [[s, e] for s, e in moved.runs()]
+
+        payload = action_plans.ActionPlanBatchRequest(mutations=[{"actionPlanId": 1, "dateISO": days[0]}])
+        body = action_plans._complete_action_plan_batch(db, payload, fastapi.Response(), user)
+        # today and yesterday; the stale runs would have reported 3 days in a row
+        assert body["results"][0]["currentStreak"] == 2
+
+
+def test_rewriting_the_days_drops_stored_streak_runs(tmp_path):
+    Database.init(str(tmp_path / "batch.sqlite"))
+    user = UserInfo(id=5, role="user")
+    days = [(date.today() - timedelta(days=n)).isoformat() for n in range(2)]
+    with Database() as db:
+        db.execute("INSERT INTO action_plans (id, assigneeId, createdById) VALUES (1, '5', '5')", ())
+        db.write()
+        payload = action_plans.ActionPlanBatchRequest(mutations=[{"actionPlanId": 1, "dateISO": d} for d in days])
+        action_plans._complete_action_plan_batch(db, payload, fastapi.Response(), user)
+
+        def meta():
+            return json.loads(db.execute("SELECT meta FROM action_plans WHERE id = 1", ()).fetchone()[0])
+
+        assert meta()["streakRuns"]
+        db.execute(*SQLHelper.action_plan_update_partial({"title": "renamed"}, 1))
+        assert meta()["streakRuns"]
+
+        db.execute(*SQLHelper.action_plan_update_partial({"completedDates": {days[1]: True}}, 1))
+        assert "streakRuns" not in meta() and meta()["bestStreak"] == 2
+
+        db.execute(*SQLHelper.action_plan_update_partial({"completedDates": [days[0]], "meta": {"streakRuns": [[1, 1]], "note": "x"}}, 1))
+        assert meta() == {"note": "x"}
+        db.write()
+
+
+def test_streak_runs_stay_on_the_server(tmp_path):
+    Database.init(str(tmp_path / "batch.sqlite"))
+    user = UserInfo(id=5, role="user")
+    with Database() as db:
+        db.execute("INSERT INTO action_plans (id, assigneeId, createdById) VALUES (1, '5', '5')", ())
+        db.write()
+        payload = action_plans.ActionPlanBatchRequest(mutations=[{"actionPlanId": 1, "dateISO": date.today().isoformat()}])
+        body = action_plans._complete_action_plan_batch(db, payload, fastapi.Response(), user)
+        assert "streakRuns" not in body["plans"][0]["meta"]
+
+        def meta():
+            return json.loads(db.execute("SELECT meta FROM action_plans WHERE id = 1", ()).fetchone()[0])
+
+        stored = meta()["streakRuns"]
+        # a client echoing back (or making up) meta can't replace the server's runs
+        db.execute(*SQLHelper.action_plan_update_partial({"meta": {"streakRuns": [[1, 1]], "note": "x"}}, 1))
+        assert meta()["streakRuns"] == stored and meta()["note"] == "x"
+        assert "streakRuns" not in action_plans.row_to_plan(db.execute(*SQLHelper.action_plan_get(1)).fetchone())["meta"]
+
+        db.execute(*SQLHelper.action_plan_create(ActionPlanInfo(goalId=1, meta={"streakRuns": [[1, 1]]})))
+        assert db.execute("SELECT meta FROM action_plans WHERE id = ?", (db.created_id(),)).fetchone()[0] is None
+        db.write()
+
+
+def test_single_and_batch_changes_report_the_same_fields(tmp_path):
+    Database.init(str(tmp_path / "batch.sqlite"))
+    user = UserInfo(id=5, role="parent")
+    today = date.today().isoformat()
+    with Database() as db:
+        # different assignees (the user and their child), so both changes earn the same first badge
+        db.execute("INSERT INTO children (id, parentId, username) VALUES (6, 5, 'kid')", ())
+        for plan_id, assignee in ((1, "5"), (2, "6")):
+            db.execute("INSERT INTO action_plans (id, assigneeId, createdById) VALUES (?, ?, '5')", (plan_id, assignee))
+        db.write()
+
+        single = action_plans._mutate_action_plan(
+            db, action_plans.ActionPlanDateMutationRequest(actionPlanId=1, dateISO=today), fastapi.Response(), user, True
+        )
+        payload = action_plans.ActionPlanBatchRequest(mutations=[{"actionPlanId": 2, "dateISO": today}])
+        batch = action_plans._complete_action_plan_batch(db, payload, fastapi.Response(), user)
+
+        result = batch["results"][0]
+        shared = set(result) - {"actionPlanId", "dateISO", "completed", "success", "status"}
+        assert {k: single[k] for k in shared} == {k: result[k] for k in shared}
+        assert single["plan"] == action_plans.row_to_plan(db.execute(*SQLHelper.action_plan_get(1)).fetchone())
+        assert batch["profiles"]["6"] == {k: single[k] for k in ("totalCoins", "earnedBadges", "badgeEarnedDates")}
+        assert (single["current"], single["longest"]) == (1, 1)
@@ -52,3 +52,169 @@ def test_database_init_and_user_insert(tmp_path):
         import json
         assert json.loads(row[3]) == info.stats
         assert json.loads(row[4]) == info.meta
+
+
+def test_pool_reuses_connections_and_drops_uncommitted_work(tmp_path):
+    db_file = tmp_path / "pool_db.sqlite"
+    Database.init(str(db_file), pool_size=2)
+
+    with Database() as db:
+        db.execute("INSERT INTO ids DEFAULT VALUES", ())
+        # no db.write(): the pool must roll this back before reusing the connection
+
+    with Database() as db:
+        row = db.execute("SELECT COUNT(*) FROM ids", ()).fetchone()
+        assert row[0] == 0
+
+    first = Database.pool.acquire()
+    Database.pool.release(first)
+    second = Database.pool.acquire()
+    Database.pool.release(second)
+    assert first is second
+
+
+def test_readonly_contexts_do_not_wait_for_the_writer(tmp_path):
+    db_file = tmp_path / "wal_db.sqlite"
+    Database.init(str(db_file), wal=True)
+    assert Database.wal is True
+
+    with Database() as writer:
+        writer.execute("INSERT INTO ids DEFAULT VALUES", ())
+        # a reader opened while the write lane is busy must not block on it
+        with Database(readonly=True) as reader:
+            row = reader.execute("SELECT COUNT(*) FROM ids", ()).fetchone()
+            assert row[0] == 0
+            try:
+                reader.execute("INSERT INTO ids DEFAULT VALUES", ())
+                assert False, "readonly connections must refuse writes"
+            except sqlite3.OperationalError:
+                pass
+        writer.write()
+
+
+def test_async_database_round_trip(tmp_path):
+    import asyncio
+    from state.database import AsyncDatabase
+
+    db_file = tmp_path / "async_db.sqlite"
+    Database.init(str(db_file), pool_size=2)
+
+    async def scenario():
+        async with AsyncDatabase() as db:
+            assert await db.try_execute("INSERT INTO ids DEFAULT VALUES", ())
+            await db.write()
+            created = db.created_id()
+
+        async def count():
+            async with AsyncDatabase(readonly=True) as db:
+                await db.try_execute("SELECT COUNT(*) FROM ids WHERE id = ?", (created,))
+                return (await db.fetchone())[0]
+
+        # more concurrent readers than pooled connections must still all finish
+        return await asyncio.gather(*[count() for _ in range(10)])
+
+    assert asyncio.run(scenario()) == [1] * 10
+
+
+def test_group_commit_batches_writes_and_isolates_errors(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    db_file = tmp_path / "group_db.sqlite"
+    Database.init(str(db_file), group_commit=True, group_commit_window_ms=20)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            good = list(pool.map(lambda _: Database.submit("INSERT INTO ids DEFAULT VALUES", ()), range(20)))
+            bad = Database.submit("INSERT INTO no_such_table DEFAULT VALUES", ())
+            results = [f.result(timeout=5) for f in good]
+
+        assert len({lastrowid for lastrowid, _ in results}) == 20
+        try:
+            bad.result(timeout=5)
+            assert False, "the failing statement should report its own error"
+        except sqlite3.OperationalError:
+            pass
+        assert Database.try_submit("INSERT INTO no_such_table DEFAULT VALUES", ()) is False
+
+        with Database(readonly=True) as db:
+            assert db.execute("SELECT COUNT(*) FROM ids", ()).fetchone()[0] == 20
+    finally:
+        Database.group_commit.stop()
+        Database.group_commit = None
+
+
+def test_hot_lookups_use_indexes(tmp_path):
+    Database.init(str(tmp_path / "indexes.sqlite"))
+
+    with Database(readonly=True) as db:
+        for query, params in [
+            SQLHelper.user_get_by_username("Tester"),
+            SQLHelper.child_get_by_username_code("kid", "123"),
+            SQLHelper.task_list_pending(1),
+            SQLHelper.action_plan_list_by_goal(1),
+        ]:
+            plan = db.execute("EXPLAIN QUERY PLAN " + query, params).fetchall()
+            assert all("USING INDEX" in row[3] for row in plan), (query, [row[3] for row in plan])
+
+
+def test_item_catalog_is_seeded_once(tmp_path):
+    Database.init(str(tmp_path / "items.sqlite"))
+
+    with Database() as db:
+        count = db.execute("SELECT COUNT(*) FROM items", ()).fetchone()[0]
+        assert count > 0
+        # checksum already stored by init, so this is a no-op
+        assert Database.populate_items(db) is False
+
+        db.execute("UPDATE items SET price = 999 WHERE path = ?", ("/base/base",))
+        db.execute("DELETE FROM app_meta WHERE key = ?", ("items_checksum",))
+        db.write()
+        assert Database.populate_items(db) is True
+        assert db.execute("SELECT COUNT(*) FROM items", ()).fetchone()[0] == count
+        assert db.execute("SELECT price FROM items WHERE path = ?", ("/base/base",)).fetchone()[0] == 0
+
+
+def test_ids_are_reserved_in_blocks_and_survive_restarts(tmp_path):
+    db_file = str(tmp_path / "ids.sqlite")
+    Database.init(db_file, id_block_size=4)
+
+    with Database() as db:
+        first = [db.create_new_id() for _ in range(6)]
+        # two blocks, one row each
+        assert db.execute("SELECT COUNT(*) FROM ids", ()).fetchone()[0] == 2
+    assert first == list(range(first[0], first[0] + 6))
+
+    # a restart throws away the rest of the block instead of reusing it
+    Database.init(db_file, id_block_size=4)
+    with Database() as db:
+        after_restart = db.create_new_id()
+    assert after_restart > max(first)
+
+
+def test_family_task_queries_cover_parent_and_children(tmp_path):
+    Database.init(str(tmp_path / "family.sqlite"))
+    with Database() as db:
+        db.execute("INSERT INTO children (id, parentId) VALUES (?, ?), (?, ?), (?, ?)", (2, 1, 3, 1, 4, 99))
+        for assignee, pending in [(1, 0), (2, 0), (2, 1), (3, 1), (4, 1)]:
+            db.execute(
+                "INSERT INTO tasks (assigneeId, needsApproval, createdByRole) VALUES (?, ?, 'provider')",
+                (assignee, pending),
+            )
+        db.write()
+
+    with Database(readonly=True) as db:
+        family = db.execute(*SQLHelper.family_task_list(1)).fetchall()
+        pending = db.execute(*SQLHelper.family_task_list_pending(1)).fetchall()
+    assert [r["assigneeId"] for r in family] == ["1", "2", "2", "3"]
+    assert sorted(r["assigneeId"] for r in pending) == ["2", "3"]
+
+
+def test_readonly_session_reads_one_snapshot(tmp_path):
+    Database.init(str(tmp_path / "snapshot.sqlite"), wal=True)
+    with Database(readonly=True) as reader:
+        before = reader.execute(*SQLHelper.sync_version()).fetchone()[0]
+        # a write committed from another connection mid-session (with WAL readers don't hold the write lock)
+        Database.submit("INSERT INTO tasks (assigneeId, title) VALUES ('1', 't')", ()).result()
+        assert reader.execute(*SQLHelper.sync_version()).fetchone()[0] == before
+        assert reader.execute("SELECT COUNT(*) FROM tasks", ()).fetchone()[0] == 0
+    with Database(readonly=True) as reader:
+        assert reader.execute(*SQLHelper.sync_version()).fetchone()[0] > before
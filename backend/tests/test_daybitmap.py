@@ -0,0 +1,72 @@
+import json
+import random
+from datetime import date
+
+from state import migrations
+from state.database import Database
+from util.daybitmap import DayBitmap, from_row
+from util.streaks import StreakRuns
+
+
+def test_add_remove_match_a_set():
+    rng = random.Random(3)
+    base = date(2026, 10, 17).toordinal()
+    bitmap = DayBitmap()
+    marked = set()
+    for _ in range(2000):
+        day = base - rng.randrange(400)
+        if rng.random() < 0.6:
+            assert bitmap.add(day) == (day not in marked)
+            marked.add(day)
+        else:
+            assert bitmap.remove(day) == (day in marked)
+            marked.discard(day)
+        assert bitmap.count() == len(marked)
+        assert (bitmap.first(), bitmap.last()) == ((min(marked), max(marked)) if marked else (None, None))
+    assert list(bitmap.days()) == sorted(marked)
+    assert StreakRuns(bitmap.runs()).state() == StreakRuns.from_days(marked).state()
+    assert list(DayBitmap.from_blob(bitmap.to_blob()).days()) == sorted(marked)
+
+
+def test_blob_is_compact_and_empty_is_null():
+    start = date(2026, 1, 1).toordinal()
+    year = DayBitmap.from_days(range(start, start + 365))
+    assert len(year.to_blob()) == 4 + 46
+    assert list(year.runs()) == [(start, start + 364)]
+    assert DayBitmap().to_blob() is None
+    assert year.remove(start) and year.anchor == start + 1
+
+
+def test_iso_views_and_legacy_json():
+    plan_json = json.dumps({"2026-10-02": True, "2026-10-01": True, "2026-10-03": False, "junk": True})
+    bitmap = DayBitmap.from_iso(plan_json)
+    assert bitmap.iso_dict() == {"2026-10-01": True, "2026-10-02": True}
+    assert DayBitmap.from_iso(["2026-01-01"]).iso_list() == ["2026-01-01"]
+    assert DayBitmap.from_iso("2026-01-01").iso_list() == ["2026-01-01"]
+
+    row = {"completedDays": bitmap.to_blob(), "completedDates": None}
+    assert from_row(row).iso_list() == ["2026-10-01", "2026-10-02"]
+    assert from_row({"completedDays": None, "completedDates": plan_json}).count() == 2
+
+
+def test_backfill_from_json_columns(tmp_path):
+    Database.init(str(tmp_path / "days.sqlite"))
+    with Database() as db:
+        meta = {"rewardedCompletionDates": {"2026-10-01": True}, "bestStreak": 1}
+        db.execute(
+            "INSERT INTO action_plans (id, completedDates, meta) VALUES (1, ?, ?)",
+            (json.dumps({"2026-10-01": True}), json.dumps(meta)),
+        )
+        db.execute("INSERT INTO tasks (id, completedDates) VALUES (1, ?)", (json.dumps(["2026-01-02", "2026-01-01"]),))
+        db.write()
+        # what a database still on the JSON columns goes through on upgrade
+        migrations._completed_days(db)
+        db.write()
+
+        plan = db.execute("SELECT * FROM action_plans WHERE id = 1", ()).fetchone()
+        assert plan["completedDates"] is None
+        assert from_row(plan).iso_dict() == {"2026-10-01": True}
+        assert json.loads(plan["meta"]) == {"bestStreak": 1}
+        task = db.execute("SELECT * FROM tasks WHERE id = 1", ()).fetchone()
+        assert task["completedDates"] is None
+        assert from_row(task).iso_list() == ["2026-01-01", "2026-01-02"]
@@ -0,0 +1,13 @@
+from util import etag
+
+
+def test_if_none_match_comparison():
+    tag = etag.make("tasks", 1, [(1, 5, None)])
+    assert tag.startswith('"') and tag == etag.make("tasks", 1, [(1, 5, None)])
+    assert tag != etag.make("tasks", 1, [(1, 6, None)])
+    assert etag.matches(tag, tag)
+    assert etag.matches(f'"other", W/{tag}', tag)
+    assert etag.matches("*", tag)
+    assert not etag.matches(None, tag)
+    assert not etag.matches('"other"', tag)
+    assert etag.not_modified(tag).status_code == 304
@@ -0,0 +1,74 @@
+import asyncio
+
+from state.events import EventBus
+
+
+def test_fan_out_and_resume():
+    async def scenario():
+        bus = EventBus(history=3)
+        assert not bus.active
+        sub, backlog = bus.subscribe(1)
+        other, _ = bus.subscribe(2)
+        assert bus.active and backlog == []
+
+        first = bus.publish([1, "1", None, "x"], "task.updated", {"id": 5})
+        await asyncio.sleep(0)
+        event = sub.queue.get_nowait()
+        assert (event.id, event.type, event.data) == (first, "task.updated", {"id": 5})
+        assert sub.queue.empty() and other.queue.empty()
+
+        # resume from the first event: the later ones are replayed
+        ids = [bus.publish([1], "t", {}) for _ in range(2)]
+        again, backlog = bus.subscribe(1, first)
+        assert [e.id for e in backlog] == ids
+
+        # once history has moved past the client's id it has to resync
+        for _ in range(3):
+            bus.publish([1], "t", {})
+        _, backlog = bus.subscribe(1, first)
+        assert backlog is None
+        # ids from before this bus existed can't be resumed either
+        assert bus.subscribe(1, first - 10_000)[1] is None
+
+        for s in (sub, other, again):
+            s.close()
+
+    asyncio.run(scenario())
+
+
+def test_slow_subscriber_is_cut_off():
+    async def scenario():
+        bus = EventBus(queue_size=2)
+        sub, _ = bus.subscribe(1)
+        for _ in range(3):
+            bus.publish([1], "t", {})
+        await asyncio.sleep(0)
+        assert sub.overflowed and sub.queue.qsize() == 2
+
+    asyncio.run(scenario())
+
+
+def test_history_is_dropped_after_the_last_stream_closes():
+    async def scenario():
+        bus = EventBus(history_ttl=60)
+        # accounts nobody listens to get no history
+        bus.publish([7], "t", {})
+        assert bus.tracked_accounts() == 0
+
+        sub, _ = bus.subscribe(1)
+        seen = bus.publish([1], "t", {})
+        sub.close()
+        # within the grace period a reconnect still resumes
+        missed = bus.publish([1], "t", {})
+        sub, backlog = bus.subscribe(1, seen)
+        assert [e.id for e in backlog] == [missed]
+        sub.close()
+
+        bus.history_ttl = 0
+        bus.publish([1, 2], "t", {})
+        assert bus.tracked_accounts() == 0
+        # the history is gone, so resuming means a resync
+        assert bus.subscribe(1, missed)[1] is None
+        assert bus.subscribe(2, bus.last_id)[1] == []
+
+    asyncio.run(scenario())
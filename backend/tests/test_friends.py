@@ -0,0 +1,81 @@
+import json
+
+from state import SQLHelper, migrations
+from state.database import Database
+
+
+def _identifiers(db, query):
+    return [r["identifier"] for r in db.execute(*query).fetchall()]
+
+
+def _version(db, account_id):
+    row = db.execute(*SQLHelper.friend_version(account_id)).fetchone()
+    return row[0] if row else 0
+
+
+def test_backfill_from_json_columns(tmp_path):
+    Database.init(str(tmp_path / "friends.sqlite"))
+    with Database() as db:
+        # the columns an unmigrated database still has (migration 12 drops them)
+        for table in ("users", "children"):
+            for column in ("friends", "incomingFriendRequests"):
+                migrations.ensure_column(db, table, column, "TEXT")
+        db.execute("INSERT INTO users (id, username, friends, incomingFriendRequests) VALUES (1, 'Ann', ?, ?)", (json.dumps(["bob", "Kid#7", "ghost"]), "Cy"))
+        db.execute("INSERT INTO users (id, username, friends) VALUES (2, 'Bob', NULL)", ())
+        db.execute("INSERT INTO users (id, username) VALUES (3, 'Cy')", ())
+        db.execute("INSERT INTO children (id, parentId, username, code) VALUES (4, 2, 'Kid', '7')", ())
+        db.write()
+        # what a database still on the JSON columns goes through on upgrade
+        migrations._friend_edges(db)
+        db.write()
+
+        assert _identifiers(db, SQLHelper.friend_list(1)) == ["Bob", "Kid#7"]
+        # one-sided legacy entries become mutual
+        assert _identifiers(db, SQLHelper.friend_list(2)) == ["Ann"]
+        assert _identifiers(db, SQLHelper.friend_list(4)) == ["Ann"]
+        assert _identifiers(db, SQLHelper.friend_request_list(1)) == ["Cy"]
+
+
+def test_versions_follow_edges_renames_and_deletes(tmp_path):
+    Database.init(str(tmp_path / "friends.sqlite"))
+    with Database() as db:
+        db.execute("INSERT INTO users (id, username) VALUES (1, 'Ann')", ())
+        db.execute("INSERT INTO children (id, parentId, username, code) VALUES (4, 1, 'Kid', '7')", ())
+        db.execute(*SQLHelper.friend_request_create(1, 4, 1.0))
+        db.write()
+        before = _version(db, 1)
+        assert before > 0
+
+        db.execute(*SQLHelper.friend_request_delete(1, 4))
+        db.execute(*SQLHelper.friendship_create(1, 4, 2.0))
+        db.write()
+        assert _version(db, 1) > before and _identifiers(db, SQLHelper.friend_list(1)) == ["Kid#7"]
+
+        before = _version(db, 1)
+        db.execute("UPDATE children SET code = '8' WHERE id = 4", ())
+        db.write()
+        assert _version(db, 1) > before and _identifiers(db, SQLHelper.friend_list(1)) == ["Kid#8"]
+
+        db.execute(*SQLHelper.child_delete(4))
+        db.write()
+        assert _identifiers(db, SQLHelper.friend_list(1)) == []
+        assert db.execute("SELECT COUNT(*) FROM friendships", ()).fetchone()[0] == 0
+
+
+def test_friend_profiles_projects_public_columns(tmp_path):
+    Database.init(str(tmp_path / "friends.sqlite"))
+    with Database() as db:
+        db.execute("INSERT INTO users (id, username, email, password, name) VALUES (1, 'Ann', 'a@x', 'secret', 'Ann A')", ())
+        db.execute("INSERT INTO users (id, username, email, password, name, stats) VALUES (2, 'Bob', 'b@x', 'secret', 'Bob B', '{\"tasksCompleted\": 3}')", ())
+        db.execute("INSERT INTO children (id, parentId, username, code, password) VALUES (4, 2, 'Kid', '7', 'secret')", ())
+        db.execute("INSERT INTO game_profiles (id, coins, inventory, meta) VALUES (2, 9, '[1]', '{}')", ())
+        db.execute(*SQLHelper.friendship_create(1, 2, 1.0))
+        db.execute(*SQLHelper.friendship_create(1, 4, 2.0))
+        db.write()
+
+        rows = [dict(r) for r in db.execute(*SQLHelper.friend_profiles(1)).fetchall()]
+        assert [(r["identifier"], r["kind"], r["coins"]) for r in rows] == [("Bob", "user", 9), ("Kid#7", "child", None)]
+        assert not {"password", "email", "friends"} & set(rows[0])
+        # Profile.jsx reads the friend's stats for the friend modal
+        assert rows[0]["stats"] == '{"tasksCompleted": 3}'
+        assert db.execute(*SQLHelper.friend_profiles(2, 4)).fetchone() is None
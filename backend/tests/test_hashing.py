@@ -0,0 +1,45 @@
+import asyncio
+import hashlib
+
+import pytest
+
+from util.hashing import HashingBusy, PasswordHasher
+
+
+def test_scrypt_hash_round_trip():
+    hasher = PasswordHasher(workers=0, n=2 ** 10)
+    stored = hasher.hash("pw")
+    assert stored.startswith("scrypt$1024$8$1$") and stored != hasher.hash("pw")
+    assert hasher.verify("pw", stored) == (True, None)
+    assert hasher.verify("nope", stored) == (False, None)
+    assert hasher.verify("pw", None) == (False, None)
+
+
+def test_legacy_and_outdated_hashes_are_upgraded():
+    hasher = PasswordHasher(workers=0, n=2 ** 10)
+    legacy = hashlib.sha256(b"pw").hexdigest()
+    assert hasher.verify("nope", legacy) == (False, None)
+    matches, upgraded = hasher.verify("pw", legacy)
+    assert matches and upgraded.startswith("scrypt$")
+    assert hasher.verify("pw", upgraded) == (True, None)
+
+    stronger = PasswordHasher(workers=0, n=2 ** 11)
+    matches, upgraded = asyncio.run(stronger.verify_async("pw", hasher.hash("pw")))
+    assert matches and upgraded.startswith("scrypt$2048$")
+
+
+def test_process_pool_applies_backpressure():
+    hasher = PasswordHasher(workers=1, max_pending=1, n=2 ** 14)
+    try:
+        assert hasher.verify("pw", hasher.hash("pw"))[0]
+
+        async def two_at_once():
+            first = asyncio.ensure_future(hasher.hash_async("a"))
+            await asyncio.sleep(0)  # let it take the only slot
+            with pytest.raises(HashingBusy):
+                await hasher.hash_async("b")
+            return await first
+
+        assert asyncio.run(two_at_once()).startswith("scrypt$")
+    finally:
+        hasher.shutdown()
@@ -0,0 +1,86 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from state import SQLHelper
+from state.database import Database
+from util.listing import ListParams
+
+
+def _add_tasks(db, assignee, count):
+    for i in range(count):
+        db.execute(
+            "INSERT INTO tasks (assigneeId, title, status, createdAt) VALUES (?, ?, ?, ?)",
+            (str(assignee), f"t{i}", "done" if i % 2 else "open", f"2026-01-{i + 1:02d}"),
+        )
+
+
+def test_keyset_pages_cover_every_row_once(tmp_path):
+    Database.init(str(tmp_path / "listing.sqlite"))
+    with Database() as db:
+        _add_tasks(db, 5, 7)
+        db.write()
+
+    seen, after = [], None
+    with Database(readonly=True) as db:
+        while True:
+            page = ListParams("tasks", after=after, limit=3)
+            rows = db.execute(*page.query(db, SQLHelper.child_task_list(5))).fetchall()
+            seen += [r["id"] for r in rows]
+            after = page.page(rows[-1]["id"] if rows else None, len(rows))["next"]
+            if after is None:
+                break
+    assert seen == sorted(seen) and len(set(seen)) == 7
+
+
+def test_filters_and_fields(tmp_path):
+    Database.init(str(tmp_path / "listing.sqlite"))
+    with Database() as db:
+        _add_tasks(db, 5, 6)
+        db.write()
+
+    page = ListParams("tasks", fields="title,status", since="2026-01-03")
+    with Database(readonly=True) as db:
+        query = page.query(db, SQLHelper.child_task_list(5), [("status = ?", "open"), ("assigneeId = ?", None)])
+        rows = [dict(r) for r in db.execute(*query).fetchall()]
+    assert [r["title"] for r in rows] == ["t2", "t4"]
+    assert set(rows[0]) == {"id", "title", "status"}
+    assert page.page(None, 2) == {}
+
+
+def test_bad_parameters_are_rejected(tmp_path):
+    Database.init(str(tmp_path / "listing.sqlite"))
+    with pytest.raises(ValueError):
+        ListParams("tasks", limit=0)
+    with pytest.raises(ValueError):
+        ListParams("tasks", fields="title; DROP TABLE tasks")
+    with pytest.raises(ValueError):
+        ListParams("tasks", since="last week")
+    with Database(readonly=True) as db, pytest.raises(ValueError):
+        ListParams("tasks", fields="nope").query(db, SQLHelper.child_task_list(5))
+    # no parameters leaves the query untouched
+    assert ListParams("tasks").query(None, SQLHelper.child_task_list(5)) == SQLHelper.child_task_list(5)
+
+
+def test_created_range_spans_epoch_and_iso_rows(tmp_path):
+    Database.init(str(tmp_path / "listing.sqlite"))
+    jan2 = datetime(2026, 1, 2, tzinfo=timezone.utc).timestamp()
+    with Database() as db:
+        # backend writes store epoch seconds, clients send ISO strings (and JS milliseconds)
+        for title, created in (
+            ("epoch", int(jan2)),
+            ("iso", "2026-01-03T12:00:00Z"),
+            ("millis", int(jan2 + 3 * 86400) * 1000),
+            ("old", "2025-12-31"),
+        ):
+            db.execute("INSERT INTO tasks (assigneeId, title, createdAt) VALUES ('5', ?, ?)", (title, created))
+        db.write()
+
+    def titles(**bounds):
+        page = ListParams("tasks", **bounds)
+        with Database(readonly=True) as db:
+            return [r["title"] for r in db.execute(*page.query(db, SQLHelper.child_task_list(5))).fetchall()]
+
+    assert titles(since="2026-01-01") == ["epoch", "iso", "millis"]
+    assert titles(since=str(int(jan2)), until="2026-01-04") == ["epoch", "iso"]
+    assert titles(until=str(int(jan2) * 1000)) == ["old"]
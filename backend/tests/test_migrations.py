@@ -0,0 +1,70 @@
+import sqlite3
+
+from state import migrations
+from state.database import Database
+
+
+def test_fresh_database_is_stamped_with_latest_version(tmp_path):
+    Database.init(str(tmp_path / "fresh.sqlite"))
+
+    with Database(readonly=True) as db:
+        assert migrations.current_version(db) == migrations.latest_version()
+        columns = migrations.table_columns(db, "users")
+    # the friend lists live in friendships/friend_requests now
+    assert "friends" not in columns and "incomingFriendRequests" not in columns
+    assert "incomdingFriendRequests" not in columns and "TEXT" not in columns
+
+
+def test_legacy_database_is_upgraded_in_place(tmp_path):
+    db_file = tmp_path / "legacy.sqlite"
+    # the pre-migration users DDL, typo and all, with an existing row
+    legacy = sqlite3.connect(db_file)
+    legacy.execute(
+        "CREATE TABLE users (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, email TEXT, password TEXT, name TEXT, age INTEGER, role TEXT, createdAt TEXT, type TEXT, theme TEXT, profilePic TEXT, stats TEXT, code TEXT, meta TEXT, friends TEXT, incomdingFriendRequests, TEXT)"
+    )
+    legacy.execute("CREATE TABLE game_profiles (id INTEGER PRIMARY KEY, coins INTEGER, inventory TEXT)")
+    legacy.execute("INSERT INTO users (username, email) VALUES ('old', 'old@example.com')")
+    legacy.commit()
+    legacy.close()
+
+    Database.init(str(db_file))
+
+    with Database(readonly=True) as db:
+        assert migrations.current_version(db) == migrations.latest_version()
+        columns = migrations.table_columns(db, "users")
+        assert "friends" not in columns and "TEXT" not in columns
+        assert "meta" in migrations.table_columns(db, "game_profiles")
+        assert db.execute("SELECT username FROM users", ()).fetchone()[0] == "old"
+
+
+def test_current_schema_skips_every_migration(tmp_path, monkeypatch):
+    Database.init(str(tmp_path / "current.sqlite"))
+
+    def fail(db):
+        raise AssertionError("migration ran twice")
+
+    monkeypatch.setattr(migrations, "MIGRATIONS", [(v, d, fail) for v, d, _ in migrations.MIGRATIONS])
+    with Database() as db:
+        assert migrations.migrate(db) == migrations.latest_version()
+
+
+def test_batched_visits_every_row_once(tmp_path):
+    Database.init(str(tmp_path / "batched.sqlite"))
+    with Database() as db:
+        for i in range(7):
+            db.execute("INSERT INTO ids DEFAULT VALUES", ())
+        db.write()
+
+    seen = []
+    with Database() as db:
+        db.write()
+        db.execute("BEGIN IMMEDIATE", ())
+        total = migrations.batched(
+            db,
+            "SELECT id FROM ids WHERE id > ? ORDER BY id LIMIT ?",
+            lambda db, rows: seen.extend(r[0] for r in rows),
+            batch_size=3,
+        )
+        db.write()
+    assert total == 7
+    assert seen == sorted(set(seen))
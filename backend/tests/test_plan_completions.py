@@ -0,0 +1,42 @@
+from state import SQLHelper, migrations
+from state.database import Database
+from util.daybitmap import DayBitmap
+
+
+def _days(db, plan_id):
+    return [tuple(r) for r in db.execute("SELECT assignee_id, day FROM plan_completions WHERE plan_id = ? ORDER BY day", (plan_id,)).fetchall()]
+
+
+def test_backfill_from_completed_days(tmp_path):
+    Database.init(str(tmp_path / "completions.sqlite"))
+    with Database() as db:
+        blob = DayBitmap.from_iso(["2026-10-01", "2026-10-03"]).to_blob()
+        db.execute("INSERT INTO action_plans (id, assigneeId, completedDays) VALUES (1, '7', ?)", (blob,))
+        db.execute("INSERT INTO action_plans (id, assigneeId) VALUES (2, '7')", ())
+        db.write()
+        # what a database without the table goes through on upgrade
+        migrations._plan_completions(db)
+        db.write()
+
+        assert _days(db, 1) == [(7, "2026-10-01"), (7, "2026-10-03")]
+        assert _days(db, 2) == []
+
+
+def test_rows_follow_the_plan(tmp_path):
+    Database.init(str(tmp_path / "completions.sqlite"))
+    with Database() as db:
+        db.execute("INSERT INTO action_plans (id, assigneeId) VALUES (1, '7')", ())
+        db.execute(*SQLHelper.plan_completion_add(1, "7", "2026-10-01", 0))
+        db.execute(*SQLHelper.plan_completion_add(1, "7", "2026-10-01", 0))
+        db.execute(*SQLHelper.plan_completions_add_many(1, ["2026-10-02", "2026-10-03"], 0))
+        assert [d for _, d in _days(db, 1)] == ["2026-10-01", "2026-10-02", "2026-10-03"]
+
+        db.execute(*SQLHelper.plan_completion_delete(1, "2026-10-02"))
+        db.execute("UPDATE action_plans SET assigneeId = '8' WHERE id = 1", ())
+        assert _days(db, 1) == [(8, "2026-10-01"), (8, "2026-10-03")]
+        on_day = db.execute("SELECT plan_id FROM plan_completions WHERE day = ?", ("2026-10-03",)).fetchall()
+        assert [r[0] for r in on_day] == [1]
+
+        db.execute(*SQLHelper.action_plan_delete(1))
+        assert _days(db, 1) == []
+        db.write()
@@ -0,0 +1,94 @@
+import time
+
+import pytest
+
+from modules.datatypes import UserInfo, ChildInfo
+from state import SQLHelper, migrations
+from state.database import Database
+from state.session_store import MemorySessionStore, SqliteSessionStore
+from state.tokens import TokenSessionStore, configured_secret
+
+
+def test_memory_store_evicts_least_recently_used():
+    store = MemorySessionStore(max_entries=2)
+    store["a"] = UserInfo(id=1, username="a", password="hash")
+    store["b"] = UserInfo(id=2, username="b")
+    assert store["a"].password == ""  # touch a, so b is now the oldest
+    store["c"] = UserInfo(id=3, username="c")
+    assert "b" not in store
+    assert store.get("a").id == 1 and store.get("c").id == 3
+
+
+def test_memory_store_expires_idle_and_old_sessions(monkeypatch):
+    store = MemorySessionStore(idle_ttl=10, absolute_ttl=25)
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    store["t"] = UserInfo(id=1)
+    for _ in range(2):
+        now[0] += 9
+        assert store.get("t") is not None
+    now[0] += 11
+    assert store.get("t") is None
+
+    store["t"] = UserInfo(id=1)
+    for _ in range(2):
+        now[0] += 9
+        assert store.get("t") is not None
+    now[0] += 9  # still used recently, but 27s after login
+    assert store.get("t") is None
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    Database.init(str(tmp_path / "sessions.sqlite"))
+    worker_a = SqliteSessionStore(cache_seconds=0)
+    worker_b = SqliteSessionStore(cache_seconds=0)
+
+    worker_a["tok"] = ChildInfo(id=5, username="kid", password="secret")
+    seen = worker_b.get("tok")
+    assert isinstance(seen, ChildInfo) and seen.id == 5 and seen.password == ""
+
+    del worker_b["tok"]
+    assert worker_a.get("tok") is None
+
+
+def test_signed_tokens_round_trip_and_revocation(tmp_path):
+
+    Database.init(str(tmp_path / "tokens.sqlite"))
+    with Database() as db:
+        db.execute(*SQLHelper.user_create(UserInfo(id=7, username="u", email="u@x", role="parent"), "hash"))
+        db.write()
+    store = TokenSessionStore(b"secret", refresh_seconds=0)
+    other_worker = TokenSessionStore(b"secret", refresh_seconds=0)
+
+    token = store.issue(UserInfo(id=7, role="parent"))
+    user = other_worker.get(token)
+    assert user.id == 7 and user.username == "u" and user.password == ""
+
+    body, signature = token.split(".")
+    assert store.get(body + "." + signature[::-1]) is None
+    assert TokenSessionStore(b"other secret").get(token) is None
+
+    second = store.issue(UserInfo(id=7))
+    store.revoke(token)
+    assert other_worker.get(token) is None
+    assert other_worker.get(second) is not None
+
+    other_worker.revoke_account(7)
+    assert store.get(second) is None
+    assert store.get(store.issue(UserInfo(id=7))) is not None
+
+
+def test_token_store_needs_a_configured_secret(tmp_path):
+    with pytest.raises(RuntimeError):
+        configured_secret("")
+    with pytest.raises(RuntimeError):
+        configured_secret("short")
+    assert configured_secret("k" * 32) == b"k" * 32
+
+    # a key an older version generated into the database is removed on upgrade
+    Database.init(str(tmp_path / "secret.sqlite"))
+    with Database() as db:
+        db.execute(*SQLHelper.app_meta_insert("session_secret", "ab" * 32))
+        migrations._drop_stored_session_secret(db)
+        db.write()
+        assert db.execute(*SQLHelper.app_meta_get("session_secret")).fetchone() is None
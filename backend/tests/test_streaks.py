@@ -0,0 +1,45 @@
+import random
+from datetime import date
+
+from util.streaks import StreakRuns
+
+
+def _naive(days, today):
+    days = sorted(set(days))
+    best = run = 0
+    for i, day in enumerate(days):
+        run = run + 1 if i and day == days[i - 1] + 1 else 1
+        best = max(best, run)
+    current = 0
+    while today - current in set(days):
+        current += 1
+    return current, best, len(days)
+
+
+def test_incremental_updates_match_a_full_recompute():
+    rng = random.Random(7)
+    today = date(2026, 10, 17)
+    t = today.toordinal()
+    runs = StreakRuns()
+    marked = set()
+    for _ in range(2000):
+        day = t - rng.randrange(60)
+        if rng.random() < 0.6:
+            assert runs.add(day) == (day not in marked)
+            marked.add(day)
+        else:
+            assert runs.remove(day) == (day in marked)
+            marked.discard(day)
+        assert (runs.current(today), runs.best, runs.total) == _naive(marked, t)
+
+    assert runs.state() == StreakRuns.from_days(marked).state()
+    assert StreakRuns.from_state(runs.state()).state() == runs.state()
+
+
+def test_malformed_state_is_rejected():
+    assert StreakRuns.from_state(None) is None
+    assert StreakRuns.from_state([[5, 3]]) is None
+    # overlapping or touching runs should have been merged
+    assert StreakRuns.from_state([[1, 3], [4, 6]]) is None
+    assert StreakRuns.from_state([["x", 1]]) is None
+    assert StreakRuns.from_state([[1, 3], [5, 6]]).best == 3
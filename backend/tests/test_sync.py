@@ -0,0 +1,117 @@
+import fastapi
+
+from modules import sync
+from modules.datatypes import UserInfo
+from state import SQLHelper
+from state.database import Database
+
+
+def _changed(db, table, account, family, since):
+    return [r["id"] for r in db.execute(*SQLHelper.sync_changed_rows(table, account, family, since)).fetchall()]
+
+
+def _deleted(db, table, account, family, since):
+    return [r[0] for r in db.execute(*SQLHelper.sync_deleted_ids(table, account, family, since)).fetchall()]
+
+
+def _version(db):
+    return db.execute(*SQLHelper.sync_version()).fetchone()[0]
+
+
+def test_row_versions_track_writes_and_deletes(tmp_path):
+    Database.init(str(tmp_path / "sync.sqlite"))
+    with Database() as db:
+        db.execute("INSERT INTO children (id, parentId, name) VALUES (20, 10, 'kid')", ())
+        db.execute("INSERT INTO tasks (id, assigneeId, title) VALUES (1, '10', 'mine')", ())
+        db.execute("INSERT INTO tasks (id, assigneeId, title) VALUES (2, '20', 'kid')", ())
+        db.execute("INSERT INTO tasks (id, assigneeId, title) VALUES (3, '99', 'stranger')", ())
+        db.write()
+
+    with Database(readonly=True) as db:
+        start = _version(db)
+        assert sorted(_changed(db, "tasks", 10, True, 0)) == [1, 2]
+        assert _changed(db, "tasks", 20, False, 0) == [2]
+        assert _changed(db, "children", 10, True, 0) == [20]
+        assert _changed(db, "tasks", 10, True, start) == []
+
+    with Database() as db:
+        db.execute("UPDATE tasks SET title = 'renamed' WHERE id = 2", ())
+        db.execute("DELETE FROM tasks WHERE id = 1", ())
+        db.execute("DELETE FROM tasks WHERE id = 3", ())
+        db.write()
+
+    with Database(readonly=True) as db:
+        assert _version(db) == start + 3
+        assert _changed(db, "tasks", 10, True, start) == [2]
+        # a deletion is only reported to accounts that could see the row
+        assert _deleted(db, "tasks", 10, True, start) == [1]
+        assert _deleted(db, "tasks", 20, False, start) == []
+
+    # re-creating a row clears its tombstone
+    with Database() as db:
+        db.execute("INSERT INTO tasks (id, assigneeId, title) VALUES (1, '10', 'back')", ())
+        db.write()
+    with Database(readonly=True) as db:
+        assert _deleted(db, "tasks", 10, True, 0) == []
+        assert _changed(db, "tasks", 10, True, start + 3) == [1]
+
+
+def test_reassigned_row_is_reported_to_the_old_owner(tmp_path):
+    Database.init(str(tmp_path / "sync.sqlite"))
+    with Database() as db:
+        db.execute("INSERT INTO tasks (id, assigneeId, title) VALUES (1, '10', 't')", ())
+        db.write()
+    with Database(readonly=True) as db:
+        start = _version(db)
+        before = db.execute(*SQLHelper.task_list_version(10, False)).fetchall()
+    with Database() as db:
+        db.execute("UPDATE tasks SET assigneeId = '11' WHERE id = 1", ())
+        db.write()
+    with Database(readonly=True) as db:
+        assert _deleted(db, "tasks", 10, False, start) == [1]
+        assert _changed(db, "tasks", 11, False, start) == [1]
+        # the old owner's task list version moves even though it has no tasks left
+        assert db.execute(*SQLHelper.task_list_version(10, False)).fetchall() != before
+
+
+def test_sync_scope_uses_the_indexes(tmp_path):
+    Database.init(str(tmp_path / "sync.sqlite"))
+    with Database(readonly=True) as db:
+        for table in ("tasks", "goals", "action_plans", "children", "game_profiles"):
+            for family in (False, True):
+                for build in (SQLHelper.sync_changed_rows, SQLHelper.sync_deleted_ids):
+                    query, params = build(table, 5, family, 0)
+                    plan = [row[3] for row in db.execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()]
+                    assert not [step for step in plan if step.startswith("SCAN") and step != "SCAN CONSTANT ROW"], (table, plan)
+
+
+def test_pruned_tombstones_force_a_full_resync(tmp_path, monkeypatch):
+    Database.init(str(tmp_path / "sync.sqlite"))
+    with Database() as db:
+        for i in range(1, 4):
+            db.execute("INSERT INTO tasks (id, assigneeId, title) VALUES (?, '10', 't')", (i,))
+        db.write()
+        start = _version(db)
+        db.execute("DELETE FROM tasks WHERE id = 1", ())
+        db.write()
+        deleted_at = _version(db)
+        db.execute("UPDATE tasks SET title = 'x' WHERE id = 2", ())
+        db.write()
+
+    user = UserInfo(id=10, role="user")
+    body = sync.sync(fastapi.Response(), start, user)
+    assert body["deleted"] == {"tasks": [1]} and "resync" not in body
+
+    # keep only the newest version's tombstones: the deletion of task 1 is forgotten
+    monkeypatch.setattr(sync, "_last_prune", 0.0)
+    monkeypatch.setattr(sync, "TOMBSTONE_VERSIONS", 1)
+    sync._prune_tombstones()
+    with Database(readonly=True) as db:
+        assert db.execute("SELECT COUNT(*) FROM sync_tombstones", ()).fetchone()[0] == 0
+        assert db.execute(*SQLHelper.sync_version()).fetchone()["pruned"] == deleted_at
+
+    # a delta from before the low-water mark could miss deletions, so everything is sent again
+    body = sync.sync(fastapi.Response(), start, user)
+    assert body["resync"] is True and sorted(t["id"] for t in body["changes"]["tasks"]) == [2, 3]
+    body = sync.sync(fastapi.Response(), deleted_at, user)
+    assert "resync" not in body and [t["id"] for t in body["changes"]["tasks"]] == [2]
@@ -1,18 +1,17 @@
 import sqlite3
-import json
 from functools import wraps
 from typing import Optional
 
 from modules.datatypes import UserInfo, ChildInfo
 from state import SQLHelper
 from state.database import Database
-import hashlib
+from util import hashing
 
 def check_habit_ownership(habit_type):
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
-            with Database() as db:
+            with Database(readonly=True) as db:
                 user_id = kwargs.get("user").id
                 habit_id = kwargs.get("habit_id")
                 if not habit_id or not habit_type:
@@ -30,42 +29,25 @@ def check_habit_ownership(habit_type):
 
 
 
-def _parse_friends(raw_value):
-    if raw_value is None:
-        return []
-    if isinstance(raw_value, list):
-        return [str(x) for x in raw_value]
-    if isinstance(raw_value, str):
-        raw = raw_value.strip()
-        if not raw:
-            return []
-        try:
-            parsed = json.loads(raw)
-            if isinstance(parsed, list):
-                return [str(x) for x in parsed]
-        except Exception:
-            return []
-    return []
-
 #Sprint 5 addon: Giving Users usernames, allowing for login with either email or username.
 def get_full_user(user: UserInfo) -> Optional[UserInfo]:
-    identifier = (user.username or "").strip()
-    with Database() as db:
-        # Try email first (existing behavior)
-        if db.try_execute(*SQLHelper.user_get_by_email(identifier)):
-            row = db.cursor().fetchone()
-            if row:
-                data = dict(row)
-                data['friends'] = _parse_friends(data.get('friends'))
-                return UserInfo.model_validate(data)
-
-        # Then try username (new behavior)
-        if db.try_execute(*SQLHelper.user_get_by_username(identifier)):
-            row = db.cursor().fetchone()
-            if row:
-                data = dict(row)
-                data['friends'] = _parse_friends(data.get('friends'))
-                return UserInfo.model_validate(data)
+    with Database(readonly=True) as db:
+        return find_user(db, user.username)
+
+
+def find_user(db: Database, identifier: str | None) -> Optional[UserInfo]:
+    identifier = (identifier or "").strip()
+    # Try email first (existing behavior)
+    if db.try_execute(*SQLHelper.user_get_by_email(identifier)):
+        row = db.cursor().fetchone()
+        if row:
+            return UserInfo.model_validate(dict(row))
+
+    # Then try username (new behavior)
+    if db.try_execute(*SQLHelper.user_get_by_username(identifier)):
+        row = db.cursor().fetchone()
+        if row:
+            return UserInfo.model_validate(dict(row))
 
     return None
 
@@ -73,10 +55,14 @@ def get_full_user(user: UserInfo) -> Optional[UserInfo]:
 def get_child_from_row(row: sqlite3.Row):
     if row is None:
         return None
-    data = dict(row)
-    data['friends'] = _parse_friends(data.get('friends'))
-    return ChildInfo.model_validate(data)
+    return ChildInfo.model_validate(dict(row))
 
 
 def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+    """Blocking; see util.hashing for the async variant and backpressure."""
+    return hashing.hasher.hash(password)
+
+
+def verify_password(password, stored) -> tuple[bool, Optional[str]]:
+    """(matches, upgraded hash to store or None), accepting legacy SHA-256 hashes."""
+    return hashing.hasher.verify(password, stored)
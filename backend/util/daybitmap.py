@@ -0,0 +1,148 @@
+"""Completed days stored as a bitmap of day ordinals.
+
+Action plans and tasks keep the days they were completed on in a
+`completedDays` BLOB: a 4 byte little-endian anchor (`date.toordinal()` of
+the earliest completed day) followed by little-endian bits, where bit i means
+anchor + i was completed. A year of daily completions is 4 + 46 bytes, and
+counting them is an int.bit_count() rather than a JSON decode. An empty
+bitmap is stored as NULL.
+
+Clients still see the old shapes: `iso_dict()` ({"2026-10-01": true, ...})
+for plans and `iso_list()` for tasks. `from_iso` reads either shape, plus the
+JSON text the completedDates column used to hold.
+"""
+
+import json
+from datetime import date
+
+_ANCHOR_BYTES = 4
+
+
+class DayBitmap:
+    __slots__ = ("anchor", "bits")
+
+    def __init__(self, anchor: int = 0, bits: int = 0):
+        self.anchor = anchor
+        self.bits = bits
+        self.__normalize()
+
+    @classmethod
+    def from_blob(cls, blob) -> "DayBitmap":
+        if not blob or len(blob) < _ANCHOR_BYTES:
+            return cls()
+        blob = bytes(blob)
+        return cls(
+            int.from_bytes(blob[:_ANCHOR_BYTES], "little"),
+            int.from_bytes(blob[_ANCHOR_BYTES:], "little"),
+        )
+
+    @classmethod
+    def from_days(cls, days) -> "DayBitmap":
+        days = set(days)
+        if not days:
+            return cls()
+        anchor = min(days)
+        bits = 0
+        for day in days:
+            bits |= 1 << (day - anchor)
+        return cls(anchor, bits)
+
+    @classmethod
+    def from_iso(cls, value) -> "DayBitmap":
+        """Parse the legacy completedDates value; unparseable dates are skipped."""
+        if isinstance(value, (str, bytes)):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                value = [value]
+        if isinstance(value, dict):
+            value = [k for k, v in value.items() if v is True]
+        elif not isinstance(value, (list, tuple)):
+            return cls()
+        days = []
+        for iso in value:
+            try:
+                days.append(date.fromisoformat(iso).toordinal())
+            except (TypeError, ValueError):
+                continue
+        return cls.from_days(days)
+
+    def to_blob(self) -> bytes | None:
+        if not self.bits:
+            return None
+        return self.anchor.to_bytes(_ANCHOR_BYTES, "little") + self.bits.to_bytes((self.bits.bit_length() + 7) // 8, "little")
+
+    def __normalize(self):
+        # keep the anchor on the earliest day so the blob never carries leading empty days
+        if not self.bits:
+            self.anchor = 0
+            return
+        low = (self.bits & -self.bits).bit_length() - 1
+        if low:
+            self.bits >>= low
+            self.anchor += low
+
+    def __contains__(self, day: int) -> bool:
+        return self.bits != 0 and day >= self.anchor and bool(self.bits >> (day - self.anchor) & 1)
+
+    def count(self) -> int:
+        return self.bits.bit_count()
+
+    def first(self) -> int | None:
+        return self.anchor if self.bits else None
+
+    def last(self) -> int | None:
+        return self.anchor + self.bits.bit_length() - 1 if self.bits else None
+
+    def add(self, day: int) -> bool:
+        """Mark a day; False when it was already marked."""
+        if day in self:
+            return False
+        if not self.bits:
+            self.anchor, self.bits = day, 1
+        elif day < self.anchor:
+            self.bits = (self.bits << (self.anchor - day)) | 1
+            self.anchor = day
+        else:
+            self.bits |= 1 << (day - self.anchor)
+        return True
+
+    def remove(self, day: int) -> bool:
+        """Unmark a day; False when it wasn't marked."""
+        if day not in self:
+            return False
+        self.bits &= ~(1 << (day - self.anchor))
+        self.__normalize()
+        return True
+
+    def days(self):
+        """Marked day ordinals in ascending order."""
+        for start, end in self.runs():
+            yield from range(start, end + 1)
+
+    def runs(self):
+        """(first, last) ordinals of each stretch of consecutive marked days, ascending."""
+        bits, offset = self.bits, self.anchor
+        while bits:
+            gap = (bits & -bits).bit_length() - 1
+            bits >>= gap
+            offset += gap
+            # the lowest zero bit of `bits` ends the run
+            length = (~bits & (bits + 1)).bit_length() - 1
+            yield offset, offset + length - 1
+            bits >>= length
+            offset += length
+
+    def iso_list(self) -> list[str]:
+        return [date.fromordinal(day).isoformat() for day in self.days()]
+
+    def iso_dict(self) -> dict[str, bool]:
+        return {date.fromordinal(day).isoformat(): True for day in self.days()}
+
+
+def from_row(row) -> DayBitmap:
+    """The bitmap of a task or plan row (dict or sqlite3.Row), falling back to completedDates JSON not yet migrated."""
+    columns = row.keys()
+    if "completedDays" in columns and row["completedDays"]:
+        return DayBitmap.from_blob(row["completedDays"])
+    return DayBitmap.from_iso(row["completedDates"] if "completedDates" in columns else None)
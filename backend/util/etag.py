@@ -0,0 +1,41 @@
+"""Conditional GET helpers.
+
+Handlers build a strong ETag from something cheap that changes whenever the
+response would (row versions, a checksum, the query string) and answer 304
+with no body when the client already has it:
+
+    tag = etag.make("tasks", user.id, versions, request_query)
+    if etag.matches(if_none_match, tag):
+        return etag.not_modified(tag)
+    response.headers["ETag"] = tag
+"""
+
+import hashlib
+
+import fastapi
+
+
+def make(*parts) -> str:
+    return '"' + hashlib.sha256(repr(parts).encode()).hexdigest()[:32] + '"'
+
+
+def matches(if_none_match: str | None, tag: str) -> bool:
+    """If-None-Match uses weak comparison, so a W/ prefix on the client's copy still counts."""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == tag:
+            return True
+    return False
+
+
+def headers(tag: str, cache_control: str | None = None) -> dict:
+    out = {"ETag": tag}
+    if cache_control:
+        out["Cache-Control"] = cache_control
+    return out
+
+
+def not_modified(tag: str, cache_control: str | None = None) -> fastapi.Response:
+    return fastapi.Response(status_code=304, headers=headers(tag, cache_control))
@@ -0,0 +1,128 @@
+"""Password hashing service.
+
+Passwords are hashed with scrypt (memory-hard, in the standard library) and
+stored as
+
+    scrypt$<n>$<r>$<p>$<salt hex>$<hash hex>
+
+so the cost parameters can be raised later without breaking old hashes. The
+KDF runs in a bounded ProcessPoolExecutor: request threads and the event loop
+only wait on a future, and hashing throughput scales with cores instead of
+the GIL. At most `max_pending` hashes may be queued; past that `HashingBusy`
+is raised so the caller can answer 503 instead of piling up work.
+
+Hashes from before this service are bare SHA-256 hex digests. `verify`
+still accepts them and hands back a fresh scrypt hash to store, so accounts
+upgrade themselves on their next successful login.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+
+
+class HashingBusy(Exception):
+    """Too many password hashes are already queued."""
+
+
+def _scrypt(password: str, salt: bytes, n: int, r: int, p: int) -> bytes:
+    # runs in the worker processes, so it must stay a plain module-level function
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r + (1 << 20), dklen=32)
+
+
+def _is_legacy(stored: str) -> bool:
+    return len(stored) == 64 and all(c in "0123456789abcdef" for c in stored)
+
+
+class PasswordHasher:
+    def __init__(self, workers: int | None = None, max_pending: int | None = None, n: int = 2 ** 14, r: int = 8, p: int = 1):
+        # workers=0 hashes inline on the calling thread (tests, tiny deployments)
+        self.workers = (os.cpu_count() or 1) if workers is None else max(0, int(workers))
+        self.max_pending = max_pending or max(1, self.workers) * 8
+        self.n, self.r, self.p = n, r, p
+        self.__slots = threading.BoundedSemaphore(self.max_pending)
+        self.__pool: ProcessPoolExecutor | None = None
+        self.__pool_lock = threading.Lock()
+
+    def __submit(self, *args) -> Future:
+        if not self.__slots.acquire(blocking=False):
+            raise HashingBusy()
+        try:
+            if self.workers == 0:
+                future = Future()
+                future.set_result(_scrypt(*args))
+            else:
+                future = self.__get_pool().submit(_scrypt, *args)
+        except BaseException:
+            self.__slots.release()
+            raise
+        future.add_done_callback(lambda _: self.__slots.release())
+        return future
+
+    def __get_pool(self) -> ProcessPoolExecutor:
+        # started on first use so importing the app doesn't fork
+        with self.__pool_lock:
+            if self.__pool is None:
+                self.__pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self.__pool
+
+    def shutdown(self):
+        with self.__pool_lock:
+            if self.__pool is not None:
+                self.__pool.shutdown(wait=False, cancel_futures=True)
+                self.__pool = None
+
+    def __start_hash(self, password: str) -> tuple[bytes, Future]:
+        salt = secrets.token_bytes(16)
+        return salt, self.__submit(password, salt, self.n, self.r, self.p)
+
+    def __format(self, salt: bytes, digest: bytes) -> str:
+        return f"scrypt${self.n}${self.r}${self.p}${salt.hex()}${digest.hex()}"
+
+    def __start_verify(self, password: str, stored: str) -> tuple[Future | None, bool]:
+        """Returns (future digest to compare or None for a legacy hash, needs upgrade)."""
+        if _is_legacy(stored):
+            return None, True
+        _, n, r, p, salt, _ = stored.split("$")
+        n, r, p = int(n), int(r), int(p)
+        return self.__submit(password, bytes.fromhex(salt), n, r, p), (n, r, p) != (self.n, self.r, self.p)
+
+    @staticmethod
+    def __matches(password: str, stored: str, digest: bytes | None) -> bool:
+        if digest is None:
+            return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), stored)
+        return hmac.compare_digest(digest.hex(), stored.rsplit("$", 1)[1])
+
+    def hash(self, password: str) -> str:
+        salt, future = self.__start_hash(password)
+        return self.__format(salt, future.result())
+
+    async def hash_async(self, password: str) -> str:
+        salt, future = self.__start_hash(password)
+        return self.__format(salt, await asyncio.wrap_future(future))
+
+    def verify(self, password: str | None, stored: str | None) -> tuple[bool, str | None]:
+        """(matches, replacement hash to store or None)."""
+        if not password or not stored or (not _is_legacy(stored) and not stored.startswith("scrypt$")):
+            return False, None
+        future, upgrade = self.__start_verify(password, stored)
+        if not self.__matches(password, stored, None if future is None else future.result()):
+            return False, None
+        return True, self.hash(password) if upgrade else None
+
+    async def verify_async(self, password: str | None, stored: str | None) -> tuple[bool, str | None]:
+        if not password or not stored or (not _is_legacy(stored) and not stored.startswith("scrypt$")):
+            return False, None
+        future, upgrade = self.__start_verify(password, stored)
+        digest = None if future is None else await asyncio.wrap_future(future)
+        if not self.__matches(password, stored, digest):
+            return False, None
+        return True, await self.hash_async(password) if upgrade else None
+
+
+# main.py replaces this with one configured from the environment
+hasher = PasswordHasher()
@@ -0,0 +1,127 @@
+"""after/limit/fields handling shared by the list endpoints.
+
+    GET /goals/list?limit=50                 first page, ordered by id
+    GET /goals/list?limit=50&after=<next>    following page
+    GET /goals/list?fields=title,startDate   only those columns (plus id)
+    GET /goals/list?since=2026-01-01         created on or after that (until= is exclusive)
+
+Pagination is keyset based: `after` is the last id the client has seen, so a
+page costs the same no matter how deep it is. When `limit` is given the
+response carries `"next"`, the `after` value for the following page, or null
+on the last page. Without any of these parameters the endpoints behave as
+they always have.
+"""
+
+import re
+from datetime import datetime, timezone
+
+from state.database import Database
+
+MAX_LIMIT = 500
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+# table -> column names, read once per process the first time fields= is used on it
+_columns: dict[str, frozenset[str]] = {}
+
+# response fields computed from other columns, which are selected along with them
+_SOURCES = {"completedDates": ("completedDays",)}
+
+# createdAt holds epoch seconds from the backend's own writes (stored as text by
+# the TEXT column) and ISO strings from clients, so since/until compare it as
+# epoch seconds; 'auto' reads numbers as unix time, larger ones are milliseconds
+_CREATED_AT = "(CASE WHEN CAST(createdAt AS REAL) >= 1e11 THEN CAST(createdAt AS REAL) / 1000 ELSE unixepoch(createdAt, 'auto') END)"
+
+
+def _epoch_seconds(name: str, value: str) -> float:
+    """A since/until bound (ISO date or datetime, or epoch seconds/milliseconds) as epoch seconds."""
+    value = value.strip()
+    try:
+        number = float(value)
+    except ValueError:
+        pass
+    else:
+        return number / 1000 if number >= 1e11 else number
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date or epoch seconds") from None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class ListParams:
+    def __init__(
+        self,
+        table: str,
+        after: int | None = None,
+        limit: int | None = None,
+        fields: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+    ):
+        """Raises ValueError with a client-facing message for bad parameters."""
+        if limit is not None and not 1 <= limit <= MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {MAX_LIMIT}")
+        self.table = table
+        self.after = after
+        self.limit = limit
+        self.since = None if since is None else _epoch_seconds("since", since)
+        self.until = None if until is None else _epoch_seconds("until", until)
+        self.fields = None
+        if fields:
+            names = [f.strip() for f in fields.split(",") if f.strip()]
+            bad = [f for f in names if not _IDENTIFIER.match(f)]
+            if bad:
+                raise ValueError(f"unknown field: {bad[0]}")
+            self.fields = list(dict.fromkeys(["id", *names]))
+
+    def query(self, db: Database, base: tuple[str, tuple], where=()) -> tuple[str, tuple]:
+        """`base` wrapped with the filters in `where` ((clause, value) pairs, None values skipped), paging and projection."""
+        if self.fields:
+            known = _columns.get(self.table)
+            if known is None:
+                known = frozenset(r[1] for r in db.execute(f"PRAGMA table_info({self.table})", ()).fetchall())
+                _columns[self.table] = known
+            unknown = [f for f in self.fields if f not in known]
+            if unknown:
+                raise ValueError(f"unknown field: {unknown[0]}")
+            columns = list(dict.fromkeys(
+                c for f in self.fields for c in (f, *_SOURCES.get(f, ())) if c in known
+            ))
+
+        sql, params = base
+        clauses = []
+        params = list(params)
+        for clause, value in (*where, (f"{_CREATED_AT} >= ?", self.since), (f"{_CREATED_AT} < ?", self.until)):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        if self.after is not None:
+            clauses.append("id > ?")
+            params.append(self.after)
+        if not (clauses or self.fields or self.limit is not None):
+            return base
+
+        sql = f"SELECT {', '.join(columns) if self.fields else '*'} FROM ({sql})"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        if self.after is not None or self.limit is not None:
+            sql += " ORDER BY id"
+        if self.limit is not None:
+            sql += " LIMIT ?"
+            params.append(self.limit)
+        return sql, tuple(params)
+
+    def project(self, data: dict) -> dict:
+        """Drop keys the client didn't ask for (derived keys included)."""
+        if not self.fields:
+            return data
+        return {k: v for k, v in data.items() if k in self.fields}
+
+    def page(self, last_id, count: int) -> dict:
+        """Extra response keys: the cursor for the next page when paging."""
+        if self.limit is None:
+            return {}
+        return {"next": last_id if count == self.limit else None}
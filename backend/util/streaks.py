@@ -0,0 +1,125 @@
+"""Run-length streak state for action plans.
+
+A plan's completed days are kept as sorted, disjoint runs of consecutive day
+ordinals (`date.toordinal()`), e.g. [[738900, 738906], [738910, 738910]].
+Marking or unmarking one day touches at most two runs, found by bisection,
+so completing a plan with years of history costs O(log runs) instead of
+re-parsing and re-sorting every date. Run lengths are counted so the best
+streak only needs a scan of the distinct lengths when the longest run
+shrinks.
+
+The runs are stored in the plan's meta under "streakRuns" and are never
+sent to clients. They are rebuilt from the completedDays bitmap when they
+are missing, or when a cheap check against the bitmap (day count, first and
+last day) fails. Rewriting a plan's days drops them.
+"""
+
+import bisect
+import collections
+from datetime import date
+
+
+class StreakRuns:
+    def __init__(self, runs=()):
+        self.starts: list[int] = []
+        self.ends: list[int] = []
+        self.lengths: collections.Counter[int] = collections.Counter()
+        self.total = 0
+        self.best = 0
+        for start, end in runs:
+            self.__insert(len(self.starts), int(start), int(end))
+
+    @classmethod
+    def from_days(cls, days) -> "StreakRuns":
+        """Full recompute from day ordinals, in any order, duplicates allowed."""
+        runs = []
+        for day in sorted(set(days)):
+            if runs and runs[-1][1] == day - 1:
+                runs[-1][1] = day
+            else:
+                runs.append([day, day])
+        return cls(runs)
+
+    @classmethod
+    def from_state(cls, state) -> "StreakRuns | None":
+        """Load stored runs; None when they are missing or malformed."""
+        if not isinstance(state, list):
+            return None
+        try:
+            runs = [(int(start), int(end)) for start, end in state]
+        except (TypeError, ValueError):
+            return None
+        for i, (start, end) in enumerate(runs):
+            if end < start or (i and start <= runs[i - 1][1] + 1):
+                return None
+        return cls(runs)
+
+    def state(self) -> list[list[int]]:
+        return [[start, end] for start, end in zip(self.starts, self.ends)]
+
+    def __run_index(self, day: int) -> int:
+        """Index of the run containing `day`, or -1."""
+        i = bisect.bisect_right(self.starts, day) - 1
+        return i if i >= 0 and self.ends[i] >= day else -1
+
+    def __contains__(self, day: int) -> bool:
+        return self.__run_index(day) >= 0
+
+    def __insert(self, i: int, start: int, end: int):
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.__count(end - start + 1, 1)
+
+    def __delete(self, i: int):
+        length = self.ends[i] - self.starts[i] + 1
+        del self.starts[i]
+        del self.ends[i]
+        self.__count(length, -1)
+
+    def __count(self, length: int, delta: int):
+        self.total += length * delta
+        self.lengths[length] += delta
+        if delta > 0:
+            self.best = max(self.best, length)
+            return
+        if self.lengths[length] <= 0:
+            del self.lengths[length]
+            if length == self.best:
+                self.best = max(self.lengths, default=0)
+
+    def add(self, day: int) -> bool:
+        """Mark a day; False when it was already marked."""
+        i = bisect.bisect_right(self.starts, day) - 1
+        if i >= 0 and self.ends[i] >= day:
+            return False
+        joins_left = i >= 0 and self.ends[i] == day - 1
+        joins_right = i + 1 < len(self.starts) and self.starts[i + 1] == day + 1
+        start, end = day, day
+        if joins_right:
+            end = self.ends[i + 1]
+            self.__delete(i + 1)
+        if joins_left:
+            start = self.starts[i]
+            self.__delete(i)
+            i -= 1
+        self.__insert(i + 1, start, end)
+        return True
+
+    def remove(self, day: int) -> bool:
+        """Unmark a day; False when it wasn't marked."""
+        i = self.__run_index(day)
+        if i < 0:
+            return False
+        start, end = self.starts[i], self.ends[i]
+        self.__delete(i)
+        if day < end:
+            self.__insert(i, day + 1, end)
+        if start < day:
+            self.__insert(i, start, day - 1)
+        return True
+
+    def current(self, today: date | None = None) -> int:
+        """Length of the streak running through today (0 when today isn't marked)."""
+        today = (today or date.today()).toordinal()
+        i = self.__run_index(today)
+        return today - self.starts[i] + 1 if i >= 0 else 0